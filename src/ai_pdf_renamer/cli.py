@@ -210,6 +210,38 @@ def _add_heuristic_args(p: argparse.ArgumentParser) -> None:
         action="store_true",
         help="Try to extract JSON from LLM responses that don't start with '{' (regex fallback).",
     )
+    p.add_argument(
+        "--llm-stream-json",
+        dest="llm_stream_json",
+        action="store_true",
+        help="Stream LLM responses and stop generation as soon as the JSON object is complete.",
+    )
+    p.add_argument(
+        "--llm-race-prompts",
+        dest="llm_race_prompts",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Send up to N prompt variants concurrently per field and keep the first usable answer (default 1).",
+    )
+    p.add_argument(
+        "--summary-from-title",
+        dest="summary_from_title",
+        action="store_true",
+        help="Use a title-like first line as the summary instead of asking the LLM (faster, less detail).",
+    )
+    p.add_argument(
+        "--llm-fused-metadata",
+        dest="llm_fused_metadata",
+        action="store_true",
+        help="Ask the LLM for summary, keywords, category and final summary in one call per file.",
+    )
+    p.add_argument(
+        "--llm-batch-keywords",
+        dest="llm_batch_keywords",
+        action="store_true",
+        help="With --workers > 1, request keywords for several files in one LLM call.",
+    )
     p.add_argument(
         "--prefer-heuristic",
         dest="prefer_heuristic",
@@ -394,6 +426,14 @@ def _add_heuristic_args(p: argparse.ArgumentParser) -> None:
         metavar="N",
         help="Extract text only from first N pages of each PDF (0 = all pages)",
     )
+    p.add_argument(
+        "--page-workers",
+        dest="pdf_page_workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Worker processes for extracting pages of long PDFs (32+ pages) in parallel (default 1)",
+    )
 
 
 def _add_llm_args(p: argparse.ArgumentParser) -> None:
@@ -419,6 +459,13 @@ def _add_llm_args(p: argparse.ArgumentParser) -> None:
         metavar="SEC",
         help="LLM request timeout in seconds (default: env AI_PDF_RENAMER_LLM_TIMEOUT or 60)",
     )
+    p.add_argument(
+        "--llm-cache",
+        dest="llm_cache_path",
+        default=None,
+        metavar="FILE",
+        help="SQLite file caching deterministic LLM responses across runs (default: env AI_PDF_RENAMER_LLM_CACHE, off)",
+    )
     p.add_argument(
         "--max-tokens",
         dest="max_tokens_for_extraction",
@@ -824,9 +871,11 @@ def _build_config_from_args(
         "heuristic_long_doc_chars_threshold": _int_opt(args, "heuristic_long_doc_chars_threshold", 40000),
         "heuristic_long_doc_leading_chars": _int_opt(args, "heuristic_long_doc_leading_chars", 12000),
         "max_pages_for_extraction": _int_opt(args, "max_pages_for_extraction", 0),
+        "pdf_page_workers": max(1, _int_opt(args, "pdf_page_workers", 1)),
         "llm_base_url": getattr(args, "llm_base_url", None) or None,
         "llm_model": getattr(args, "llm_model", None) or None,
         "llm_timeout_s": getattr(args, "llm_timeout_s", None),
+        "llm_cache_path": getattr(args, "llm_cache_path", None) or None,
         "max_tokens_for_extraction": max_tokens_for_extraction,
         "use_ocr": _bool_opt(args, "use_ocr", False),
         "skip_if_already_named": _bool_opt(args, "skip_if_already_named", False),
@@ -851,6 +900,11 @@ def _build_config_from_args(
         "write_pdf_metadata": _bool_opt(args, "write_pdf_metadata", False),
         "use_llm": _bool_opt(args, "use_llm", True),
         "lenient_llm_json": _bool_opt(args, "lenient_llm_json", False),
+        "llm_race_prompts": max(1, _int_opt(args, "llm_race_prompts", 1)),
+        "summary_from_title": _bool_opt(args, "summary_from_title", False),
+        "llm_fused_metadata": _bool_opt(args, "llm_fused_metadata", False),
+        "llm_batch_keywords": _bool_opt(args, "llm_batch_keywords", False),
+        "llm_stream_json": _bool_opt(args, "llm_stream_json", False),
     }
     try:
         return RenamerConfig(**kwargs)
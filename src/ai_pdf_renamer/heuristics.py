@@ -3,12 +3,66 @@ from __future__ import annotations
 import json
 import logging
 import re
-from dataclasses import dataclass
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from .json_utils import json_loads
+
 logger = logging.getLogger(__name__)
 
 
+# Non-ASCII characters that re.IGNORECASE matches against an ASCII letter. Folded before lower()
+# so that an ASCII literal required by a pattern is always found in the folded text.
+_PREFILTER_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+# Literals shorter than this filter too little to be worth checking.
+_PREFILTER_MIN_LITERAL_LEN = 3
+
+
+def _fold_for_prefilter(text: str) -> str:
+    return text.translate(_PREFILTER_FOLD).lower()
+
+
+# The prefilter only reads literal alternations like (?i)\b(miet\s*vertrag|rental\s*agreement)\b:
+# an optional (?i), one optional group around the alternation, and branches of literal text
+# separated by \b or \s runs. Any other syntax and the rule always runs its regex.
+_REGEX_WRAPPED_ALTERNATION_RE = re.compile(r"(?:\\b)?\((?:\?:)?([^()]*)\)(?:\\b)?")
+_REGEX_SEPARATOR_RE = re.compile(r"\\b|\\s[*+?]?")
+_REGEX_ESCAPED_LITERAL_RE = re.compile(r"\\([^A-Za-z0-9])")
+_REGEX_METACHARS = frozenset("\\.^$*+?{}[]()|")
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]+")
+
+
+def _branch_literal(branch: str) -> str | None:
+    """Longest lowercase ASCII run of a branch made of literal text only, else None."""
+    runs: list[str] = []
+    for piece in _REGEX_SEPARATOR_RE.split(branch):
+        if any(ch in _REGEX_METACHARS for ch in _REGEX_ESCAPED_LITERAL_RE.sub("", piece)):
+            return None
+        # Non-ASCII letters may match other case variants; only the ASCII runs are kept.
+        runs.extend(_NON_ASCII_RE.split(_REGEX_ESCAPED_LITERAL_RE.sub(r"\1", piece)))
+    return max(runs, key=len).lower() or None
+
+
+def _required_literals(pattern: re.Pattern[str]) -> tuple[str, ...] | None:
+    """
+    Literals for the substring prefilter of one rule: every match contains one of them. None
+    means the regex always runs.
+    """
+    src = pattern.pattern.removeprefix("(?i)")
+    if pattern.flags & re.VERBOSE or "\\\\" in src or "\\|" in src:
+        return None
+    if (m := _REGEX_WRAPPED_ALTERNATION_RE.fullmatch(src)) is not None:
+        src = m.group(1)
+    literals = [_branch_literal(branch) for branch in src.split("|")]
+    if not all(literals):
+        return None
+    if min(len(lit) for lit in literals if lit) < _PREFILTER_MIN_LITERAL_LEN:
+        return None
+    return tuple(sorted({lit for lit in literals if lit}))
+
+
 @dataclass(frozen=True)
 class HeuristicRule:
     pattern: re.Pattern[str]
@@ -16,19 +70,32 @@ class HeuristicRule:
     score: float
     language: str | None = None
     parent: str | None = None
+    # Derived at construction: one of these must occur in the (folded) text for the regex to match.
+    literals: tuple[str, ...] | None = field(default=None, init=False, repr=False, compare=False)
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "literals", _required_literals(self.pattern))
 
-def load_heuristic_rules(path: str | Path) -> list[HeuristicRule]:
+
+_VALID_LANGS = frozenset({"de", "en"})
+
+# (regex, category, score, language, parent) as read from a rules file, before compilation.
+_RuleEntry = tuple[str, str, float, str | None, str | None]
+
+
+def _read_rule_entries(path: str | Path) -> list[_RuleEntry]:
     path_obj = Path(path)
     try:
-        raw = path_obj.read_text(encoding="utf-8")
+        raw = path_obj.read_bytes()
     except OSError as exc:
         raise ValueError(f"Could not read data file {path_obj.name!r}: {exc!s}") from exc
     try:
-        data = json.loads(raw)
-    except json.JSONDecodeError as exc:
+        data = json_loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
         raise ValueError(f"Invalid JSON in data file {path_obj.name!r}. {exc!s}") from exc
-    rules: list[HeuristicRule] = []
+    if not isinstance(data, dict):
+        data = {}
+    entries: list[_RuleEntry] = []
     raw_patterns = data.get("patterns", [])
     if not isinstance(raw_patterns, list):
         raw_patterns = []
@@ -39,40 +106,55 @@ def load_heuristic_rules(path: str | Path) -> list[HeuristicRule]:
         score = entry.get("score")
         if not isinstance(regex, str) or not isinstance(category, str):
             continue
-        try:
-            compiled = re.compile(regex)
-        except re.error as exc:
-            logger.warning("Invalid regex skipped: %r (%s)", regex, exc)
-            continue
-        try:
+        if isinstance(score, (int, float)):
             score_f = float(score)
-        except (TypeError, ValueError):
+        elif isinstance(score, str):
+            try:
+                score_f = float(score)
+            except ValueError:
+                score_f = 0.0
+        else:
             score_f = 0.0
         language = entry.get("language")
-        if language is not None and not isinstance(language, str):
+        if isinstance(language, str):
+            language = language.strip().lower()
+            language = language if language in _VALID_LANGS else None
+        else:
             language = None
-        elif language is not None:
-            language = language.strip().lower() or None
-            if language not in ("de", "en"):
-                language = None
         parent = entry.get("parent")
         if parent is not None and not isinstance(parent, str):
             parent = None
         elif parent is not None:
             parent = parent.strip() or None
+        entries.append((regex, category, score_f, language, parent))
+
+    return entries
+
+
+def _compile_rules(entries: list[_RuleEntry]) -> list[HeuristicRule]:
+    rules: list[HeuristicRule] = []
+    for regex, category, score, language, parent in entries:
+        try:
+            compiled = re.compile(regex)
+        except re.error as exc:
+            logger.warning("Invalid regex skipped: %r (%s)", regex, exc)
+            continue
         rules.append(
             HeuristicRule(
                 pattern=compiled,
                 category=category,
-                score=score_f,
+                score=score,
                 language=language,
                 parent=parent,
             )
         )
-
     return rules
 
 
+def load_heuristic_rules(path: str | Path) -> list[HeuristicRule]:
+    return _compile_rules(_read_rule_entries(path))
+
+
 def load_heuristic_rules_for_language(
     base_path: str | Path,
     language: str,
@@ -81,25 +163,35 @@ def load_heuristic_rules_for_language(
     Load heuristic rules from base file and, if present, from a per-locale file
     (e.g. heuristic_scores_de.json, heuristic_scores_en.json). Base rules come
     first, then locale-specific rules (same structure as heuristic_scores.json).
+    A locale entry with the same (regex, category, language, parent) as a base entry
+    replaces it in place (locale score wins), so each regex is compiled and scanned once.
     """
     path_obj = Path(base_path)
-    base_rules = load_heuristic_rules(path_obj)
+    base_entries = _read_rule_entries(path_obj)
     lang = (language or "de").strip().lower()
-    if lang not in ("de", "en"):
+    if lang not in _VALID_LANGS:
         lang = "de"
     locale_file = path_obj.parent / f"heuristic_scores_{lang}.json"
     if not locale_file.exists():
-        return base_rules
+        return _compile_rules(base_entries)
     try:
-        locale_rules = load_heuristic_rules(locale_file)
-        return base_rules + locale_rules
+        locale_entries = _read_rule_entries(locale_file)
     except (ValueError, OSError) as exc:
         logger.warning(
             "Could not load locale heuristic file %s: %s. Using base rules only.",
             locale_file.name,
             exc,
         )
-        return base_rules
+        return _compile_rules(base_entries)
+    base_index = {(e[0], e[1], e[3], e[4]): i for i, e in enumerate(base_entries)}
+    merged = list(base_entries)
+    for entry in locale_entries:
+        i = base_index.get((entry[0], entry[1], entry[3], entry[4]))
+        if i is not None:
+            merged[i] = entry
+        else:
+            merged.append(entry)
+    return _compile_rules(merged)
 
 
 def _score_text(
@@ -112,9 +204,16 @@ def _score_text(
     max_score_per_category: float | None = None,
 ) -> dict[str, float]:
     scores: dict[str, float] = {}
+    folded: str | None = None
     for rule in rules:
         if language is not None and rule.language is not None and rule.language != language:
             continue
+        if rule.literals is not None:
+            # Cheap substring prefilter: skip the regex when none of its required literals occur.
+            if folded is None:
+                folded = _fold_for_prefilter(text)
+            if not any(lit in folded for lit in rule.literals):
+                continue
         match = rule.pattern.search(text)
         if not match:
             continue
@@ -130,9 +229,64 @@ def _score_text(
     return scores
 
 
+# Per scorer, scores for this many recent (text, options) are kept: a file's heuristic text is
+# ranked twice (best category, then top-n suggestions for the LLM) but scanned only once.
+SCORE_CACHE_SIZE = 8
+
+_ScoreKey = tuple[str, str | None, float | None, int, float]
+
+
 @dataclass(frozen=True)
 class HeuristicScorer:
     rules: list[HeuristicRule]
+    _parent_keyset: frozenset[str] = field(default=frozenset(), init=False, repr=False, compare=False)
+    _score_cache: OrderedDict[_ScoreKey, dict[str, float]] = field(
+        default_factory=OrderedDict, init=False, repr=False, compare=False
+    )
+    _score_cache_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_parent_keyset", frozenset(self._category_to_parent()))
+
+    def _scores(
+        self,
+        text: str,
+        language: str | None,
+        *,
+        max_score_per_category: float | None,
+        title_weight_region: int,
+        title_weight_factor: float,
+    ) -> dict[str, float]:
+        """_score_text over self.rules, memoized per text and options. The returned dict is shared: read-only."""
+        key = (text, language, max_score_per_category, title_weight_region, title_weight_factor)
+        with self._score_cache_lock:
+            scores = self._score_cache.get(key)
+            if scores is not None:
+                self._score_cache.move_to_end(key)
+                return scores
+        scores = _score_text(
+            text,
+            self.rules,
+            language,
+            title_weight_region=title_weight_region,
+            title_weight_factor=title_weight_factor,
+            max_score_per_category=max_score_per_category,
+        )
+        with self._score_cache_lock:
+            self._score_cache[key] = scores
+            while len(self._score_cache) > SCORE_CACHE_SIZE:
+                self._score_cache.popitem(last=False)
+        return scores
+
+    def _ranked_categories(self, scores: dict[str, float]) -> list[str]:
+        """
+        Categories by score (best first). Tie-break: same score -> prefer category that has
+        a parent (more specific), then first-scored. Plain tuple keys keep comparisons in C.
+        """
+        parents = self._parent_keyset
+        keys = [(score, 1 if c in parents else 0, -i, c) for i, (c, score) in enumerate(scores.items())]
+        keys.sort(reverse=True)
+        return [k[3] for k in keys]
 
     def best_category(
         self,
@@ -163,23 +317,16 @@ class HeuristicScorer:
         """
         if text is None or not isinstance(text, str):
             return ("unknown", 0.0, "unknown", 0.0)
-        scores = _score_text(
+        scores = self._scores(
             text,
-            self.rules,
             language,
+            max_score_per_category=max_score_per_category,
             title_weight_region=title_weight_region,
             title_weight_factor=title_weight_factor,
-            max_score_per_category=max_score_per_category,
         )
         if not scores:
             return ("unknown", 0.0, "unknown", 0.0)
-        parents = self._category_to_parent()
-        # Tie-break: same score -> prefer category that has a parent (more specific)
-        sorted_cats = sorted(
-            scores,
-            key=lambda c: (scores[c], 1 if c in parents else 0),
-            reverse=True,
-        )
+        sorted_cats = self._ranked_categories(scores)
         best_cat = sorted_cats[0]
         best_score = scores[best_cat]
         runner_up_cat = sorted_cats[1] if len(sorted_cats) > 1 else "unknown"
@@ -220,22 +367,16 @@ class HeuristicScorer:
         """Return up to n category names by score (best first). No min_score_gap."""
         if not text or not isinstance(text, str) or n <= 0:
             return []
-        scores = _score_text(
+        scores = self._scores(
             text,
-            self.rules,
             language,
+            max_score_per_category=max_score_per_category,
             title_weight_region=title_weight_region,
             title_weight_factor=title_weight_factor,
-            max_score_per_category=max_score_per_category,
         )
         if not scores:
             return []
-        parents = self._category_to_parent()
-        sorted_cats = sorted(
-            scores,
-            key=lambda c: (scores[c], 1 if c in parents else 0),
-            reverse=True,
-        )
+        sorted_cats = self._ranked_categories(scores)
         return sorted_cats[:n]
 
     def all_categories(self) -> frozenset[str]:
@@ -285,9 +426,8 @@ def _load_category_aliases() -> dict[str, str]:
 
         path = category_aliases_path()
         if path.exists():
-            raw = path.read_text(encoding="utf-8")
-            data = json.loads(raw)
-            aliases = data.get("aliases")
+            data = json_loads(path.read_bytes())
+            aliases = data.get("aliases") if isinstance(data, dict) else None
             if not isinstance(aliases, dict):
                 aliases = {}
             norm = {str(k).strip().lower().replace(" ", "_"): str(v) for k, v in aliases.items() if k and v}
@@ -310,17 +450,23 @@ def normalize_llm_category(cat_llm: str | None, *, _aliases: dict[str, str] | No
     return aliases.get(key, cat_llm)
 
 
+_OVERLAP_SPLIT_RE = re.compile(r"[\s_]+")
+
+
 def _tokenize_for_overlap(text: str) -> set[str]:
     """Lowercase token set from category or context (split on whitespace and _)."""
     if not text or not isinstance(text, str):
         return set()
-    tokens = re.split(r"[\s_]+", text.lower())
+    tokens = _OVERLAP_SPLIT_RE.split(text.lower())
     return {t for t in tokens if t and t.isalnum()}
 
 
 def _overlap_count(category_tokens: set[str], context_tokens: set[str]) -> int:
     """Number of category tokens that appear in context (for conflict resolution)."""
-    return len(category_tokens & context_tokens)
+    # Probe the smaller set against the larger one instead of materializing the intersection.
+    if len(category_tokens) > len(context_tokens):
+        category_tokens, context_tokens = context_tokens, category_tokens
+    return sum(1 for t in category_tokens if t in context_tokens)
 
 
 _embedding_model: object = None
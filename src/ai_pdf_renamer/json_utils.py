@@ -0,0 +1,50 @@
+"""
+JSON encode/decode with orjson when installed (optional [speedups]), stdlib json otherwise.
+
+orjson is stricter than json (e.g. lone surrogates from broken PDF text); wherever it refuses
+input, these helpers fall back to the stdlib, so results never depend on the extra.
+"""
+
+from __future__ import annotations
+
+import json
+from types import ModuleType
+
+_orjson: ModuleType | None
+try:
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - optional [speedups]
+    _orjson = None
+
+
+def json_loads(data: str | bytes) -> object:
+    """Parse JSON text or bytes; raises json.JSONDecodeError (or UnicodeDecodeError for bad bytes)."""
+    if _orjson is not None:
+        try:
+            value: object = _orjson.loads(data)
+            return value
+        except _orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def json_dumps_bytes(payload: object) -> bytes:
+    """Compact JSON bytes for the wire; the stdlib fallback escapes non-ASCII (ensure_ascii)."""
+    if _orjson is not None:
+        try:
+            encoded: bytes = _orjson.dumps(payload)
+            return encoded
+        except TypeError:
+            pass
+    return json.dumps(payload, separators=(",", ":")).encode("ascii")
+
+
+def json_dumps_text(payload: object) -> str:
+    """One-line JSON string (log lines); non-ASCII is kept as is."""
+    if _orjson is not None:
+        try:
+            encoded: bytes = _orjson.dumps(payload)
+            return encoded.decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(payload, ensure_ascii=False)
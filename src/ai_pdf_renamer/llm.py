@@ -1,18 +1,72 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
+import random
 import re
-from dataclasses import dataclass
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import pairwise
+from typing import TypedDict
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from .json_utils import json_dumps_bytes as _dumps_json_bytes
+from .json_utils import json_loads as _loads_json
+from .llm_cache import LLMResponseCache, chunk_summary_cache_key, llm_cache_key
+from .pdf_extract import chunk_text_by_tokens
 from .text_utils import chunk_text
 
 logger = logging.getLogger(__name__)
 
 # Session per base_url for connection reuse across multiple complete() calls.
 _llm_sessions: dict[str, requests.Session] = {}
+_llm_sessions_lock = threading.Lock()
+
+# Keep-alive connections per session; enough for --workers (times race_prompts) plus the
+# CHUNK_SUMMARY_MAX_PARALLEL chunk requests. Beyond this, extra connections are opened but not kept.
+LLM_POOL_MAXSIZE = 32
+
+
+def _get_session(base_url: str) -> requests.Session:
+    """
+    Return the shared Session for base_url, creating it on first use. The mounted adapter
+    keeps up to LLM_POOL_MAXSIZE keep-alive connections and does no transport-level
+    retries (complete_json_with_retry handles retrying).
+    """
+    session = _llm_sessions.get(base_url)
+    if session is not None:
+        return session
+    with _llm_sessions_lock:
+        session = _llm_sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            session.trust_env = False
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=LLM_POOL_MAXSIZE,
+                pool_block=False,
+                max_retries=Retry(total=0),
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+            _llm_sessions[base_url] = session
+    return session
+
+
+_DECODER = json.JSONDecoder()
+
+# Code fence: ```json ... ``` or ``` ... ```
+_CODE_FENCE_RE = re.compile(r"```(?:json)?\s*\n?(.*?)```", re.DOTALL | re.IGNORECASE)
 
 
 def _extract_json_from_response(response: str) -> str:
@@ -26,11 +80,7 @@ def _extract_json_from_response(response: str) -> str:
         return text
 
     # Code fence: ```json ... ``` or ``` ... ```
-    code_fence = re.search(
-        r"```(?:json)?\s*\n?(.*?)```",
-        text,
-        re.DOTALL | re.IGNORECASE,
-    )
+    code_fence = _CODE_FENCE_RE.search(text)
     if code_fence:
         candidate = code_fence.group(1).strip()
         if candidate.startswith("{"):
@@ -41,29 +91,100 @@ def _extract_json_from_response(response: str) -> str:
     if start == -1:
         return text
 
-    # Find matching closing brace (simple stack-based).
+    # Common case: a valid object starts there; the C scanner finds its end in one call.
+    try:
+        _obj, end = _DECODER.raw_decode(text, start)
+        return text[start:end]
+    except json.JSONDecodeError:
+        pass
+
+    # Malformed JSON: find the matching closing brace, stepping over string literals.
+    end = _matching_brace_end(text, start)
+    return text[start:end] if end != -1 else text[start:]
+
+
+def _matching_brace_end(text: str, start: int) -> int:
+    """
+    Index just past the brace closing the one at text[start], skipping braces inside strings;
+    -1 if it never closes. Jumps between structural characters with str.find, so the Python
+    loop runs once per brace/string rather than once per character.
+    """
     depth = 0
-    i = start
-    while i < len(text):
-        if text[i] == "{":
+    opening = text.find("{", start)
+    closing = text.find("}", start)
+    quote = text.find('"', start)
+    while True:
+        pos = min((p for p in (opening, closing, quote) if p != -1), default=-1)
+        if pos == -1:
+            return -1
+        if pos == quote:
+            after = _json_string_end(text, pos + 1)
+            if after == -1:
+                return -1
+            if opening != -1 and opening < after:
+                opening = text.find("{", after)
+            if closing != -1 and closing < after:
+                closing = text.find("}", after)
+            quote = text.find('"', after)
+        elif pos == opening:
             depth += 1
-        elif text[i] == "}":
+            opening = text.find("{", pos + 1)
+        else:
             depth -= 1
             if depth == 0:
-                return text[start : i + 1]
-        elif text[i] == '"':
-            # Skip string content to avoid counting braces inside strings.
-            i += 1
-            while i < len(text):
-                if text[i] == "\\" and i + 1 < len(text):
-                    i += 2
-                    continue
-                if text[i] == '"':
-                    break
-                i += 1
-        i += 1
+                return pos + 1
+            closing = text.find("}", pos + 1)
+
+
+def _json_string_end(text: str, content_start: int) -> int:
+    """Index just past the quote closing a string whose content starts at content_start; -1 if unterminated."""
+    i = content_start
+    while True:
+        q = text.find('"', i)
+        if q == -1:
+            return -1
+        # The quote is escaped iff an odd run of backslashes precedes it.
+        b = q
+        while b > content_start and text[b - 1] == "\\":
+            b -= 1
+        if (q - b) % 2 == 0:
+            return q + 1
+        i = q + 1
+
+
+def _escape_unescaped_quotes(value: str) -> str:
+    """Backslash-escape every double quote not already preceded by a backslash (single pass, no regex)."""
+    if '"' not in value:
+        return value
+    if "\\" not in value:
+        # No escapes at all (the usual case): every quote is bare.
+        return value.replace('"', '\\"')
+    parts = value.split('"')
+    out = [parts[0]]
+    for prev, part in pairwise(parts):
+        # An empty piece means the preceding character is another quote, never a backslash.
+        out.append('"' if prev.endswith("\\") else '\\"')
+        out.append(part)
+    return "".join(out)
 
-    return text[start:]
+
+_MIN_QUOTES_TO_SANITIZE = 5
+
+
+def _last_unescaped_quote(text: str, start: int, end: int) -> int:
+    """
+    Index of the last " in text[start:end] not escaped by a backslash, else -1. Scans backwards
+    with str.rfind; a quote counts as escaped when an odd run of backslashes precedes it.
+    """
+    quote = text.rfind('"', start, end)
+    while quote != -1:
+        run_start = quote
+        while run_start > start and text[run_start - 1] == "\\":
+            run_start -= 1
+        if (quote - run_start) % 2 == 0:
+            return quote
+        quote = text.rfind('"', start, run_start)
+    return -1
 
 
 def _sanitize_json_string_value(response: str, *, key: str) -> str:
@@ -71,21 +192,17 @@ def _sanitize_json_string_value(response: str, *, key: str) -> str:
     Attempts to escape unescaped quotes inside a JSON string value for `key`.
     This is a best-effort fix for common LLM formatting issues.
     """
-    # Fast-path regex replacement for common cases where the JSON is almost valid.
-    pattern = r'("' + re.escape(key) + r'":\s*")(.*?)(")'
-
-    def replacer(match: re.Match[str]) -> str:
-        prefix, value, suffix = match.groups()
-        fixed_value = re.sub(r'(?<!\\)"', r'\\"', value)
-        return prefix + fixed_value + suffix
-
-    sanitized = re.sub(pattern, replacer, response, flags=re.DOTALL)
-
-    # If the string is still malformed because unescaped quotes prematurely closed the
-    # value, try a best-effort salvage assuming a single-key JSON object.
+    # Unescaped quotes prematurely close the value; salvage it assuming a single-key JSON object.
+    # (A '"key": "<non-greedy>"' regex pass cannot help here: its value group stops at the first
+    # quote, so it never contains one to escape.)
     #
     # This is intentionally conservative and only aims to support the script's
     # prompts, which ask for JSON objects with a single string field.
+    sanitized = response
+    # Key, opening and closing value quote plus at least one bare quote inside the value.
+    # (Quote parity is no signal: two embedded quotes keep the count even.)
+    if response.count('"') < _MIN_QUOTES_TO_SANITIZE:
+        return sanitized
     key_idx = sanitized.find(f'"{key}"')
     if key_idx == -1:
         return sanitized
@@ -103,32 +220,35 @@ def _sanitize_json_string_value(response: str, *, key: str) -> str:
         return sanitized
 
     # Find closing quote: the last unescaped " before } (respects \" in value).
-    i = first_quote + 1
-    last_quote = -1
-    while i < close_brace and i < len(sanitized):
-        if sanitized[i] == "\\" and i + 1 < len(sanitized):
-            i += 2
-            continue
-        if sanitized[i] == '"':
-            last_quote = i
-        i += 1
+    last_quote = _last_unescaped_quote(sanitized, first_quote + 1, close_brace)
     if last_quote <= first_quote:
         return sanitized
 
     raw_value = sanitized[first_quote + 1 : last_quote]
     # Escape only unescaped quotes so existing \" is preserved.
-    fixed_value = re.sub(r'(?<!\\)"', r'\\"', raw_value)
-    return sanitized[: first_quote + 1] + fixed_value + sanitized[last_quote:]
+    fixed_value = _escape_unescaped_quotes(raw_value)
+    if fixed_value == raw_value:
+        return sanitized
+    return "".join((sanitized[: first_quote + 1], fixed_value, sanitized[last_quote:]))
+
+
+@lru_cache(maxsize=32)
+def _lenient_pattern(key: str) -> re.Pattern[str]:
+    """Match "key":"value" with value possibly containing escaped quotes."""
+    return re.compile(r'"' + re.escape(key) + r'"\s*:\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+
+
+@lru_cache(maxsize=32)
+def _single_key_pattern(key: str) -> re.Pattern[str]:
+    """Start of an object whose first member is the string field key."""
+    return re.compile(r'^\s*\{\s*"' + re.escape(key) + r'"\s*:\s*"', re.DOTALL)
 
 
 def _lenient_extract_key_value(text: str, key: str) -> str | None:
     """Best-effort extraction of a string value for key from text that may not be valid JSON."""
-    # Match "key":"value" with value possibly containing escaped quotes.
-    pattern = re.compile(
-        r'"' + re.escape(key) + r'"\s*:\s*"((?:[^"\\]|\\.)*)"',
-        re.DOTALL,
-    )
-    m = pattern.search(text)
+    if f'"{key}"' not in text:
+        return None
+    m = _lenient_pattern(key).search(text)
     if m is None:
         return None
     raw = m.group(1)
@@ -139,41 +259,92 @@ def _lenient_extract_key_value(text: str, key: str) -> str | None:
     return unescaped or None
 
 
-def parse_json_field(response: str | None, *, key: str, lenient: bool = False) -> str | list[str] | None:
-    if response is None:
-        return None
-    if not isinstance(response, str):
-        return None
+@lru_cache(maxsize=8)
+def _model_prompt_prefix(model: str, prompt: str) -> bytes:
+    """'{"model":...,"prompt":...' without the closing brace; reused by retries of the same prompt."""
+    return _dumps_json_bytes({"model": model, "prompt": prompt})[:-1]
+
+
+def _completion_body(model: str, prompt: str, temperature: float, max_tokens: int | None, stream: bool) -> bytes:
+    """
+    Request body for /v1/completions. The (possibly very long) prompt is serialized once per
+    (model, prompt); retries that only change the temperature just append the small options object.
+    """
+    options: dict[str, object] = {"temperature": temperature}
+    if max_tokens is not None:
+        options["max_tokens"] = max_tokens
+    if stream:
+        options["stream"] = True
+    return _model_prompt_prefix(model, prompt) + b"," + _dumps_json_bytes(options)[1:]
+
+
+@lru_cache(maxsize=128)
+def _decoded_response(response: str) -> tuple[str, object]:
+    """
+    Key-independent part of parse_json_field: the JSON slice of response ("" if there is none)
+    and its decoded value (None if invalid). Cached because the same response is often parsed
+    for several keys (fused metadata fallback) or again after a retry returned it unchanged.
+    Callers must not mutate the returned value.
+    """
     resp_str = response.strip()
     if not resp_str:
-        return None
-    # Normalize: extract JSON from code fences or leading prose.
-    if not resp_str.startswith("{"):
+        return ("", None)
+    # Clean "{...}" answers go straight to the decoder; only others are searched for a JSON slice
+    # (code fences, leading prose).
+    if resp_str[0] != "{":
         extracted = _extract_json_from_response(resp_str)
-        if extracted.startswith("{"):
-            resp_str = extracted
-        else:
-            if lenient:
-                val = _lenient_extract_key_value(resp_str, key)
-                if val is not None and val.strip() and val.strip().lower() != "na":
-                    return val.strip()
-            return None
-
+        if not extracted.startswith("{"):
+            return ("", None)
+        resp_str = extracted
     try:
-        data = json.loads(resp_str)
+        data = _loads_json(resp_str)
     except json.JSONDecodeError:
+        data = _decode_leading_object(resp_str)
+    return (resp_str, data)
+
+
+def parse_json_field(
+    response: str | None,
+    *,
+    key: str,
+    lenient: bool = False,
+    prefetched: dict[str, object] | None = None,
+) -> str | list[str] | None:
+    """
+    Extract field `key` from an LLM JSON response. `prefetched` is the object already parsed
+    from this response (see _complete_json_parsed); when given, the response is not re-parsed.
+    """
+    if prefetched is not None:
+        return _clean_field_value(prefetched.get(key))
+    if not isinstance(response, str):
+        return None
+    resp_str, data = _decoded_response(response)
+    if not resp_str:
+        if lenient:
+            val = _lenient_extract_key_value(response.strip(), key)
+            if val is not None and val.strip() and val.strip().lower() != "na":
+                return val.strip()
+        return None
+    if data is None:
         # Only salvage when response looks like a single-key string object (avoids corrupting lists/multi-key).
-        single_key_pattern = re.compile(r'^\s*\{\s*"' + re.escape(key) + r'"\s*:\s*"', re.DOTALL)
-        if not single_key_pattern.match(resp_str):
+        if not _single_key_pattern(key).match(resp_str):
             logger.warning("LLM response could not be parsed as JSON; using fallback")
             return None
         try:
-            data = json.loads(_sanitize_json_string_value(resp_str, key=key))
+            # Quote salvage can only produce valid JSON for a complete object; skip it for truncated output.
+            if not resp_str.endswith("}"):
+                raise json.JSONDecodeError("truncated object", resp_str, len(resp_str))
+            sanitized = _sanitize_json_string_value(resp_str, key=key)
+            # Unchanged means nothing to escape; it would fail to decode again.
+            if sanitized is resp_str:
+                raise json.JSONDecodeError("nothing to salvage", resp_str, 0)
+            data = _loads_json(sanitized)
         except json.JSONDecodeError:
             extracted = _extract_json_from_response(response)
-            if extracted.startswith("{"):
+            # The same slice as resp_str has already failed to decode.
+            if extracted.startswith("{") and extracted != resp_str:
                 try:
-                    data = json.loads(extracted)
+                    data = _loads_json(extracted)
                 except json.JSONDecodeError:
                     logger.warning("LLM response could not be parsed as JSON; using fallback")
                     return None
@@ -181,7 +352,22 @@ def parse_json_field(response: str | None, *, key: str, lenient: bool = False) -
                 logger.warning("LLM response could not be parsed as JSON; using fallback")
                 return None
 
-    value = data.get(key)
+    if not isinstance(data, dict):
+        return None
+    return _clean_field_value(data.get(key))
+
+
+def _decode_leading_object(text: str) -> object:
+    """Decode the JSON value at the start of text, ignoring anything after it (e.g. trailing prose); None if invalid."""
+    try:
+        data, _end = _DECODER.raw_decode(text)
+    except json.JSONDecodeError:
+        return None
+    return data
+
+
+def _clean_field_value(value: object) -> str | list[str] | None:
+    """Normalize a parsed JSON field: stripped non-empty string (not 'na') or list of strings."""
     if isinstance(value, list):
         if all(isinstance(x, str) for x in value):
             cleaned = [x.strip() for x in value if x and x.strip()]
@@ -201,8 +387,21 @@ def parse_json_field(response: str | None, *, key: str, lenient: bool = False) -
 CONTEXT_128K_MAX_CHARS_SINGLE = 480_000  # ~120K tokens at ~4 chars/token
 CONTEXT_128K_CHUNK_SIZE = 100_000
 CONTEXT_128K_CHUNK_OVERLAP = 5_000
+# The same budget in tokens, used when tiktoken is installed: chunks then fill the window
+# exactly instead of guessing ~4 chars/token (dense German text needs fewer, larger chunks).
+CONTEXT_128K_CHUNK_TOKENS = 25_000
+CONTEXT_128K_CHUNK_OVERLAP_TOKENS = 1_250
+
+# --summary-from-title only looks for a title line within this many leading characters.
+TITLE_SHORTCUT_SCAN_CHARS = 500
 
+# Max chunk-summary requests in flight per LLM server, shared by all documents being processed.
+CHUNK_SUMMARY_MAX_PARALLEL = 4
 
+_chunk_semaphores: dict[str, threading.BoundedSemaphore] = {}
+
+
+@lru_cache(maxsize=64)
 def _summary_doc_type_hint(language: str, suggested_doc_type: str | None) -> str:
     """Build doc-type hint prefix for summary prompts."""
     if not suggested_doc_type or not suggested_doc_type.strip():
@@ -219,75 +418,137 @@ def _summary_doc_type_hint(language: str, suggested_doc_type: str | None) -> str
     )
 
 
+# Prompt templates (str.format). Static instructions come first; {hint} is the per-document
+# doc-type hint and {text} the document text. Literal JSON braces are doubled.
+_DE_SUMMARY_PROMPTS: tuple[str, ...] = (
+    'Fasse den folgenden Text in 1–2 präzisen Sätzen zusammen. Nur reines JSON: {{"summary":"..."}}\n\n{hint}{text}',
+    "Erstelle bitte eine 1–2 Sätze Zusammenfassung als JSON "
+    '{{"summary":"..."}}, ohne weitere Erklärungen.\n\n{hint}{text}',
+    '{hint}Text:\n{text}\n\nGib jetzt nur {{"summary":"..."}} zurück. Keine Entschuldigungen, keine Erklärungen!',
+    'Achtung! Ich brauche reines JSON in der Form {{"summary":"..."}}. {hint}Hier der Text:\n\n{text}',
+)
+_EN_SUMMARY_PROMPTS: tuple[str, ...] = (
+    'Summarize the following text in 1–2 concise sentences. Return ONLY JSON: {{"summary":"..."}}\n\n{hint}{text}',
+)
+_DE_COMBINE_PROMPT = (
+    "{hint}Hier mehrere Teilzusammenfassungen eines langen Dokuments:\n{text}"
+    "\n\nFasse sie in 1–2 prägnanten Sätzen zusammen. "
+    "Stelle sicher, dass der Dokumenttyp erkennbar bleibt. "
+    'Nur reines JSON {{"summary":"..."}}.\n'
+)
+_EN_COMBINE_PROMPT = (
+    "{hint}Here are multiple partial summaries of a large document:\n{text}"
+    "\n\nCombine them into 1–2 concise sentences. "
+    "Ensure the document type remains clear. "
+    'Return ONLY {{"summary":"..."}} in JSON.\n'
+)
+
+
 def _summary_prompts_short(language: str, doc_type_hint: str, text: str) -> list[str]:
-    """Build list of prompts for short-text single-shot summary."""
-    if language == "de":
-        return [
-            doc_type_hint
-            + "Fasse den folgenden Text in 1–2 präzisen Sätzen zusammen. "
-            + 'Nur reines JSON: {"summary":"..."}\n\n'
-            + text,
-            doc_type_hint
-            + "Erstelle bitte eine 1–2 Sätze Zusammenfassung als JSON "
-            + '{"summary":"..."}, ohne weitere Erklärungen.\n\n'
-            + text,
-            doc_type_hint
-            + "Text:\n"
-            + text
-            + '\n\nGib jetzt nur {"summary":"..."} zurück. '
-            + "Keine Entschuldigungen, keine Erklärungen!",
-            doc_type_hint
-            + 'Achtung! Ich brauche reines JSON in der Form {"summary":"..."}. '
-            + "Hier der Text:\n\n"
-            + text,
-        ]
-    return [
-        doc_type_hint
-        + "Summarize the following text in 1–2 concise sentences. "
-        + 'Return ONLY JSON: {"summary":"..."}\n\n'
-        + text,
-    ]
+    """Build list of prompts for short-text single-shot summary (static instructions first)."""
+    templates = _DE_SUMMARY_PROMPTS if language == "de" else _EN_SUMMARY_PROMPTS
+    return [t.format(hint=doc_type_hint, text=text) for t in templates]
+
+
+# Static instruction prefixes for chunk prompts. Per-document content (doc-type hint, chunk text)
+# only follows the prefix, so the server can reuse its KV cache for the prefix across chunks.
+CHUNK_PROMPT_TEXT_DELIMITER = "\n---\nTEXT:\n"
+DE_CHUNK_PROMPT_PREFIX = (
+    'Fasse den folgenden Text in 1–2 kurzen Sätzen zusammen. NUR reines JSON {"summary":"..."}, keine Erklärungen.\n'
+)
+EN_CHUNK_PROMPT_PREFIX = (
+    'Summarize the following text in 1–2 short sentences. Return ONLY {"summary":"..."} in JSON, no explanations.\n'
+)
+
+
+@lru_cache(maxsize=64)
+def _chunk_prompt_head(language: str, doc_type_hint: str) -> str:
+    """Everything before the chunk text; built once per (language, hint), not once per chunk."""
+    prefix = DE_CHUNK_PROMPT_PREFIX if language == "de" else EN_CHUNK_PROMPT_PREFIX
+    return prefix + doc_type_hint + CHUNK_PROMPT_TEXT_DELIMITER
 
 
 def _summary_prompt_chunk(language: str, doc_type_hint: str, chunk: str) -> str:
-    """Build prompt for one chunk in long-document summary."""
-    if language == "de":
-        return (
-            doc_type_hint + "Fasse den folgenden Text in 1–2 kurzen Sätzen zusammen. "
-            'NUR reines JSON {"summary":"..."}, keine Erklärungen.\n\n' + chunk
-        )
-    return (
-        doc_type_hint + "Summarize the following text in 1–2 short sentences. "
-        'Return ONLY {"summary":"..."} in JSON, no explanations.\n\n' + chunk
-    )
+    """Build prompt for one chunk in long-document summary (static prefix first)."""
+    return _chunk_prompt_head(language, doc_type_hint) + chunk
 
 
 def _summary_prompt_combine(language: str, doc_type_hint: str, combined: str) -> str:
     """Build prompt to combine partial summaries into one."""
-    if language == "de":
-        return (
-            doc_type_hint
-            + "Hier mehrere Teilzusammenfassungen eines langen Dokuments:\n"
-            + combined
-            + "\n\nFasse sie in 1–2 prägnanten Sätzen zusammen. "
-            "Stelle sicher, dass der Dokumenttyp erkennbar bleibt. "
-            'Nur reines JSON {"summary":"..."}.\n'
-        )
-    return (
-        doc_type_hint
-        + "Here are multiple partial summaries of a large document:\n"
-        + combined
-        + "\n\nCombine them into 1–2 concise sentences. "
-        "Ensure the document type remains clear. "
-        'Return ONLY {"summary":"..."} in JSON.\n'
-    )
+    template = _DE_COMBINE_PROMPT if language == "de" else _EN_COMBINE_PROMPT
+    return template.format(hint=doc_type_hint, text=combined)
+
 
+class LLMNetworkError(RuntimeError):
+    """LLM endpoint unreachable, timed out or temporarily failing (HTTP 429/5xx)."""
 
-@dataclass(frozen=True)
+
+# HTTP statuses worth retrying after a pause (server overloaded or restarting).
+_RETRYABLE_HTTP_STATUS = frozenset({429, 500, 502, 503, 504})
+# Base delay for jittered exponential backoff between network retries: uniform(0, base * 2**n).
+LLM_BACKOFF_BASE_S = 0.25
+
+# In-process LRU of deterministic completions, in front of the optional persistent cache.
+# Keys hold a 16-byte prompt digest rather than the prompt so memory stays bounded.
+LLM_MEMORY_CACHE_SIZE = 1024
+_MemoryKey = tuple[str, str, str, int | None]
+_memory_cache: OrderedDict[_MemoryKey, str] = OrderedDict()
+_memory_cache_lock = threading.Lock()
+# Keys whose completion is being requested right now; identical concurrent prompts wait on the
+# first request instead of sending their own (guarded by _memory_cache_lock).
+_memory_inflight: dict[_MemoryKey, threading.Event] = {}
+
+
+def _memory_cache_key(base_url: str, model: str, prompt: str, max_tokens: int | None) -> _MemoryKey:
+    digest = hashlib.blake2b(prompt.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+    return (base_url, model, digest, max_tokens)
+
+
+def _memory_cache_get(key: _MemoryKey) -> str | None:
+    with _memory_cache_lock:
+        hit = _memory_cache.get(key)
+        if hit is not None:
+            _memory_cache.move_to_end(key)
+        return hit
+
+
+def _memory_cache_set(key: _MemoryKey, value: str) -> None:
+    with _memory_cache_lock:
+        _memory_cache[key] = value
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > LLM_MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def _memory_cache_claim(key: _MemoryKey) -> threading.Event | None:
+    """
+    Claim key for one request. Returns None when the caller now owns it (and must call
+    _memory_cache_release), else the Event set once the owning request finishes.
+    """
+    with _memory_cache_lock:
+        pending = _memory_inflight.get(key)
+        if pending is None:
+            _memory_inflight[key] = threading.Event()
+        return pending
+
+
+def _memory_cache_release(key: _MemoryKey) -> None:
+    with _memory_cache_lock:
+        pending = _memory_inflight.pop(key, None)
+    if pending is not None:
+        pending.set()
+
+
+@dataclass(frozen=True, slots=True)
 class LocalLLMClient:
     base_url: str = "http://127.0.0.1:11434/v1/completions"
     model: str = "qwen3:8b"
     timeout_s: float = 60.0
+    # Optional persistent cache; only deterministic (temperature == 0) completions are cached
+    # (always in memory, see LLM_MEMORY_CACHE_SIZE; on disk only when this is set).
+    cache: LLMResponseCache | None = field(default=None, repr=False, compare=False)
+    # Stream the completion and stop reading as soon as the first JSON object is complete.
+    stream_json: bool = False
 
     def complete(
         self,
@@ -295,70 +556,205 @@ class LocalLLMClient:
         *,
         temperature: float = 0.0,
         max_tokens: int | None = None,
+        raise_on_network_error: bool = False,
+    ) -> str:
+        """
+        Return the completion text, or "" on any failure. With raise_on_network_error, connection
+        errors, timeouts and 429/5xx responses raise LLMNetworkError instead (so callers can back off).
+        """
+        try:
+            if temperature != 0.0 or LLM_MEMORY_CACHE_SIZE <= 0:
+                return self._complete_uncached(prompt, temperature=temperature, max_tokens=max_tokens)
+            mem_key = _memory_cache_key(self.base_url, self.model, prompt, max_tokens)
+            hit = _memory_cache_get(mem_key)
+            if hit is not None:
+                return hit
+            pending = _memory_cache_claim(mem_key)
+            if pending is not None:
+                # Same prompt already on its way; reuse its answer. If it failed or came back
+                # empty, fall through and ask on our own.
+                pending.wait(self.timeout_s)
+                hit = _memory_cache_get(mem_key)
+                if hit is not None:
+                    return hit
+                return self._complete_cached(prompt, mem_key, temperature=temperature, max_tokens=max_tokens)
+            try:
+                return self._complete_cached(prompt, mem_key, temperature=temperature, max_tokens=max_tokens)
+            finally:
+                _memory_cache_release(mem_key)
+        except LLMNetworkError as exc:
+            if raise_on_network_error:
+                raise
+            logger.error(
+                "LLM unreachable (%s). Category/summary will use heuristic or 'na' for this document.",
+                exc,
+            )
+            return ""
+
+    def _complete_cached(
+        self,
+        prompt: str,
+        mem_key: _MemoryKey,
+        *,
+        temperature: float,
+        max_tokens: int | None,
+    ) -> str:
+        """Deterministic completion via the persistent cache (if any), filling the memory cache."""
+        key = llm_cache_key(self.model, prompt, temperature, max_tokens) if self.cache is not None else ""
+        if self.cache is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                _memory_cache_set(mem_key, hit)
+                return hit
+        text = self._complete_uncached(prompt, temperature=temperature, max_tokens=max_tokens)
+        if text:
+            _memory_cache_set(mem_key, text)
+            if self.cache is not None:
+                self.cache.set(key, text)
+        return text
+
+    async def complete_async(
+        self,
+        prompt: str,
+        *,
+        temperature: float = 0.0,
+        max_tokens: int | None = None,
     ) -> str:
-        payload: dict[str, object] = {
-            "model": self.model,
-            "prompt": prompt,
-            "temperature": temperature,
-        }
-        if max_tokens is not None:
-            payload["max_tokens"] = max_tokens
+        """
+        Awaitable complete(): runs the blocking request in the default executor so callers can
+        asyncio.gather many prompts. Connections still come from the shared pooled Session.
+        """
+        return await asyncio.to_thread(self.complete, prompt, temperature=temperature, max_tokens=max_tokens)
+
+    def _complete_uncached(
+        self,
+        prompt: str,
+        *,
+        temperature: float,
+        max_tokens: int | None,
+    ) -> str:
+        body = _completion_body(self.model, prompt, temperature, max_tokens, self.stream_json)
         try:
-            session = _llm_sessions.get(self.base_url)
-            if session is None:
-                session = requests.Session()
-                _llm_sessions[self.base_url] = session
-            resp = session.post(
+            if self.stream_json:
+                return self._stream_until_json_closes(body)
+            resp = _get_session(self.base_url).post(
                 self.base_url,
-                json=payload,
+                data=body,
                 timeout=self.timeout_s,
-                trust_env=False,
             )
             resp.raise_for_status()
-            data = resp.json()
-            if not isinstance(data, dict):
-                logger.warning("LLM response is not a dict: %s", type(data).__name__)
-                return ""
-            choices = data.get("choices")
-            if not isinstance(choices, list) or len(choices) == 0:
-                logger.warning(
-                    "LLM response missing or empty 'choices' (status=%s)",
-                    getattr(resp, "status_code", None),
-                )
-                return ""
-            first_choice = choices[0]
-            if not isinstance(first_choice, dict):
+            data = _loads_json(resp.content)
+            try:
+                text = data["choices"][0]["text"]  # type: ignore[index]
+            except (KeyError, IndexError, TypeError):
                 logger.warning(
-                    "LLM response 'choices[0]' is not a dict: %s",
-                    type(first_choice).__name__,
+                    "LLM response has no 'choices[0].text' (status=%s, type=%s)",
+                    resp.status_code,
+                    type(data).__name__,
                 )
                 return ""
-            text = first_choice.get("text", "")
             return str(text).strip() if text is not None else ""
         except (IndexError, AttributeError, TypeError, KeyError) as exc:
             logger.warning("LLM response structure unexpected: %s", exc)
             return ""
         except requests.HTTPError as exc:
+            status = getattr(exc.response, "status_code", None)
+            if status in _RETRYABLE_HTTP_STATUS:
+                raise LLMNetworkError(f"LLM server busy or failing (status={status}): {exc}") from exc
             logger.warning(
                 "LLM HTTP error: %s (status=%s, body=%s)",
                 exc,
-                getattr(exc.response, "status_code", None),
+                status,
                 (getattr(exc.response, "text", None) or "")[:500],
             )
             return ""
         except requests.RequestException as exc:
-            logger.error(
-                "LLM unreachable (%s). Category/summary will use heuristic or 'na' for this document.",
-                exc,
-            )
-            return ""
-        except json.JSONDecodeError as exc:
+            raise LLMNetworkError(str(exc)) from exc
+        except (json.JSONDecodeError, UnicodeDecodeError) as exc:
             logger.error(
                 "LLM response not valid JSON: %s. Using fallback for this document.",
                 exc,
             )
             return ""
 
+    def _stream_until_json_closes(self, body: bytes) -> str:
+        """
+        Post body (built with stream=True) and accumulate the server-sent text deltas. The stream
+        is closed as soon as the first top-level JSON object is complete, so trailing explanation
+        tokens are never generated. Errors propagate to _complete_uncached's handlers.
+        """
+        detector = _JsonObjectCloseDetector()
+        parts: list[str] = []
+        resp = _get_session(self.base_url).post(
+            self.base_url,
+            data=body,
+            timeout=self.timeout_s,
+            stream=True,
+        )
+        try:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                event = _loads_json(data)
+                if not isinstance(event, dict):
+                    continue
+                choices = event.get("choices")
+                if not isinstance(choices, list) or not choices or not isinstance(choices[0], dict):
+                    continue
+                delta = choices[0].get("text") or ""
+                if not isinstance(delta, str) or not delta:
+                    continue
+                parts.append(delta)
+                if detector.feed(delta):
+                    break
+        finally:
+            resp.close()
+        return "".join(parts).strip()
+
+
+# Characters that can change _JsonObjectCloseDetector's state.
+_JSON_STRUCTURAL_CHAR = re.compile(r'[{}"\\]')
+
+
+class _JsonObjectCloseDetector:
+    """Incremental brace counter that ignores braces inside JSON strings."""
+
+    __slots__ = ("depth", "in_string", "escape")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, delta: str) -> bool:
+        """Consume more text; True once the first top-level object has closed."""
+        # Most streamed deltas are plain word pieces: skip the per-character walk for them.
+        if not self.escape and _JSON_STRUCTURAL_CHAR.search(delta) is None:
+            return False
+        for ch in delta:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                # Quotes before the first "{" (prose) are not JSON strings.
+                if self.depth > 0:
+                    self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
 
 def complete_json_with_retry(
     client: LocalLLMClient,
@@ -368,31 +764,113 @@ def complete_json_with_retry(
     max_retries: int = 3,
     max_tokens: int | None = 1024,
 ) -> str:
+    return _complete_json_parsed(
+        client,
+        prompt,
+        temperature=temperature,
+        max_retries=max_retries,
+        max_tokens=max_tokens,
+    )[0]
+
+
+def _complete_json_parsed(
+    client: LocalLLMClient,
+    prompt: str,
+    *,
+    temperature: float = 0.0,
+    max_retries: int = 3,
+    max_tokens: int | None = 1024,
+    parse_attempts: int | None = None,
+    raise_on_network_error: bool = False,
+) -> tuple[str, dict[str, object] | None]:
+    """
+    Like complete_json_with_retry, but also returns the JSON object parsed while validating
+    (None if no valid JSON), so callers need not parse the response a second time.
+
+    Complete until the response contains valid JSON. Parse failures retry at a higher temperature;
+    network failures retry at the same temperature after a jittered exponential backoff. Each kind
+    of failure is retried at most max_retries times; parse_attempts overrides the limit for parse
+    failures (1 = single attempt, the caller escalates). With raise_on_network_error, exhausted
+    network retries raise LLMNetworkError instead of returning ("", None).
+    """
+    max_parse = max_retries if parse_attempts is None else parse_attempts
     temp = temperature
     last = ""
-    for i in range(max_retries):
-        last = client.complete(prompt, temperature=temp, max_tokens=max_tokens)
+    parse_fails = 0
+    net_fails = 0
+    while parse_fails < max_parse:
+        try:
+            last = client.complete(prompt, temperature=temp, max_tokens=max_tokens, raise_on_network_error=True)
+        except LLMNetworkError as exc:
+            net_fails += 1
+            if net_fails >= max_retries:
+                if raise_on_network_error:
+                    raise
+                logger.error(
+                    "LLM unreachable (%s). Category/summary will use heuristic or 'na' for this document.",
+                    exc,
+                )
+                return ("", None)
+            delay = random.uniform(0, LLM_BACKOFF_BASE_S * 2**net_fails)
+            logger.info("LLM network error (%s); retrying in %.2fs", exc, delay)
+            time.sleep(delay)
+            continue
         candidate = last.strip()
+        extracted = ""
         if candidate.startswith("{"):
             try:
-                json.loads(candidate)
-                return last
+                data = _loads_json(candidate)
             except json.JSONDecodeError:
-                pass
-        extracted = _extract_json_from_response(last)
+                # Object followed by trailing prose. If this fails too, extraction would only
+                # re-scan the same object unless there is a code fence further on.
+                try:
+                    data, _end = _DECODER.raw_decode(candidate)
+                except json.JSONDecodeError:
+                    if "```" in candidate:
+                        extracted = _extract_json_from_response(candidate)
+                else:
+                    return (last, data if isinstance(data, dict) else None)
+            else:
+                return (last, data if isinstance(data, dict) else None)
+        else:
+            extracted = _extract_json_from_response(candidate)
         if extracted.startswith("{"):
             try:
-                json.loads(extracted)
-                return last
+                data = _loads_json(extracted)
             except json.JSONDecodeError:
                 pass
-        temp += 0.2
-        logger.info("Retry %s: New temperature=%s", i + 1, temp)
-    logger.error(
-        "LLM returned no valid JSON after %s retries. Using heuristic or 'na' for this document.",
-        max_retries,
+            else:
+                return (last, data if isinstance(data, dict) else None)
+        parse_fails += 1
+        if parse_fails < max_parse:
+            temp += 0.2
+            logger.info("Retry %s: New temperature=%s", parse_fails, temp)
+    if max_parse > 1:
+        logger.error(
+            "LLM returned no valid JSON after %s retries. Using heuristic or 'na' for this document.",
+            max_parse,
+        )
+    return (last, None)
+
+
+def _attempt_prompt_for_key(
+    client: LocalLLMClient,
+    prompt: str,
+    *,
+    key: str,
+    temperature: float,
+    max_tokens: int | None,
+    lenient: bool,
+) -> str | list[str] | None:
+    r, parsed = _complete_json_parsed(
+        client,
+        prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        parse_attempts=1,
+        raise_on_network_error=True,
     )
-    return last
+    return parse_json_field(r, key=key, lenient=lenient, prefetched=parsed)
 
 
 def _try_prompts_for_key(
@@ -403,17 +881,273 @@ def _try_prompts_for_key(
     temperature: float,
     max_tokens: int | None = 1024,
     lenient: bool = False,
+    race_prompts: int = 1,
+    max_rounds: int = 3,
 ) -> str | list[str] | None:
-    for i, prompt in enumerate(prompts):
-        r = complete_json_with_retry(
+    """
+    Try prompt variants until one yields a value for key. Each round sends every variant once;
+    only after a full round fails does the temperature rise by 0.2 (at most max_rounds rounds),
+    so each request tries a different prompt before any is repeated.
+    With race_prompts > 1, up to that many attempts run concurrently and the first parseable
+    answer wins (extra tokens for lower latency).
+    """
+    attempts = [(temperature + step * 0.2, prompt) for step in range(max_rounds) for prompt in prompts]
+    try:
+        v = _run_prompt_attempts(
             client,
-            prompt,
-            temperature=temperature + i * 0.2,
+            attempts,
+            key=key,
             max_tokens=max_tokens,
+            lenient=lenient,
+            race_prompts=min(race_prompts, len(prompts)),
+        )
+    except LLMNetworkError as exc:
+        # The endpoint is down: the remaining variants would fail the same way.
+        logger.error(
+            "LLM unreachable (%s). Category/summary will use heuristic or 'na' for this document.",
+            exc,
+        )
+        return None
+    if v is None:
+        logger.error("LLM returned no usable %r after %s attempts. Using heuristic or 'na'.", key, len(attempts))
+    return v
+
+
+def _run_prompt_attempts(
+    client: LocalLLMClient,
+    attempts: list[tuple[float, str]],
+    *,
+    key: str,
+    max_tokens: int | None,
+    lenient: bool,
+    race_prompts: int,
+) -> str | list[str] | None:
+    """Run (temperature, prompt) attempts in order, race_prompts at a time; first value for key wins."""
+    if race_prompts <= 1:
+        for temp, prompt in attempts:
+            v = _attempt_prompt_for_key(
+                client,
+                prompt,
+                key=key,
+                temperature=temp,
+                max_tokens=max_tokens,
+                lenient=lenient,
+            )
+            if v is not None:
+                return v
+        return None
+
+    ex = ThreadPoolExecutor(max_workers=race_prompts)
+    try:
+        queue = list(attempts)
+        in_flight: set[Future[str | list[str] | None]] = set()
+        while queue or in_flight:
+            while queue and len(in_flight) < race_prompts:
+                temp, prompt = queue.pop(0)
+                in_flight.add(
+                    ex.submit(
+                        _attempt_prompt_for_key,
+                        client,
+                        prompt,
+                        key=key,
+                        temperature=temp,
+                        max_tokens=max_tokens,
+                        lenient=lenient,
+                    )
+                )
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for f in done:
+                v = f.result()
+                if v is not None:
+                    return v
+        return None
+    finally:
+        # Do not wait for losing requests; queued ones are cancelled.
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+def _chunk_semaphore(base_url: str) -> threading.BoundedSemaphore:
+    with _llm_sessions_lock:
+        sem = _chunk_semaphores.get(base_url)
+        if sem is None:
+            sem = threading.BoundedSemaphore(CHUNK_SUMMARY_MAX_PARALLEL)
+            _chunk_semaphores[base_url] = sem
+    return sem
+
+
+def _summarize_chunk(
+    client: LocalLLMClient,
+    chunk_prompt: str,
+    *,
+    temperature: float,
+    lenient_json: bool,
+) -> str:
+    """Summarize one chunk; returns "" when the LLM gives no usable summary."""
+    with _chunk_semaphore(client.base_url):
+        r, parsed = _complete_json_parsed(
+            client,
+            chunk_prompt,
+            temperature=temperature,
+            max_retries=3,
+            max_tokens=1024,
         )
-        v = parse_json_field(r, key=key, lenient=lenient)
-        if v is not None:
-            return v
+    v = parse_json_field(r, key="summary", lenient=lenient_json, prefetched=parsed)
+    return v if isinstance(v, str) else ""
+
+
+def _run_summary_prompts(
+    client: LocalLLMClient,
+    prompts: list[str],
+    *,
+    temperature: float,
+    lenient_json: bool,
+    max_parallel: int,
+) -> list[str]:
+    """Run independent {"summary"} prompts, concurrently when max_parallel > 1; results keep prompt order."""
+    workers = max(1, min(max_parallel, len(prompts)))
+    if workers == 1:
+        return [_summarize_chunk(client, p, temperature=temperature, lenient_json=lenient_json) for p in prompts]
+    # Create the pooled Session before the workers start so none of them waits on its lock.
+    _get_session(client.base_url)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return list(
+            ex.map(lambda p: _summarize_chunk(client, p, temperature=temperature, lenient_json=lenient_json), prompts)
+        )
+
+
+def _reduce_partial_summaries(
+    client: LocalLLMClient,
+    partial: list[str],
+    *,
+    language: str,
+    doc_type_hint: str,
+    temperature: float,
+    lenient_json: bool,
+    max_parallel: int,
+    max_chars: int,
+    levels: int = 1,
+) -> list[str]:
+    """
+    Return the partial summaries for the final combine. If their joined text would exceed
+    max_chars (and so overflow the final prompt), first combine groups of at most max_chars
+    into mid-level summaries (map-reduce), up to `levels` times.
+    """
+    total = sum(len(p) + 1 for p in partial) - 1
+    if total <= max_chars or levels <= 0 or len(partial) < 2:
+        return partial
+    groups: list[list[str]] = []
+    current: list[str] = []
+    current_len = 0
+    for p in partial:
+        added = len(p) + (1 if current else 0)
+        if current and current_len + added > max_chars:
+            groups.append(current)
+            current, current_len = [p], len(p)
+        else:
+            current.append(p)
+            current_len += added
+    if current:
+        groups.append(current)
+    prompts = [_summary_prompt_combine(language, doc_type_hint, " ".join(g)) for g in groups]
+    mid = [
+        m
+        for m in _run_summary_prompts(
+            client,
+            prompts,
+            temperature=temperature + 0.2,
+            lenient_json=lenient_json,
+            max_parallel=max_parallel,
+        )
+        if m
+    ]
+    if not mid:
+        return partial
+    return _reduce_partial_summaries(
+        client,
+        mid,
+        language=language,
+        doc_type_hint=doc_type_hint,
+        temperature=temperature,
+        lenient_json=lenient_json,
+        max_parallel=max_parallel,
+        max_chars=max_chars,
+        levels=levels - 1,
+    )
+
+
+def _combined_chunk_summaries(
+    client: LocalLLMClient,
+    text: str,
+    *,
+    language: str,
+    doc_type_hint: str,
+    temperature: float,
+    lenient_json: bool,
+    max_parallel: int,
+    max_chars: int,
+) -> list[str]:
+    """Summarize each chunk of a long text; returns the non-empty partial summaries in chunk order."""
+    chunks = chunk_text_by_tokens(
+        text,
+        chunk_tokens=CONTEXT_128K_CHUNK_TOKENS,
+        overlap_tokens=CONTEXT_128K_CHUNK_OVERLAP_TOKENS,
+    )
+    if chunks is None:
+        chunks = chunk_text(
+            text,
+            chunk_size=CONTEXT_128K_CHUNK_SIZE,
+            overlap=CONTEXT_128K_CHUNK_OVERLAP,
+        )
+    partial = [""] * len(chunks)
+    # Partial summaries of chunks seen before (e.g. shared boilerplate) come from the cache;
+    # only the misses are sent to the LLM.
+    cache = client.cache if temperature == 0.0 else None
+    keys: list[str] = []
+    missing = list(range(len(chunks)))
+    if cache is not None:
+        keys = [chunk_summary_cache_key(client.model, language, doc_type_hint, chunk) for chunk in chunks]
+        missing = []
+        for i, key in enumerate(keys):
+            hit = cache.get(key)
+            if hit:
+                partial[i] = hit
+            else:
+                missing.append(i)
+    fresh = _run_summary_prompts(
+        client,
+        [_summary_prompt_chunk(language, doc_type_hint, chunks[i]) for i in missing],
+        temperature=temperature,
+        lenient_json=lenient_json,
+        max_parallel=max_parallel,
+    )
+    for i, summary in zip(missing, fresh, strict=True):
+        partial[i] = summary
+        if cache is not None and summary:
+            cache.set(keys[i], summary)
+    return _reduce_partial_summaries(
+        client,
+        [p for p in partial if p],
+        language=language,
+        doc_type_hint=doc_type_hint,
+        temperature=temperature,
+        lenient_json=lenient_json,
+        max_parallel=max_parallel,
+        max_chars=max_chars,
+    )
+
+
+def _try_cheap_summary(text: str) -> str | None:
+    """
+    First non-empty line of text if it looks like a title (printable, 10-120 chars, starts
+    uppercase, at least two words), else None.
+    """
+    for line in text[:TITLE_SHORTCUT_SCAN_CHARS].splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if 10 <= len(line) <= 120 and line.isprintable() and line[0].isupper() and " " in line:
+            return line
+        return None
     return None
 
 
@@ -426,12 +1160,20 @@ def get_document_summary(
     max_chars_single: int = CONTEXT_128K_MAX_CHARS_SINGLE,
     suggested_doc_type: str | None = None,
     lenient_json: bool = False,
+    max_parallel: int = CHUNK_SUMMARY_MAX_PARALLEL,
+    race_prompts: int = 1,
+    title_shortcut: bool = False,
 ) -> str:
     if pdf_content is None or not isinstance(pdf_content, str):
         return "na"
     text = pdf_content.strip()
     if len(text) < 50:
         return "na"
+    if title_shortcut:
+        title = _try_cheap_summary(text)
+        if title is not None:
+            logger.debug("Using document title as summary (no LLM call): %r", title)
+            return title
 
     doc_type_hint = _summary_doc_type_hint(language, suggested_doc_type)
 
@@ -444,43 +1186,108 @@ def get_document_summary(
             temperature=temperature,
             max_tokens=1024,
             lenient=lenient_json,
+            race_prompts=race_prompts,
         )
         return val if isinstance(val, str) else "na"
 
-    chunks = chunk_text(
+    partial = _combined_chunk_summaries(
+        client,
         text,
-        chunk_size=CONTEXT_128K_CHUNK_SIZE,
-        overlap=CONTEXT_128K_CHUNK_OVERLAP,
+        language=language,
+        doc_type_hint=doc_type_hint,
+        temperature=temperature,
+        lenient_json=lenient_json,
+        max_parallel=max_parallel,
+        max_chars=max_chars_single,
     )
-    partial: list[str] = []
-    for chunk in chunks:
-        chunk_prompt = _summary_prompt_chunk(language, doc_type_hint, chunk)
-        r = complete_json_with_retry(
-            client,
-            chunk_prompt,
-            temperature=temperature,
-            max_retries=3,
-            max_tokens=1024,
-        )
-        v = parse_json_field(r, key="summary", lenient=lenient_json)
-        partial.append(v if isinstance(v, str) else "")
+    return _summary_from_partials(
+        client,
+        partial,
+        language=language,
+        doc_type_hint=doc_type_hint,
+        temperature=temperature,
+        lenient_json=lenient_json,
+    )
+
 
-    combined = " ".join(p for p in partial if p)
-    if not combined:
+def _summary_from_partials(
+    client: LocalLLMClient,
+    partial: list[str],
+    *,
+    language: str,
+    doc_type_hint: str,
+    temperature: float,
+    lenient_json: bool,
+) -> str:
+    """One summary from the per-chunk partial summaries of a long document ("na" if none)."""
+    if not partial:
         return "na"
+    if len(partial) == 1:
+        # Nothing to combine (all other chunks failed): skip the final LLM round-trip.
+        return partial[0]
 
-    final_prompt = _summary_prompt_combine(language, doc_type_hint, combined)
-    r_final = complete_json_with_retry(
+    final_prompt = _summary_prompt_combine(language, doc_type_hint, " ".join(partial))
+    r_final, parsed_final = _complete_json_parsed(
         client,
         final_prompt,
         temperature=temperature + 0.2,
         max_retries=3,
         max_tokens=1024,
     )
-    v_final = parse_json_field(r_final, key="summary", lenient=lenient_json)
+    v_final = parse_json_field(r_final, key="summary", lenient=lenient_json, prefetched=parsed_final)
     return v_final if isinstance(v_final, str) else "na"
 
 
+# {hint} = optional "document is likely: <category>" sentence, {summary} = document summary.
+_DE_KEYWORD_PROMPTS: tuple[str, ...] = (
+    "Extrahiere bitte 5–7 Schlüsselwörter aus dieser Zusammenfassung.\n"
+    "Gib ausschließlich eine Ausgabe in der Form:\n"
+    '{{"keywords":["KW1","KW2","KW3"]}}\n\n'
+    "Jetzt bitte NUR reines JSON, sonst nichts.\n{hint}Zusammenfassung:\n{summary}",
+    'Bitte NUR reines JSON in der Form:\n{{"keywords":["KW1","KW2"]}}\n\n{hint}Hier die Zusammenfassung:\n{summary}',
+)
+_EN_KEYWORD_PROMPTS: tuple[str, ...] = (
+    'Extract 5–7 keywords from this summary. Return ONLY JSON:\n{{"keywords":["KW1","KW2"]}}\n\n'
+    "{hint}Summary:\n{summary}",
+)
+# {text} = summary, keywords and category constraints.
+_DE_CATEGORY_PROMPTS: tuple[str, ...] = (
+    "Bestimme eine sinnvolle Kategorie als reines JSON.\n"
+    'Gib nur: {{"category":"..."}}\n\n'
+    "Keine weiteren Erklärungen, nur JSON. Text:\n{text}",
+    'Bitte nur {{"category":"..."}} - ohne Zusätze:\n{text}',
+)
+_EN_CATEGORY_PROMPTS: tuple[str, ...] = (
+    'Determine a suitable category. Return ONLY JSON: {{"category":"..."}}\n\nText:\n{text}',
+)
+# {text} = summary, keywords and category.
+_DE_FINAL_SUMMARY_PROMPTS: tuple[str, ...] = (
+    "Erstelle bitte bis zu 5 Stichworte (kurz! 1–2 Wörter pro Stichwort) "
+    "als reines JSON.\n"
+    '{{"final_summary":"stichwort1,stichwort2"}}\n\n'
+    "WICHTIG: Keine Sätze, nur Stichworte. Nur JSON.\n\n{text}",
+    'Bitte nur reines JSON {{"final_summary":"stichwort1,stichwort2"}}. Max. 5 Stichworte, keine Sätze!\n\n{text}',
+)
+_EN_FINAL_SUMMARY_PROMPTS: tuple[str, ...] = (
+    'Return up to 5 short keywords (1–2 words each) as JSON:\n{{"final_summary":"kw1,kw2"}}\n\nOnly JSON.\n\n{text}',
+)
+
+
+def _is_missing_summary(summary: str | None) -> bool:
+    return not summary or not summary.strip() or summary.strip().lower() == "na"
+
+
+@lru_cache(maxsize=64)
+def _category_hint(language: str, suggested_category: str | None) -> str:
+    """Build the optional category sentence for keyword prompts."""
+    if not suggested_category or not suggested_category.strip():
+        return ""
+    c = suggested_category.strip()
+    if language == "de":
+        return f"Das Dokument ist voraussichtlich: {c}. "
+    return f"The document is likely: {c}. "
+
+
 def get_document_keywords(
     client: LocalLLMClient,
     summary: str,
@@ -489,38 +1296,14 @@ def get_document_keywords(
     temperature: float = 0.0,
     suggested_category: str | None = None,
     lenient_json: bool = False,
+    race_prompts: int = 1,
 ) -> list[str] | None:
-    cat_hint = ""
-    if suggested_category and suggested_category.strip():
-        c = suggested_category.strip()
-        if language == "de":
-            cat_hint = f"Das Dokument ist voraussichtlich: {c}. "
-        else:
-            cat_hint = f"The document is likely: {c}. "
-
-    if language == "de":
-        prompts = [
-            (
-                cat_hint + "Extrahiere bitte 5–7 Schlüsselwörter aus dieser Zusammenfassung.\n"
-                "Gib ausschließlich eine Ausgabe in der Form:\n"
-                '{"keywords":["KW1","KW2","KW3"]}\n\n'
-                "Jetzt bitte NUR reines JSON, sonst nichts.\n"
-                "Zusammenfassung:\n" + summary
-            ),
-            (
-                cat_hint + "Bitte NUR reines JSON in der Form:\n"
-                '{"keywords":["KW1","KW2"]}\n\n'
-                "Hier die Zusammenfassung:\n" + summary
-            ),
-        ]
-    else:
-        prompts = [
-            (
-                cat_hint + "Extract 5–7 keywords from this summary. Return ONLY JSON:\n"
-                '{"keywords":["KW1","KW2"]}\n\n'
-                "Summary:\n" + summary
-            )
-        ]
+    if _is_missing_summary(summary):
+        logger.debug("No summary; skipping LLM keywords call.")
+        return None
+    cat_hint = _category_hint(language, suggested_category)
+    templates = _DE_KEYWORD_PROMPTS if language == "de" else _EN_KEYWORD_PROMPTS
+    prompts = [t.format(hint=cat_hint, summary=summary) for t in templates]
 
     val = _try_prompts_for_key(
         client,
@@ -529,10 +1312,155 @@ def get_document_keywords(
         temperature=temperature,
         max_tokens=512,
         lenient=lenient_json,
+        race_prompts=race_prompts,
     )
     return val if isinstance(val, list) else None
 
 
+# {items} = numbered summaries ("1) ...\n2) ..."), each with its optional category hint.
+_DE_KEYWORD_BATCH_PROMPT = (
+    "Extrahiere für jede der folgenden nummerierten Zusammenfassungen 5–7 Schlüsselwörter.\n"
+    "Gib ausschließlich reines JSON mit einer Liste pro Zusammenfassung in derselben Reihenfolge:\n"
+    '{{"keywords":[["KW1","KW2"],["KW1","KW2"]]}}\n\n'
+    "Zusammenfassungen:\n{items}"
+)
+_EN_KEYWORD_BATCH_PROMPT = (
+    "Extract 5–7 keywords for each of the following numbered summaries.\n"
+    "Return ONLY JSON with one list per summary, in the same order:\n"
+    '{{"keywords":[["KW1","KW2"],["KW1","KW2"]]}}\n\n'
+    "Summaries:\n{items}"
+)
+# Larger batches give diminishing returns and make misaligned answers more likely.
+KEYWORD_BATCH_MAX_SIZE = 16
+
+
+def get_document_keywords_batch(
+    client: LocalLLMClient,
+    summaries: list[str],
+    *,
+    language: str = "de",
+    temperature: float = 0.0,
+    suggested_categories: list[str | None] | None = None,
+    batch_size: int = 8,
+    lenient_json: bool = False,
+    race_prompts: int = 1,
+) -> list[list[str] | None]:
+    """
+    Keywords for many summaries with one LLM call per batch of up to batch_size summaries.
+    Returns one entry per summary (None where no keywords could be obtained). Rows the batch
+    answer does not cover are retried individually with get_document_keywords.
+    """
+    categories = suggested_categories or [None] * len(summaries)
+    results: list[list[str] | None] = [None] * len(summaries)
+    pending = [i for i, summary in enumerate(summaries) if not _is_missing_summary(summary)]
+    size = max(1, min(batch_size, KEYWORD_BATCH_MAX_SIZE))
+    template = _DE_KEYWORD_BATCH_PROMPT if language == "de" else _EN_KEYWORD_BATCH_PROMPT
+    for start in range(0, len(pending), size):
+        batch = pending[start : start + size]
+        rows: object = None
+        if len(batch) > 1:
+            items = "\n".join(
+                f"{n}) {_category_hint(language, categories[i])}{summaries[i].strip()}" for n, i in enumerate(batch, 1)
+            )
+            try:
+                _response, data = _complete_json_parsed(
+                    client,
+                    template.format(items=items),
+                    temperature=temperature,
+                    max_tokens=256 * len(batch),
+                    raise_on_network_error=True,
+                )
+            except LLMNetworkError as exc:
+                # The endpoint is down: per-row retries would fail the same way.
+                logger.error("LLM unreachable (%s). Keywords stay empty for %s document(s).", exc, len(batch))
+                continue
+            rows = data.get("keywords") if data is not None else None
+        aligned = isinstance(rows, list) and len(rows) == len(batch)
+        for pos, i in enumerate(batch):
+            value = _clean_field_value(rows[pos]) if aligned else None  # type: ignore[index]
+            if isinstance(value, list):
+                results[i] = value
+            else:
+                results[i] = get_document_keywords(
+                    client,
+                    summaries[i],
+                    language=language,
+                    temperature=temperature,
+                    suggested_category=categories[i],
+                    lenient_json=lenient_json,
+                    race_prompts=race_prompts,
+                )
+    return results
+
+
+# How long the first keyword request of a batch waits for requests from other threads.
+KEYWORD_BATCH_LINGER_S = 0.5
+
+
+class KeywordBatcher:
+    """
+    get_document_keywords for concurrent callers (e.g. the --workers pipeline), answered by
+    get_document_keywords_batch. The first request of a batch waits up to linger_s for others; the
+    batch is sent as soon as batch_size requests are waiting, or when that wait runs out.
+    """
+
+    def __init__(
+        self,
+        client: LocalLLMClient,
+        *,
+        batch_size: int,
+        language: str = "de",
+        lenient_json: bool = False,
+        race_prompts: int = 1,
+        linger_s: float = KEYWORD_BATCH_LINGER_S,
+    ) -> None:
+        self.client = client
+        self.batch_size = max(1, min(batch_size, KEYWORD_BATCH_MAX_SIZE))
+        self.language = language
+        self.lenient_json = lenient_json
+        self.race_prompts = race_prompts
+        self.linger_s = linger_s
+        self._cond = threading.Condition()
+        self._pending: list[tuple[str, str | None, Future[list[str] | None]]] = []
+
+    def keywords(self, summary: str, *, suggested_category: str | None = None) -> list[str] | None:
+        """Keywords for summary, like get_document_keywords; blocks until its batch is answered."""
+        if _is_missing_summary(summary):
+            return None
+        future: Future[list[str] | None] = Future()
+        with self._cond:
+            batch = self._pending
+            batch.append((summary, suggested_category, future))
+            send = len(batch) >= self.batch_size
+            if not send and len(batch) == 1:
+                self._cond.wait_for(lambda: self._pending is not batch, timeout=self.linger_s)
+                send = self._pending is batch
+            if send:
+                self._pending = []
+                self._cond.notify_all()
+        if send:
+            self._send(batch)
+        return future.result()
+
+    def _send(self, batch: list[tuple[str, str | None, Future[list[str] | None]]]) -> None:
+        try:
+            results = get_document_keywords_batch(
+                self.client,
+                [summary for summary, _category, _future in batch],
+                language=self.language,
+                suggested_categories=[category for _summary, category, _future in batch],
+                batch_size=len(batch),
+                lenient_json=self.lenient_json,
+                race_prompts=self.race_prompts,
+            )
+        except Exception as exc:
+            for _summary, _category, future in batch:
+                future.set_exception(exc)
+            return
+        for (_summary, _category, future), value in zip(batch, results, strict=True):
+            future.set_result(value)
+
+
 def get_document_category(
     client: LocalLLMClient,
     *,
@@ -543,7 +1471,11 @@ def get_document_category(
     suggested_categories: list[str] | None = None,
     allowed_categories: list[str] | None = None,
     lenient_json: bool = False,
+    race_prompts: int = 1,
 ) -> str:
+    if _is_missing_summary(summary) or not keywords:
+        logger.debug("No summary or keywords; skipping LLM category call.")
+        return "na"
     keywords_joined = ", ".join(keywords)
     if language == "de":
         base_text = f"Zusammenfassung:\n{summary}\nKeywords:{keywords_joined}"
@@ -553,14 +1485,7 @@ def get_document_category(
         elif suggested_categories:
             base_text += "\n\nVorschläge nutzen falls passend, sonst andere Kategorie."
             base_text += " Vorschläge: " + ", ".join(suggested_categories) + "."
-        prompts = [
-            (
-                "Bestimme eine sinnvolle Kategorie als reines JSON.\n"
-                'Gib nur: {"category":"..."}\n\n'
-                "Keine weiteren Erklärungen, nur JSON. Text:\n" + base_text
-            ),
-            ('Bitte nur {"category":"..."} - ohne Zusätze:\n' + base_text),
-        ]
+        templates = _DE_CATEGORY_PROMPTS
     else:
         base_text = f"Summary:\n{summary}\nKeywords:{keywords_joined}"
         if allowed_categories:
@@ -569,7 +1494,8 @@ def get_document_category(
         elif suggested_categories:
             base_text += "\n\nUse one suggestion if appropriate, else another category."
             base_text += " Suggestions: " + ", ".join(suggested_categories) + "."
-        prompts = [('Determine a suitable category. Return ONLY JSON: {"category":"..."}\n\nText:\n' + base_text)]
+        templates = _EN_CATEGORY_PROMPTS
+    prompts = [t.format(text=base_text) for t in templates]
 
     val = _try_prompts_for_key(
         client,
@@ -578,6 +1504,7 @@ def get_document_category(
         temperature=temperature,
         max_tokens=256,
         lenient=lenient_json,
+        race_prompts=race_prompts,
     )
     if not isinstance(val, str):
         return "na"
@@ -596,31 +1523,16 @@ def get_final_summary_tokens(
     language: str = "de",
     temperature: float = 0.0,
     lenient_json: bool = False,
+    race_prompts: int = 1,
 ) -> list[str] | None:
+    if _is_missing_summary(summary):
+        logger.debug("No summary; skipping LLM final_summary call.")
+        return None
     kw_str = ", ".join(keywords)
     base_text = f"Zusammenfassung: {summary}\nSchlagworte: {kw_str}\nKategorie: {category}"
 
-    if language == "de":
-        prompts = [
-            (
-                "Erstelle bitte bis zu 5 Stichworte (kurz! 1–2 Wörter pro Stichwort) "
-                "als reines JSON.\n"
-                '{"final_summary":"stichwort1,stichwort2"}\n\n'
-                "WICHTIG: Keine Sätze, nur Stichworte. Nur JSON.\n\n" + base_text
-            ),
-            (
-                'Bitte nur reines JSON {"final_summary":"stichwort1,stichwort2"}. '
-                "Max. 5 Stichworte, keine Sätze!\n\n" + base_text
-            ),
-        ]
-    else:
-        prompts = [
-            (
-                "Return up to 5 short keywords (1–2 words each) as JSON:\n"
-                '{"final_summary":"kw1,kw2"}\n\n'
-                "Only JSON.\n\n" + base_text
-            )
-        ]
+    templates = _DE_FINAL_SUMMARY_PROMPTS if language == "de" else _EN_FINAL_SUMMARY_PROMPTS
+    prompts = [t.format(text=base_text) for t in templates]
 
     val = _try_prompts_for_key(
         client,
@@ -629,9 +1541,210 @@ def get_final_summary_tokens(
         temperature=temperature,
         max_tokens=256,
         lenient=lenient_json,
+        race_prompts=race_prompts,
     )
     if not isinstance(val, str):
         return None
 
     tokens = [t.strip() for t in val.split(",") if t.strip()]
     return tokens[:5] if tokens else None
+
+
+class DocumentMetadata(TypedDict):
+    """Result of get_document_metadata_fused ("na" / [] when a field could not be obtained)."""
+
+    summary: str
+    keywords: list[str]
+    category: str
+    final_summary: list[str]
+
+
+# {category_rule} = category instruction, {hint} = doc-type hint, {label} = "Text" or the partial
+# summaries label, {text} = document text or combined partial summaries.
+_DE_FUSED_METADATA_PROMPT = (
+    "Analysiere das folgende Dokument. Gib ausschließlich reines JSON in der Form:\n"
+    '{{"summary":"...","keywords":["KW1","KW2"],"category":"...","final_summary":"stichwort1,stichwort2"}}\n'
+    "summary: 1–2 kurze Sätze; keywords: 5–7 Schlüsselwörter; {category_rule}; "
+    "final_summary: bis zu 5 Stichworte (1–2 Wörter), keine Sätze.\n"
+    "Nur JSON, keine Erklärungen.\n\n{hint}{label}:\n{text}"
+)
+_EN_FUSED_METADATA_PROMPT = (
+    "Analyze the following document. Return ONLY JSON in the form:\n"
+    '{{"summary":"...","keywords":["KW1","KW2"],"category":"...","final_summary":"kw1,kw2"}}\n'
+    "summary: 1–2 short sentences; keywords: 5–7 keywords; {category_rule}; "
+    "final_summary: up to 5 short keywords (1–2 words each), no sentences.\n"
+    "Only JSON, no explanations.\n\n{hint}{label}:\n{text}"
+)
+# {categories} = comma-separated allowed categories.
+_DE_FUSED_CATEGORY_RULES = ("category: eine kurze Dokumentkategorie", " – genau eine von: {categories} oder 'unknown'")
+_EN_FUSED_CATEGORY_RULES = ("category: one short document category", " - exactly one of: {categories} or 'unknown'")
+_DE_FUSED_LABELS = ("Text", "Teilzusammenfassungen eines langen Dokuments")
+_EN_FUSED_LABELS = ("Text", "Partial summaries of a long document")
+
+
+def _fused_metadata_prompt(
+    language: str,
+    doc_type_hint: str,
+    text: str,
+    *,
+    is_partial_summaries: bool,
+    allowed_categories: list[str] | None,
+) -> str:
+    """Build one prompt asking for summary, keywords, category and final_summary together."""
+    de = language == "de"
+    template = _DE_FUSED_METADATA_PROMPT if de else _EN_FUSED_METADATA_PROMPT
+    category_rule, allowed_rule = _DE_FUSED_CATEGORY_RULES if de else _EN_FUSED_CATEGORY_RULES
+    text_label, partial_label = _DE_FUSED_LABELS if de else _EN_FUSED_LABELS
+    if allowed_categories:
+        category_rule += allowed_rule.format(categories=", ".join(sorted(allowed_categories)))
+    return template.format(
+        category_rule=category_rule,
+        hint=doc_type_hint,
+        label=partial_label if is_partial_summaries else text_label,
+        text=text,
+    )
+
+
+def get_document_metadata_fused(
+    client: LocalLLMClient,
+    pdf_content: str,
+    *,
+    language: str = "de",
+    temperature: float = 0.0,
+    max_chars_single: int = CONTEXT_128K_MAX_CHARS_SINGLE,
+    suggested_doc_type: str | None = None,
+    allowed_categories: list[str] | None = None,
+    lenient_json: bool = False,
+    max_parallel: int = CHUNK_SUMMARY_MAX_PARALLEL,
+    race_prompts: int = 1,
+    title_shortcut: bool = False,
+) -> DocumentMetadata:
+    """
+    Get summary, keywords, category and final_summary tokens with one LLM call instead of the
+    summary -> keywords -> category -> final_summary chain. Long documents get the usual per-chunk
+    summary pass first; the fused call then runs on the combined partial summaries.
+    A field that is missing or invalid in the fused answer is fetched with its per-key function
+    (racing race_prompts prompts). With title_shortcut, a usable document title is the summary,
+    as in get_document_summary.
+    """
+    result: DocumentMetadata = {"summary": "na", "keywords": [], "category": "na", "final_summary": []}
+    if pdf_content is None or not isinstance(pdf_content, str):
+        return result
+    text = pdf_content.strip()
+    if len(text) < 50:
+        return result
+
+    title = _try_cheap_summary(text) if title_shortcut else None
+    doc_type_hint = _summary_doc_type_hint(language, suggested_doc_type)
+    is_partial = len(text) >= max_chars_single
+    partial: list[str] = []
+    if is_partial:
+        partial = _combined_chunk_summaries(
+            client,
+            text,
+            language=language,
+            doc_type_hint=doc_type_hint,
+            temperature=temperature,
+            lenient_json=lenient_json,
+            max_parallel=max_parallel,
+            max_chars=max_chars_single,
+        )
+        if not partial:
+            return result
+        text = " ".join(partial)
+
+    prompt = _fused_metadata_prompt(
+        language,
+        doc_type_hint,
+        text,
+        is_partial_summaries=is_partial,
+        allowed_categories=allowed_categories,
+    )
+    response, data = _complete_json_parsed(client, prompt, temperature=temperature, max_tokens=1024)
+
+    def field_value(key: str) -> str | list[str] | None:
+        if data is not None:
+            return _clean_field_value(data.get(key))
+        return parse_json_field(response, key=key, lenient=lenient_json)
+
+    summary = field_value("summary")
+    if title is not None:
+        logger.debug("Using document title as summary: %r", title)
+        result["summary"] = title
+    elif isinstance(summary, str):
+        result["summary"] = summary
+    elif is_partial:
+        # The chunk pass already ran: combine its partial summaries instead of redoing it.
+        result["summary"] = _summary_from_partials(
+            client,
+            partial,
+            language=language,
+            doc_type_hint=doc_type_hint,
+            temperature=temperature,
+            lenient_json=lenient_json,
+        )
+    else:
+        result["summary"] = get_document_summary(
+            client,
+            pdf_content,
+            language=language,
+            temperature=temperature,
+            max_chars_single=max_chars_single,
+            suggested_doc_type=suggested_doc_type,
+            lenient_json=lenient_json,
+            max_parallel=max_parallel,
+            race_prompts=race_prompts,
+        )
+
+    keywords = field_value("keywords")
+    if isinstance(keywords, list):
+        result["keywords"] = keywords
+    else:
+        result["keywords"] = (
+            get_document_keywords(
+                client,
+                result["summary"],
+                language=language,
+                temperature=temperature,
+                suggested_category=suggested_doc_type,
+                lenient_json=lenient_json,
+                race_prompts=race_prompts,
+            )
+            or []
+        )
+
+    category = field_value("category")
+    if isinstance(category, str) and len(category) <= 80:
+        result["category"] = category
+    else:
+        result["category"] = get_document_category(
+            client,
+            summary=result["summary"],
+            keywords=result["keywords"],
+            language=language,
+            temperature=temperature,
+            allowed_categories=allowed_categories,
+            lenient_json=lenient_json,
+            race_prompts=race_prompts,
+        )
+
+    final_summary = field_value("final_summary")
+    if isinstance(final_summary, str):
+        result["final_summary"] = [t.strip() for t in final_summary.split(",") if t.strip()][:5]
+    elif isinstance(final_summary, list):
+        result["final_summary"] = final_summary[:5]
+    if not result["final_summary"]:
+        result["final_summary"] = (
+            get_final_summary_tokens(
+                client,
+                summary=result["summary"],
+                keywords=result["keywords"],
+                category=result["category"],
+                language=language,
+                temperature=temperature,
+                lenient_json=lenient_json,
+                race_prompts=race_prompts,
+            )
+            or []
+        )
+    return result
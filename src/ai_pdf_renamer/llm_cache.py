@@ -0,0 +1,101 @@
+"""
+Persistent LLM response cache (SQLite, stdlib only).
+
+Completions are keyed by SHA-256 of (model, temperature, max_tokens, prompt) so re-runs on the
+same folder (e.g. after a crash) skip the LLM for prompts that were already answered.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Entries older than this are ignored and overwritten.
+DEFAULT_CACHE_TTL_S = 7 * 86400
+
+
+def llm_cache_key(model: str, prompt: str, temperature: float, max_tokens: int | None) -> str:
+    return hashlib.sha256(f"{model}|{temperature}|{max_tokens}|{prompt}".encode("utf-8", "surrogatepass")).hexdigest()
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def chunk_summary_cache_key(model: str, language: str, doc_type_hint: str, chunk: str) -> str:
+    """
+    Key for a chunk's partial summary. Whitespace is normalized before hashing so the same
+    boilerplate (headers, legal footers) reflowed differently in other PDFs still hits.
+    """
+    normalized = _WHITESPACE_RE.sub(" ", chunk).strip()
+    digest = hashlib.blake2b(normalized.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+    return f"chunk_summary|{model}|{language}|{doc_type_hint}|{digest}"
+
+
+class LLMResponseCache:
+    """Thread-safe key -> completion store in a single SQLite file."""
+
+    def __init__(self, path: str | Path, *, ttl_s: float = DEFAULT_CACHE_TTL_S) -> None:
+        self.path = Path(path)
+        self.ttl_s = ttl_s
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        try:
+            with self._lock:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS completions "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                self._conn.commit()
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+
+    def get(self, key: str) -> str | None:
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT value, created FROM completions WHERE key = ?", (key,)).fetchone()
+        except (sqlite3.Error, UnicodeError) as exc:
+            logger.warning("LLM cache read failed (%s): %s", self.path, exc)
+            return None
+        if row is None or time.time() - row[1] > self.ttl_s:
+            return None
+        return str(row[0])
+
+    def set(self, key: str, value: str) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, time.time()),
+                )
+                self._conn.commit()
+        except (sqlite3.Error, UnicodeError) as exc:
+            # UnicodeError: lone surrogates (from broken PDF text) cannot be stored as TEXT.
+            logger.warning("LLM cache write failed (%s): %s", self.path, exc)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=8)
+def open_llm_cache(path_str: str) -> LLMResponseCache | None:
+    """
+    Return one shared cache per file path, or None if it cannot be opened (e.g. the path is a
+    directory): the cache is only a speedup, so the run continues without it.
+    """
+    try:
+        return LLMResponseCache(path_str)
+    except (sqlite3.Error, OSError) as exc:
+        logger.warning("LLM cache disabled: cannot open %s (%s)", path_str, exc)
+        return None
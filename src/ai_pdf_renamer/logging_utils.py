@@ -3,12 +3,29 @@ from __future__ import annotations
 import json
 import logging
 import os
+import time
 from pathlib import Path
 
+from .json_utils import json_dumps_text
+
 
 class StructuredLogFormatter(logging.Formatter):
     """Format log records as one JSON object per line (for CI/monitoring)."""
 
+    # (second, datefmt, formatted) of the last timestamp; records within the same second reuse
+    # the strftime result and only fill in the milliseconds.
+    _last_second: tuple[int, str | None, str] = (-1, None, "")
+
+    def formatTime(self, record: logging.LogRecord, datefmt: str | None = None) -> str:
+        second = int(record.created)
+        cached_second, cached_fmt, formatted = self._last_second
+        if cached_second != second or cached_fmt != datefmt:
+            formatted = time.strftime(datefmt or self.default_time_format, self.converter(record.created))
+            self._last_second = (second, datefmt, formatted)
+        if datefmt or not self.default_msec_format:
+            return formatted
+        return self.default_msec_format % (formatted, record.msecs)
+
     def format(self, record: logging.LogRecord) -> str:
         try:
             message = record.getMessage()
@@ -24,7 +41,7 @@ class StructuredLogFormatter(logging.Formatter):
                 payload["logger"] = record.name
             if record.exc_info:
                 payload["exception"] = self.formatException(record.exc_info)
-            return json.dumps(payload, ensure_ascii=False)
+            return json_dumps_text(payload)
         except Exception as exc:
             return json.dumps(
                 {
@@ -49,13 +66,21 @@ def setup_logging(*, log_file: str | Path = "error.log", level: int = logging.IN
     else:
         formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
-    if not any(isinstance(h, logging.StreamHandler) for h in root.handlers):
+    # One pass over the handlers. FileHandler subclasses StreamHandler, so it must be told
+    # apart first; otherwise an existing log file counts as a console and vice versa.
+    has_console = has_file = False
+    for handler in root.handlers:
+        if isinstance(handler, logging.FileHandler):
+            has_file = True
+        elif isinstance(handler, logging.StreamHandler):
+            has_console = True
+    if not has_console:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(level)
         console_handler.setFormatter(formatter)
         root.addHandler(console_handler)
 
-    if not any(isinstance(h, logging.FileHandler) for h in root.handlers):
+    if not has_file:
         try:
             log_path = Path(log_file)
             log_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1,50 +1,318 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
+import io
 import logging
-import re
-import tempfile
+import mmap
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import date
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 logger = logging.getLogger(__name__)
 
-# PDF metadata date format: D:YYYYMMDDHHmmss... or D:YYYYMMDD
-_PDF_DATE_PREFIX = re.compile(r"^D:(\d{4})(\d{2})(\d{2})")
-
 # Minimum extracted characters below which we try OCR (image-only PDFs).
 MIN_CHARS_BEFORE_OCR = 50
 
 # Optimized for Qwen3 8B 128K context: reserve ~8K tokens for prompt + response.
 CONTEXT_128K_MAX_CONTENT_TOKENS = 120_000
 
-# Cached tiktoken encoding to avoid repeated get_encoding() in _shrink_to_token_limit.
-_tiktoken_encoding: Any = None
+# With page_workers > 1, only documents with at least this many pages are split across processes;
+# for shorter ones starting the workers costs more than it saves.
+PAGE_PARALLEL_MIN_PAGES = 32
+# Pages per task in page-parallel extraction. Ranges are handed out in order, at most one per
+# worker in flight, so extraction stops near the token budget instead of reading every page.
+PAGE_PARALLEL_RANGE_PAGES = 8
 
+# PDFs up to this size are opened from a read-only memory map; larger ones by path, to keep
+# address-space use bounded. A mapped file that another process truncates while it is read kills
+# the process with SIGBUS instead of raising, so callers pass use_mmap=False for files that may
+# still be written (watch mode).
+MMAP_OPEN_MAX_BYTES = 256 * 1024 * 1024
 
-def _token_count(text: str) -> int:
-    global _tiktoken_encoding
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Any:
+    """
+    tiktoken cl100k_base encoding, loaded once per process. None when tiktoken is missing or
+    fails to load; that outcome is cached too, so the import is not retried on every count.
+    """
     try:
         import tiktoken
 
-        if _tiktoken_encoding is None:
-            _tiktoken_encoding = tiktoken.get_encoding("cl100k_base")
-        return len(_tiktoken_encoding.encode(text))
+        return tiktoken.get_encoding("cl100k_base")
     except Exception:
-        # Fallback heuristic: ~4 chars per token for typical text.
+        return None
+
+
+def _token_count(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        try:
+            # encode_ordinary skips the special-token scan (and never raises on "<|endoftext|>").
+            return len(encoding.encode_ordinary(text))
+        except Exception:
+            pass
+    # Fallback heuristic: ~4 UTF-8 bytes per token (umlauts etc. take 2+ bytes). isascii() is a
+    # fast check that lets plain-ASCII text skip the encode.
+    if text.isascii():
         return max(1, len(text) // 4)
+    return max(1, len(text.encode("utf-8", "surrogatepass")) // 4)
+
+
+# Texts at least this long are encoded as pieces of about _ENCODE_PIECE_CHARS in parallel
+# (tiktoken's encode_ordinary_batch runs them on a thread pool; the BPE releases the GIL).
+PARALLEL_ENCODE_MIN_CHARS = 200_000
+_ENCODE_PIECE_CHARS = 50_000
+_ENCODE_THREADS = min(8, os.cpu_count() or 1)
+
+
+def _encoding_pieces(text: str) -> list[str]:
+    """Split text into pieces of at most _ENCODE_PIECE_CHARS, cut before a space where possible."""
+    pieces: list[str] = []
+    start = 0
+    while len(text) - start > _ENCODE_PIECE_CHARS:
+        cut = text.rfind(" ", start + _ENCODE_PIECE_CHARS // 2, start + _ENCODE_PIECE_CHARS)
+        if cut <= start:
+            cut = start + _ENCODE_PIECE_CHARS
+        pieces.append(text[start:cut])
+        start = cut
+    pieces.append(text[start:])
+    return pieces
+
+
+def _token_offsets(text: str) -> list[int] | None:
+    """
+    Start index in text of each of its tokens. None when tiktoken is unavailable or text does
+    not round-trip (e.g. lone surrogates), as offsets would not match. Texts of
+    PARALLEL_ENCODE_MIN_CHARS or more are encoded piecewise in parallel; tokens then never span
+    a piece boundary, which only matters at those few spaces.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return None
+    pieces = [text]
+    try:
+        if len(text) >= PARALLEL_ENCODE_MIN_CHARS and hasattr(encoding, "encode_ordinary_batch"):
+            pieces = _encoding_pieces(text)
+            token_lists = encoding.encode_ordinary_batch(pieces, num_threads=_ENCODE_THREADS)
+        else:
+            token_lists = [encoding.encode_ordinary(text)]
+        offsets: list[int] = []
+        base = 0
+        for piece, tokens in zip(pieces, token_lists, strict=True):
+            decoded, piece_offsets = encoding.decode_with_offsets(tokens)
+            if decoded != piece:
+                return None
+            offsets.extend(piece_offsets if base == 0 else [base + offset for offset in piece_offsets])
+            base += len(piece)
+    except Exception:
+        return None
+    return offsets
+
+
+def chunk_text_by_tokens(text: str, *, chunk_tokens: int, overlap_tokens: int) -> list[str] | None:
+    """
+    Split text into pieces of at most chunk_tokens tokens, consecutive pieces sharing
+    overlap_tokens. Pieces are slices of text cut at token boundaries (never inside a character).
+    Returns None when no tokenizer is available, so callers can fall back to chunk_text.
+    """
+    if chunk_tokens <= 0:
+        raise ValueError("chunk_tokens must be > 0")
+    if overlap_tokens < 0 or overlap_tokens >= chunk_tokens:
+        raise ValueError("overlap_tokens must be >= 0 and < chunk_tokens")
+    if _get_encoding() is None:
+        return None
+    if not text.strip():
+        return []
+    offsets = _token_offsets(text)
+    if offsets is None:
+        return None
+    bounds = [*offsets, len(text)]
+    chunks: list[str] = []
+    for first in range(0, len(offsets), chunk_tokens - overlap_tokens):
+        stop = min(first + chunk_tokens, len(offsets))
+        chunks.append(text[bounds[first] : bounds[stop]])
+        if stop == len(offsets):
+            break
+    return chunks
+
+
+# Texts are never shrunk below this many characters.
+_SHRINK_MIN_CHARS = 200
+# Stop searching once the fitting and non-fitting prefix lengths are this close.
+_SHRINK_TOLERANCE_CHARS = 64
+# Every token covers at least one UTF-8 byte (at most 4 per char), so a text of up to
+# max_tokens // 4 characters fits without encoding it.
+_UTF8_MAX_BYTES_PER_CHAR = 4
+# Natural-language text averages fewer chars per token than this; a prefix of
+# _MAX_CHARS_PER_TOKEN * max_tokens chars is therefore (almost always) over the limit.
+_MAX_CHARS_PER_TOKEN = 6
 
 
 def _shrink_to_token_limit(text: str, *, max_tokens: int) -> str:
-    while _token_count(text) > max_tokens and len(text) > 200:
-        new_len = int(len(text) * 0.9)
-        # Prefer cut at last space to avoid mid-word truncation
-        chunk = text[:new_len]
-        last_space = chunk.rfind(" ")
-        if last_space > len(text) // 2:
-            new_len = last_space
-        text = text[:new_len]
-    return text
+    """
+    Longest prefix of text (cut at a space when possible) with at most max_tokens tokens.
+    With tiktoken, one encode gives the cut directly: the offset of token max_tokens. Without
+    it, _shrink_by_search finds the length with a few token counts. Texts of up to
+    max_tokens // 4 characters always fit and are returned without encoding.
+    """
+    if len(text) <= max_tokens // _UTF8_MAX_BYTES_PER_CHAR or len(text) <= _SHRINK_MIN_CHARS:
+        return text
+    end = _cached_token_prefix_end(text, max_tokens)
+    if end is None:
+        return _shrink_by_search(text, max_tokens=max_tokens)
+    if end >= len(text):
+        return text
+    return _cut_at_space(text, max(end, _SHRINK_MIN_CHARS))
+
+
+# Cut offsets of recently shrunk texts by content digest, so the same document extracted again
+# in this process (re-runs, duplicates) is not re-encoded. Digests rather than texts as keys
+# keep memory bounded; see _cached_token_prefix_end.
+TOKEN_PREFIX_CACHE_SIZE = 256
+_token_prefix_cache: OrderedDict[tuple[bytes, int], int] = OrderedDict()
+_token_prefix_cache_lock = threading.Lock()
+
+
+def _cached_token_prefix_end(text: str, max_tokens: int) -> int | None:
+    key = (hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest(), max_tokens)
+    with _token_prefix_cache_lock:
+        end = _token_prefix_cache.get(key)
+        if end is not None:
+            _token_prefix_cache.move_to_end(key)
+            return end
+    end = _token_prefix_end(text, max_tokens)
+    if end is not None:
+        with _token_prefix_cache_lock:
+            _token_prefix_cache[key] = end
+            while len(_token_prefix_cache) > TOKEN_PREFIX_CACHE_SIZE:
+                _token_prefix_cache.popitem(last=False)
+    return end
+
+
+def _token_prefix_end(text: str, max_tokens: int) -> int | None:
+    """
+    Length of the prefix of text made of its first max_tokens tokens (len(text) if it fits), or
+    None without tiktoken. Long texts are encoded only up to a _MAX_CHARS_PER_TOKEN prefix
+    unless that prefix still fits.
+    """
+    cap = _MAX_CHARS_PER_TOKEN * (max_tokens + 1)
+    if cap < len(text):
+        offsets = _token_offsets(text[:cap])
+        if offsets is None:
+            return None
+        if len(offsets) > max_tokens:
+            return offsets[max_tokens]
+    offsets = _token_offsets(text)
+    if offsets is None:
+        return None
+    return offsets[max_tokens] if len(offsets) > max_tokens else len(text)
+
+
+def _shrink_by_search(text: str, *, max_tokens: int) -> str:
+    """
+    _shrink_to_token_limit via _token_count only: interpolation search between a fitting and a
+    non-fitting prefix length, stopping within _SHRINK_TOLERANCE_CHARS or once a fitting prefix
+    uses 99% of the budget. The first count covers at most a _MAX_CHARS_PER_TOKEN prefix.
+    """
+    hi = len(text)
+    hi_count = 0
+    cap = _MAX_CHARS_PER_TOKEN * (max_tokens + 1)
+    if _SHRINK_MIN_CHARS < cap < hi:
+        hi_count = _token_count(text[:cap])
+        if hi_count > max_tokens:
+            hi = cap
+    if hi == len(text):
+        # No cap, or the capped prefix still fit (unusually long tokens): count the whole text.
+        hi_count = _token_count(text)
+        if hi_count <= max_tokens:
+            return text
+    lo = _SHRINK_MIN_CHARS
+    lo_count = _token_count(text[:lo])
+    if lo_count > max_tokens:
+        return text[:lo]
+    good_enough = max_tokens - max_tokens // 100
+    while hi - lo > _SHRINK_TOLERANCE_CHARS and lo_count < good_enough:
+        mid = lo + (hi - lo) * (max_tokens - lo_count) // max(1, hi_count - lo_count)
+        # Keep every step shrinking the interval by at least 1/8, even for skewed counts.
+        step = (hi - lo) // 8
+        mid = min(max(mid, lo + step), hi - step)
+        count = _token_count(text[:mid])
+        if count <= max_tokens:
+            lo, lo_count = mid, count
+        else:
+            hi, hi_count = mid, count
+    return _cut_at_space(text, lo)
+
+
+def _extraction_char_budget(max_tokens: int) -> int:
+    """Characters worth extracting for max_tokens: beyond this prefix length the text is cut anyway."""
+    return _MAX_CHARS_PER_TOKEN * (max_tokens + 1) if max_tokens > 0 else 0
+
+
+def _cut_at_space(text: str, end: int) -> str:
+    """text[:end], moved back to the last space (if that keeps more than half) unless it ends a word."""
+    if text[end : end + 1].isspace():
+        return text[:end]
+    # Prefer cut at last space to avoid mid-word truncation
+    last_space = text.rfind(" ", 0, end)
+    if last_space > end // 2:
+        end = last_space
+    return text[:end]
+
+
+def _import_fitz() -> Any:
+    """PyMuPDF, imported on use (optional dependency: ImportError when not installed)."""
+    import fitz
+
+    return fitz
+
+
+def _open_pdf(fitz: Any, path: Path, *, use_mmap: bool = True) -> tuple[Any, memoryview | None]:
+    """
+    Open path with PyMuPDF from a memoryview of a read-only memory map (PyMuPDF reads a memoryview
+    stream in place; it rejects the mmap object itself), so the page cache serves the document
+    without a copy. Empty or large files, streams PyMuPDF cannot open, and use_mmap=False are
+    opened by path. The mapping must outlive the document: release both with _close_pdf.
+    """
+    if not use_mmap:
+        return fitz.open(path), None
+    view: memoryview | None = None
+    try:
+        with open(path, "rb") as f:
+            if 0 < os.fstat(f.fileno()).st_size <= MMAP_OPEN_MAX_BYTES:
+                view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        view = None
+    if view is not None:
+        try:
+            return fitz.open(stream=view, filetype="pdf"), view
+        except Exception:
+            _close_pdf(None, view)
+    return fitz.open(path), None
+
+
+def _close_pdf(doc: Any, view: memoryview | None) -> None:
+    """Close doc, then unmap the memory it was opened from (if any)."""
+    try:
+        closer = getattr(doc, "close", None)
+        if callable(closer):
+            closer()
+    finally:
+        if view is not None:
+            mapping = view.obj
+            view.release()
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
 
 
 def pdf_to_text(
@@ -52,34 +320,73 @@ def pdf_to_text(
     *,
     max_tokens: int = CONTEXT_128K_MAX_CONTENT_TOKENS,
     max_pages: int = 0,
+    page_workers: int = 1,
+    use_mmap: bool = True,
 ) -> str:
     """
     Extracts text from a PDF via PyMuPDF (fitz). Import is done lazily so that
     core functionality can be tested without optional deps installed.
+    use_mmap=False opens by path (see MMAP_OPEN_MAX_BYTES), for files that may still change.
+
+    With page_workers > 1, documents of PAGE_PARALLEL_MIN_PAGES pages or more are split into
+    page ranges extracted in worker processes (a PyMuPDF document must not be shared across
+    threads, so each worker opens the file itself). Page order is preserved.
     """
     if filepath is None:
         return ""
     try:
-        import fitz  # type: ignore[import-not-found]
+        fitz = _import_fitz()
     except Exception as exc:  # pragma: no cover
         raise RuntimeError("PyMuPDF is required for PDF extraction. Install with: pip install -e '.[pdf]'") from exc
 
     path = Path(filepath)
     try:
-        doc = fitz.open(path)
+        doc, view = _open_pdf(fitz, path, use_mmap=use_mmap)
     except Exception as exc:
         logger.error("Error opening file %s: %s", path, exc)
         return ""
+    metadata: dict[str, Any] | None = None
+    try:
+        metadata = _doc_metadata(doc)
+    except Exception as exc:
+        logger.debug("Could not read metadata of %s: %s", path, exc)
+    _remember_pdf_info(_pdf_file_key(path), metadata, _doc_page_count(doc))
+    return _document_text(
+        doc,
+        path,
+        close=lambda: _close_pdf(doc, view),
+        max_tokens=max_tokens,
+        max_pages=max_pages,
+        page_workers=page_workers,
+    )
+
 
-    page_count = getattr(doc, "page_count", 0) or 0
+def _document_text(
+    doc: Any,
+    path: Path,
+    *,
+    close: Callable[[], None],
+    max_tokens: int,
+    max_pages: int,
+    page_workers: int,
+) -> str:
+    """pdf_to_text for an open document; close is called once its pages are read."""
+    page_count = _doc_page_count(doc)
     if max_pages > 0:
         page_count = min(page_count, max_pages)
     try:
-        pieces = _extract_pages(doc, path, max_pages=max_pages)
+        pieces = None
+        if page_workers > 1 and page_count >= PAGE_PARALLEL_MIN_PAGES:
+            try:
+                pieces = _extract_pages_parallel(
+                    path, page_count, page_workers, max_chars=_extraction_char_budget(max_tokens)
+                )
+            except Exception as exc:
+                logger.warning("Parallel page extraction failed for %s (%s); extracting serially.", path, exc)
+        if pieces is None:
+            pieces = _extract_pages(doc, path, max_pages=max_pages, max_chars=_extraction_char_budget(max_tokens))
     finally:
-        closer = getattr(doc, "close", None)
-        if callable(closer):
-            closer()
+        close()
 
     content = "\n".join(pieces).strip()
     if not content:
@@ -102,6 +409,10 @@ def _ocr_language_code(lang: str) -> str:
     return "deu"
 
 
+def _doc_page_count(doc: Any) -> int:
+    return int(getattr(doc, "page_count", 0) or 0)
+
+
 def pdf_to_text_with_ocr(
     filepath: str | Path | None,
     *,
@@ -109,6 +420,8 @@ def pdf_to_text_with_ocr(
     max_pages: int = 0,
     min_chars_for_ocr: int = MIN_CHARS_BEFORE_OCR,
     language: str = "de",
+    page_workers: int = 1,
+    use_mmap: bool = True,
 ) -> str:
     """
     Extract text from a PDF; if too little text is found and OCRmyPDF is
@@ -120,6 +433,8 @@ def pdf_to_text_with_ocr(
         filepath,
         max_tokens=max_tokens,
         max_pages=max_pages,
+        page_workers=page_workers,
+        use_mmap=use_mmap,
     )
     if not filepath or len(text.strip()) >= min_chars_for_ocr:
         return text
@@ -133,30 +448,44 @@ def pdf_to_text_with_ocr(
         return text
 
     path = Path(filepath)
-    if not path.exists() or not path.is_file():
+    if not path.is_file():  # one stat: False for missing paths too
         return text
 
-    tmp = None
     try:
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False, prefix="ai_pdf_renamer_ocr_") as f:
-            tmp = Path(f.name)
+        # OCRmyPDF already OCRs pages in parallel (one job per CPU by default); an explicit
+        # page_workers caps it, e.g. when several files are processed at once.
+        ocr_options: dict[str, Any] = {"jobs": page_workers} if page_workers > 1 else {}
+        # Recorded by pdf_to_text above; when unknown, every page is OCR'd.
+        page_count = _cached_page_count(path)
+        if page_count is not None and 0 < max_pages < page_count:
+            # Only the pages that will be read get OCR'd; the rest are copied through untouched.
+            ocr_options["pages"] = f"1-{max_pages}"
+        # The OCR'd PDF is written to memory and read back from there: no temp file round-trip.
+        output = io.BytesIO()
         ocrmypdf.ocr(
             str(path),
-            str(tmp),
+            output,
             language=_ocr_language_code(language),
+            optimize=0,  # output is only read back for text; skip image optimization
+            **ocr_options,
+        )
+        fitz = _import_fitz()
+
+        doc = fitz.open(stream=output.getvalue(), filetype="pdf")
+        # Serial: page workers open a file path, and OCR dominates the time here anyway.
+        text_ocr = _document_text(
+            doc,
+            path,
+            close=lambda: _close_pdf(doc, None),
+            max_tokens=max_tokens,
+            max_pages=max_pages,
+            page_workers=1,
         )
-        text_ocr = pdf_to_text(tmp, max_tokens=max_tokens, max_pages=max_pages)
         if text_ocr.strip():
             logger.info("OCR produced %s chars for %s", len(text_ocr.strip()), path.name)
             return text_ocr
     except Exception as exc:
         logger.warning("OCR failed for %s: %s. Using original extraction.", path, exc)
-    finally:
-        if tmp is not None and tmp.exists():
-            try:
-                tmp.unlink()
-            except OSError:
-                pass
     return text
 
 
@@ -164,21 +493,22 @@ def _parse_pdf_date(value: str | None) -> date | None:
     """Parse PDF metadata date string (D:YYYYMMDD...) to date. Returns None if invalid or missing."""
     if not value or not isinstance(value, str):
         return None
-    m = _PDF_DATE_PREFIX.match(value.strip())
-    if not m:
+    # Fixed layout D:YYYYMMDDHHmmss... or D:YYYYMMDD: slice instead of running a regex.
+    v = value.strip()
+    if len(v) < 10 or not v.startswith("D:") or not v[2:10].isdecimal():
         return None
     try:
-        y, mo, d = int(m.group(1)), int(m.group(2)), int(m.group(3))
-        return date(y, mo, d)
-    except (ValueError, TypeError):
+        return date(int(v[2:6]), int(v[6:8]), int(v[8:10]))
+    except ValueError:
         return None
 
 
-def get_pdf_metadata(filepath: str | Path | None) -> dict[str, Any]:
+def get_pdf_metadata(filepath: str | Path | None, *, use_mmap: bool = True) -> dict[str, Any]:
     """
     Read PDF metadata (Title, Author, CreationDate, ModDate) without extracting text.
     Returns dict with keys: title (str), author (str), creation_date (YYYY-MM-DD or None),
     mod_date (YYYY-MM-DD or None). Empty dict on error or missing PyMuPDF.
+    use_mmap as in pdf_to_text.
     """
     result: dict[str, Any] = {
         "title": "",
@@ -189,92 +519,295 @@ def get_pdf_metadata(filepath: str | Path | None) -> dict[str, Any]:
     if not filepath:
         return result
     try:
-        import fitz  # type: ignore[import-not-found]
+        fitz = _import_fitz()
     except Exception:
         return result
     path = Path(filepath)
+    file_key = _pdf_file_key(path)
+    if file_key is not None:
+        with _pdf_info_cache_lock:
+            cached = _pdf_info_cache.get(file_key)
+        if cached is not None and cached[0] is not None:
+            return dict(cached[0])
     try:
-        doc = fitz.open(path)
+        doc, view = _open_pdf(fitz, path, use_mmap=use_mmap)
     except Exception as exc:
         logger.debug("Could not open PDF for metadata %s: %s", path, exc)
         return result
     try:
-        meta = doc.metadata or {}
-        result["title"] = (meta.get("title") or "").strip()
-        result["author"] = (meta.get("author") or "").strip()
-        for key, out_key in (
-            ("creationDate", "creation_date"),
-            ("modDate", "mod_date"),
-        ):
-            d = _parse_pdf_date(meta.get(key))
-            result[out_key] = d.strftime("%Y-%m-%d") if d else None
+        result.update(_doc_metadata(doc))
+        page_count = _doc_page_count(doc)
     finally:
-        closer = getattr(doc, "close", None)
-        if callable(closer):
-            closer()
+        _close_pdf(doc, view)
+    _remember_pdf_info(file_key, result, page_count)
+    return result
+
+
+def _doc_metadata(doc: Any) -> dict[str, Any]:
+    meta = doc.metadata or {}
+    result: dict[str, Any] = {
+        "title": (meta.get("title") or "").strip(),
+        "author": (meta.get("author") or "").strip(),
+    }
+    for key, out_key in (
+        ("creationDate", "creation_date"),
+        ("modDate", "mod_date"),
+    ):
+        d = _parse_pdf_date(meta.get(key))
+        result[out_key] = d.strftime("%Y-%m-%d") if d else None
     return result
 
 
-def _extract_pages(doc: Any, path: Path, *, max_pages: int = 0) -> list[str]:
+# Metadata (None if unreadable) and page count of recently opened PDFs, keyed by
+# (path, mtime_ns, size): pdf_to_text records them while the document is open anyway, so a
+# following get_pdf_metadata or OCR page limit needs no second open.
+PDF_METADATA_CACHE_SIZE = 64
+_pdf_info_cache: OrderedDict[tuple[str, int, int], tuple[dict[str, Any] | None, int]] = OrderedDict()
+_pdf_info_cache_lock = threading.Lock()
+
+
+def _pdf_file_key(path: Path) -> tuple[str, int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _remember_pdf_info(file_key: tuple[str, int, int] | None, metadata: dict[str, Any] | None, page_count: int) -> None:
+    if file_key is None:
+        return
+    with _pdf_info_cache_lock:
+        _pdf_info_cache[file_key] = (dict(metadata) if metadata is not None else None, page_count)
+        while len(_pdf_info_cache) > PDF_METADATA_CACHE_SIZE:
+            _pdf_info_cache.popitem(last=False)
+
+
+def _cached_page_count(path: Path) -> int | None:
+    """Page count recorded for the unchanged file at path, None if it was not opened recently."""
+    file_key = _pdf_file_key(path)
+    if file_key is None:
+        return None
+    with _pdf_info_cache_lock:
+        cached = _pdf_info_cache.get(file_key)
+    return cached[1] if cached is not None else None
+
+
+def _shared_textpage(page: Any) -> Any:
+    """
+    One TextPage (the parsed page layout) for all strategies of a page, so a fallback only
+    reformats it instead of parsing the page again. None when unavailable; each get_text then
+    parses the page itself.
+    """
+    try:
+        fitz = _import_fitz()
+
+        return page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+    except Exception:
+        return None
+
+
+def _get_text(page: Any, mode: str, textpage: Any) -> Any:
+    if textpage is None:
+        return page.get_text(mode)
+    return page.get_text(mode, textpage=textpage)
+
+
+def _plain_text(page: Any, textpage: Any = None) -> str:
+    return (_get_text(page, "text", textpage) or "").strip()
+
+
+def _blocks_text(page: Any, textpage: Any = None) -> str:
+    blocks = _get_text(page, "blocks", textpage) or []
+    # Strip each block once, as it is filtered (the joined text needs no further strip).
+    return " ".join(stripped for b in blocks if len(b) > 4 and (stripped := str(b[4]).strip()))
+
+
+def _dict_text(page: Any, textpage: Any = None) -> str:
+    # "dict" rather than "rawdict": rawdict spans carry per-glyph "chars" and no "text", and
+    # are several times larger to build.
+    page_dict = _get_text(page, "dict", textpage) or {}
+    return " ".join(
+        stripped
+        for block in page_dict.get("blocks", [])
+        for line in block.get("lines", [])
+        for span in line.get("spans", [])
+        if (stripped := (span.get("text") or "").strip())
+    )
+
+
+def _has_images(page: Any) -> bool:
+    try:
+        return bool(page.get_images())
+    except Exception:
+        return False
+
+
+# Per-page strategies, tried in order; a later one only runs when the earlier ones found no text.
+_PAGE_TEXT_STRATEGIES: tuple[tuple[str, Callable[[Any, Any], str]], ...] = (
+    ("text", _plain_text),
+    ("blocks", _blocks_text),
+    ("dict", _dict_text),
+)
+
+
+# Process pool for page-parallel extraction: created on first use, reused across documents,
+# replaced when the worker count changes or a worker died, and shut down at exit.
+_page_pool_executor: ProcessPoolExecutor | None = None
+_page_pool_workers = 0
+_page_pool_lock = threading.Lock()
+
+
+def _page_pool_context() -> multiprocessing.context.BaseContext:
+    # Not fork: the caller already runs --workers and prefetch threads, whose locks a forked
+    # child would inherit in whatever state they were in.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _page_pool(workers: int) -> ProcessPoolExecutor:
+    global _page_pool_executor, _page_pool_workers
+    with _page_pool_lock:
+        if _page_pool_executor is None or _page_pool_workers != workers:
+            if _page_pool_executor is not None:
+                _page_pool_executor.shutdown(wait=False, cancel_futures=True)
+            _page_pool_executor = ProcessPoolExecutor(max_workers=workers, mp_context=_page_pool_context())
+            _page_pool_workers = workers
+        return _page_pool_executor
+
+
+def _discard_page_pool(pool: ProcessPoolExecutor) -> None:
+    """Shut down pool and forget it if it is the shared one (e.g. broken), so the next call starts afresh."""
+    global _page_pool_executor
+    with _page_pool_lock:
+        if _page_pool_executor is pool:
+            _page_pool_executor = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_page_pool() -> None:
+    """Stop the page-extraction worker processes (also run at interpreter exit)."""
+    global _page_pool_executor
+    with _page_pool_lock:
+        pool, _page_pool_executor = _page_pool_executor, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _extract_page_range(path_str: str, first: int, stop: int, max_chars: int = 0) -> list[str]:
+    """Worker entry point: open the PDF in this process and extract pages [first, stop)."""
+    fitz = _import_fitz()
+
+    path = Path(path_str)
+    doc = fitz.open(path)
+    try:
+        return _extract_pages(doc, path, first=first, max_pages=stop, max_chars=max_chars)
+    finally:
+        doc.close()
+
+
+def _extract_pages_parallel(path: Path, page_count: int, workers: int, *, max_chars: int = 0) -> list[str]:
+    """
+    Pages [0, page_count) in ranges of up to PAGE_PARALLEL_RANGE_PAGES, at most `workers` ranges in
+    flight, collected in page order. With max_chars > 0, no further range is started once the text
+    so far reaches max_chars, as in the serial _extract_pages.
+    """
+    step = max(1, min(PAGE_PARALLEL_RANGE_PAGES, -(-page_count // workers)))
+    starts = iter(range(0, page_count, step))
+    pool = _page_pool(workers)
+    pending: deque[Future[list[str]]] = deque()
+
+    def submit_next() -> None:
+        first = next(starts, None)
+        if first is not None:
+            stop = min(first + step, page_count)
+            pending.append(pool.submit(_extract_page_range, str(path), first, stop, max_chars))
+
     pieces: list[str] = []
+    total_chars = 0
+    try:
+        for _ in range(workers):
+            submit_next()
+        while pending:
+            range_pieces = pending.popleft().result()
+            pieces.extend(range_pieces)
+            total_chars += sum(len(piece) + 1 for piece in range_pieces)
+            if max_chars > 0 and total_chars >= max_chars:
+                break
+            submit_next()
+    except BrokenProcessPool:
+        _discard_page_pool(pool)
+        raise
+    finally:
+        for fut in pending:
+            fut.cancel()
+    return pieces
+
+
+def _extract_pages(
+    doc: Any,
+    path: Path,
+    *,
+    max_pages: int = 0,
+    first: int = 0,
+    max_chars: int = 0,
+) -> list[str]:
+    """
+    Text of pages [first, limit), one piece per page with text. With max_chars > 0, stops after
+    the page that brings the total to max_chars (the rest would be cut by the token limit anyway).
+    """
+    pieces: list[str] = []
+    total_chars = 0
     limit = min(doc.page_count, max_pages) if max_pages > 0 else doc.page_count
-    for page_number in range(limit):
+    for page_number in range(first, limit):
         try:
             page = doc[page_number]
         except Exception as exc:
             logger.error("Error accessing page %s in %s: %s", page_number, path, exc)
             continue
 
-        # Prefer single strategy to avoid triple text (text + blocks + rawdict overlap)
+        # Single strategy per page (text, else blocks, else dict) to avoid triple text
+        # from overlapping extractions.
         page_text = ""
-        try:
-            page_text = (page.get_text("text") or "").strip()
-        except Exception as exc:
-            logger.warning(
-                "Page %s get_text('text') failed in %s: %s",
-                page_number,
-                path,
-                exc,
-            )
-        if not page_text:
+        textpage = _shared_textpage(page)
+        for mode, extract in _PAGE_TEXT_STRATEGIES:
             try:
-                blocks = page.get_text("blocks") or []
-                page_text = " ".join(b[4] for b in blocks if len(b) > 4 and str(b[4]).strip()).strip()
+                page_text = extract(page, textpage)
             except Exception as exc:
                 logger.warning(
-                    "Page %s get_text('blocks') failed in %s: %s",
+                    "Page %s get_text('%s') failed in %s: %s",
                     page_number,
+                    mode,
                     path,
                     exc,
                 )
-        if not page_text:
-            try:
-                rawdict = page.get_text("rawdict") or {}
-                parts = []
-                for block in rawdict.get("blocks", []):
-                    for line in block.get("lines", []):
-                        for span in line.get("spans", []):
-                            t = span.get("text", "")
-                            if t and t.strip():
-                                parts.append(t.strip())
-                page_text = " ".join(parts)
-            except Exception as exc:
-                logger.warning(
-                    "Page %s get_text('rawdict') failed in %s: %s",
-                    page_number,
-                    path,
-                    exc,
-                )
-
-        combined = page_text
-        if combined:
-            pieces.append(combined)
+                page_text = ""
+            else:
+                if not page_text and mode == "text" and _has_images(page):
+                    # Scanned page: the other strategies read the same empty text layer; OCR covers it.
+                    break
+            if page_text:
+                break
+
+        if page_text:
+            pieces.append(page_text)
             logger.debug(
                 "Combined extracted %s characters from page %s of %s",
-                len(combined),
+                len(page_text),
                 page_number,
                 path,
             )
+            total_chars += len(page_text) + 1
+            if max_chars > 0 and total_chars >= max_chars and page_number + 1 < limit:
+                logger.debug(
+                    "Stopping extraction of %s after page %s: %s chars exceed the token budget.",
+                    path,
+                    page_number,
+                    total_chars,
+                )
+                break
         else:
             logger.info("Page %s in %s yields no text.", page_number, path)
 
@@ -11,6 +11,7 @@ import logging
 import os
 import re
 import shutil
+import sys
 from collections.abc import Callable
 from pathlib import Path
 
@@ -27,18 +28,121 @@ FILENAME_RESERVED_WIN = frozenset(
 # Max retries for rename when target exists. After this, fail with clear message.
 MAX_RENAME_RETRIES = 20
 
+# Linux ioctl that makes dst share src's extents (copy-on-write clone on Btrfs, XFS, bcachefs...).
+_FICLONE = 0x40049409
+
+# MoveFileExW flag: let Windows copy+delete across volumes itself (server-side copy on SMB shares).
+_MOVEFILE_COPY_ALLOWED = 0x2
+
+# os.link errors meaning "no hard links here" (FAT/exFAT, some network and FUSE filesystems).
+_NO_HARDLINK_ERRNOS = frozenset(
+    code
+    for code in (
+        errno.EPERM,
+        errno.EMLINK,
+        errno.ENOSYS,
+        getattr(errno, "ENOTSUP", None),
+        getattr(errno, "EOPNOTSUPP", None),
+    )
+    if code is not None
+)
+
 
 def sanitize_filename_base(name: str) -> str:
     """Remove path separators and control chars; ensure non-empty; avoid Windows reserved names."""
-    if not name or not name.strip():
+    stripped = name.strip() if name else ""
+    if not stripped:
         return "unnamed"
-    safe = FILENAME_UNSAFE_RE.sub("", name.strip())
-    safe = safe.strip() or "unnamed"
+    # re.sub beats str.translate here: names are short, mostly clean and often non-ASCII.
+    safe = FILENAME_UNSAFE_RE.sub("", stripped).strip() or "unnamed"
     if safe.upper() in FILENAME_RESERVED_WIN:
         return f"{safe}_"
     return safe
 
 
+def _rename_no_replace(src: Path, dst: Path) -> None:
+    """
+    Rename src to dst, raising FileExistsError instead of replacing an existing dst.
+    On Windows MoveFileExW without MOVEFILE_REPLACE_EXISTING refuses to replace, and with
+    MOVEFILE_COPY_ALLOWED also moves across volumes. On POSIX, where os.rename would silently
+    overwrite, a hard link claims dst atomically (EEXIST if taken) and the old name is removed;
+    without hard-link support this falls back to an existence check before the rename.
+    """
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        if not kernel32.MoveFileExW(str(src), str(dst), _MOVEFILE_COPY_ALLOWED):
+            # WinError maps ERROR_ALREADY_EXISTS/ERROR_FILE_EXISTS to FileExistsError.
+            raise ctypes.WinError(ctypes.get_last_error())
+        return
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError as exc:
+        if exc.errno not in _NO_HARDLINK_ERRNOS:
+            raise
+        if dst.exists():
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(dst)) from None
+        os.rename(src, dst)
+        return
+    try:
+        os.unlink(src)
+    except OSError:
+        # Leave the file under its old name only.
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        raise
+
+
+def _clone_or_copy(src: Path, dst: Path) -> None:
+    """
+    Copy src to dst with metadata like shutil.copy2. On Linux a copy-on-write clone (FICLONE) is
+    tried first: on filesystems that support it the backup costs no data IO. Anywhere else, or
+    when the clone is refused (other filesystem type, cross-device), this is a plain copy2.
+    """
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            pass
+        else:
+            shutil.copystat(src, dst)
+            return
+    shutil.copy2(src, dst)
+
+
+def _next_free_target(file_path: Path, base: str, counter: int) -> tuple[int, str, Path]:
+    """
+    First name "base[_counter]" (counting up) that does not exist next to file_path.
+    The first candidate costs one stat; once it is taken, a single directory listing answers
+    the following suffixes from memory instead of one stat each. The pick is re-checked with
+    a stat, so names the listing missed (case-insensitive filesystems, new files) still count.
+    """
+    suffix = file_path.suffix
+    current_base = f"{base}_{counter}" if counter else base
+    target = file_path.with_name(current_base + suffix)
+    while target.exists():
+        try:
+            with os.scandir(file_path.parent) as entries:
+                taken = {entry.name for entry in entries}
+        except OSError:
+            taken = set()
+        counter += 1
+        current_base = f"{base}_{counter}"
+        while current_base + suffix in taken:
+            counter += 1
+            current_base = f"{base}_{counter}"
+        target = file_path.with_name(current_base + suffix)
+    return counter, current_base, target
+
+
 def apply_single_rename(
     file_path: Path,
     base: str,
@@ -53,19 +157,25 @@ def apply_single_rename(
     Apply rename for one file: collision loop, backup, optional plan.
     Returns (success, final_target).
 
-    Uses rename as the existence check to reduce TOCTOU. On FileExistsError, tries next suffix.
-    EXDEV (cross-fs): best-effort copy+unlink.
+    A real rename claims the target atomically (see _rename_no_replace), so an existing file is
+    never replaced and the usual uncontended rename needs no separate existence check. After a
+    collision, taken suffixes are skipped (see _next_free_target) before claiming again; plan
+    and dry-run modes, which rename nothing, only check existence. EXDEV (cross-fs): best-effort
+    copy+unlink.
     """
     suffix = file_path.suffix
     current_base = base
     target = file_path.with_name(base + suffix)
     counter = 0
+    claims_target = not plan_file_path and not dry_run
+    if claims_target and backup_dir:
+        backup_path = Path(backup_dir) / file_path.name
+        backup_path.parent.mkdir(parents=True, exist_ok=True)
+        _clone_or_copy(file_path, backup_path)
     for attempt in range(MAX_RENAME_RETRIES):
-        # Skip existing targets to avoid overwriting (os.rename replaces on Unix).
-        while target.exists():
-            counter += 1
-            current_base = f"{base}_{counter}"
-            target = file_path.with_name(current_base + suffix)
+        if not claims_target or attempt > 0:
+            # Skip names that are taken right now (os.rename alone would replace them on Unix).
+            counter, current_base, target = _next_free_target(file_path, base, counter)
         try:
             if plan_file_path:
                 if plan_entries is not None:
@@ -73,11 +183,7 @@ def apply_single_rename(
                 logger.info("Plan: %s -> %s", file_path.name, target.name)
                 return (True, target)
             if not dry_run:
-                if backup_dir:
-                    backup_path = Path(backup_dir) / file_path.name
-                    backup_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(file_path, backup_path)
-                os.rename(file_path, target)
+                _rename_no_replace(file_path, target)
                 if on_success is not None:
                     on_success(file_path, target, current_base)
             return (True, target)
@@ -7,12 +7,16 @@ import logging
 import os
 import re
 import sys
+import textwrap
+import threading
 import time
+from collections.abc import Callable
 from concurrent.futures import Future, ThreadPoolExecutor
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import date
-from functools import lru_cache
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import TextIO
 
 from .data_paths import data_path
 from .heuristics import (
@@ -22,12 +26,15 @@ from .heuristics import (
     normalize_llm_category,
 )
 from .llm import (
+    KeywordBatcher,
     LocalLLMClient,
     get_document_category,
     get_document_keywords,
+    get_document_metadata_fused,
     get_document_summary,
     get_final_summary_tokens,
 )
+from .llm_cache import open_llm_cache
 from .pdf_extract import (
     CONTEXT_128K_MAX_CONTENT_TOKENS,
     get_pdf_metadata,
@@ -49,16 +56,46 @@ from .text_utils import (
 # Min heuristic score to suggest doc type to LLM summary (otherwise None).
 _HEURISTIC_SUGGESTED_DOC_TYPE_MIN_SCORE = 0.25
 
+# Names this tool produces (YYYYMMDD-...pdf); skipped with skip_if_already_named.
+_ALREADY_NAMED_RE = re.compile(r"\d{8}-.+\.pdf", re.IGNORECASE)
 
-def _matches_patterns(name: str, include: list[str] | None, exclude: list[str] | None) -> bool:
-    """True if basename matches include (if set) and does not match any exclude."""
-    if include is not None and include:
-        if not any(fnmatch.fnmatch(name, p) for p in include):
-            return False
-    if exclude is not None and exclude:
-        if any(fnmatch.fnmatch(name, p) for p in exclude):
-            return False
-    return True
+
+def _compile_name_matcher(patterns: list[str] | None) -> Callable[[str], bool] | None:
+    """
+    One compiled regex for a list of fnmatch globs (None when there are none). Matches like
+    fnmatch.fnmatch: name and patterns are os.path.normcase'd (case-insensitive on Windows).
+    """
+    if not patterns:
+        return None
+    match = re.compile("|".join(fnmatch.translate(os.path.normcase(p)) for p in patterns)).match
+    return lambda name: match(os.path.normcase(name)) is not None
+
+
+# A recursive scan lists the directories of each tree level on this many threads, so the
+# readdir latency of network shares overlaps.
+COLLECT_SCAN_WORKERS = 8
+
+
+def _scan_dir(directory: str) -> tuple[list[str], list[str]]:
+    """
+    (PDF paths, subdirectory paths) in one directory, classified from the directory entries
+    without a stat per path. Symlinked directories are not followed; unreadable ones yield nothing.
+    """
+    pdfs: list[str] = []
+    subdirs: list[str] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.lower().endswith(".pdf") and not entry.name.startswith(".") and entry.is_file():
+                        pdfs.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return pdfs, subdirs
 
 
 def _collect_pdf_files(
@@ -75,26 +112,30 @@ def _collect_pdf_files(
     if files_override is not None:
         candidates = [p for p in files_override if p.is_file() and p.suffix.lower() == ".pdf"]
     elif recursive:
+        # Breadth-first, one tree level at a time; files directly in directory are at depth 1.
         candidates = []
-        for p in directory.rglob("*.pdf"):
-            if not p.is_file() or p.name.startswith("."):
-                continue
-            if max_depth > 0:
-                try:
-                    rel = p.relative_to(directory)
-                    if len(rel.parts) > max_depth:
-                        continue
-                except ValueError:
-                    continue
-            candidates.append(p)
+        level = [str(directory)]
+        depth = 1
+        with ThreadPoolExecutor(max_workers=COLLECT_SCAN_WORKERS) as pool:
+            while level:
+                next_level: list[str] = []
+                for pdfs, subdirs in pool.map(_scan_dir, level):
+                    candidates.extend(Path(p) for p in pdfs)
+                    next_level.extend(subdirs)
+                if max_depth > 0 and depth >= max_depth:
+                    break
+                level = next_level
+                depth += 1
     else:
         candidates = [
             p for p in directory.iterdir() if p.is_file() and p.suffix.lower() == ".pdf" and not p.name.startswith(".")
         ]
-    out = [p for p in candidates if _matches_patterns(p.name, include_patterns, exclude_patterns)]
+    # Basename must match an include glob (if any) and no exclude glob.
+    include = _compile_name_matcher(include_patterns)
+    exclude = _compile_name_matcher(exclude_patterns)
+    out = [p for p in candidates if (include is None or include(p.name)) and (exclude is None or not exclude(p.name))]
     if skip_if_already_named:
-        already_named = re.compile(r"^\d{8}-.+\.[pP][dD][fF]$")
-        out = [p for p in out if not already_named.match(p.name)]
+        out = [p for p in out if not _ALREADY_NAMED_RE.fullmatch(p.name)]
     return out
 
 
@@ -134,23 +175,100 @@ def _write_json_or_csv(
             json.dump(rows, f, ensure_ascii=False, indent=2)
 
 
+_EXPORT_FIELDNAMES = ["path", "new_name", "category", "summary", "keywords", "invoice_id", "amount", "company"]
+
+
+class _RenameLogWriter:
+    """
+    Rename log (old<TAB>new per line) held open in append mode for a whole run; opened on the
+    first rename. Line-buffered so each entry reaches the OS at once and undo works after a crash.
+    """
+
+    def __init__(self, path: str | Path | None) -> None:
+        self.path = Path(path) if path else None
+        self._file: TextIO | None = None
+
+    def __enter__(self) -> _RenameLogWriter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def write(self, file_path: Path, target: Path) -> None:
+        if self.path is None:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._file.write(f"{file_path}\t{target}\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _MetadataExportWriter:
+    """
+    Streams export rows to CSV (.csv) or a JSON array, one row per rename, instead of collecting
+    them for the end of the run. Output matches _write_json_or_csv; the file is created on the first row.
+    """
+
+    def __init__(self, path: str | Path | None) -> None:
+        self.path = Path(path) if path else None
+        self._file: TextIO | None = None
+        self._csv: csv.DictWriter[str] | None = None
+        self.count = 0
+
+    def __enter__(self) -> _MetadataExportWriter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def write(self, row: dict) -> None:
+        if self.path is None:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            is_csv = self.path.suffix.lower() == ".csv"
+            self._file = open(self.path, "w", newline="" if is_csv else None, encoding="utf-8")
+            if is_csv:
+                self._csv = csv.DictWriter(self._file, fieldnames=_EXPORT_FIELDNAMES)
+                self._csv.writeheader()
+            else:
+                self._file.write("[")
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            item = textwrap.indent(json.dumps(row, ensure_ascii=False, indent=2), "  ")
+            self._file.write(("," if self.count else "") + "\n" + item)
+        self.count += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            if self._csv is None:
+                self._file.write("\n]")
+            self._file.close()
+            self._file = None
+            self._csv = None
+
+
 def _apply_post_rename_actions(
     config: RenamerConfig,
     file_path: Path,
     target: Path,
     current_base: str,
     meta: dict,
-    export_rows: list[dict],
+    rename_log: _RenameLogWriter,
+    export: _MetadataExportWriter,
 ) -> None:
-    """Write rename log, PDF metadata, and export row after a successful rename. Mutates export_rows."""
-    if config.rename_log_path:
-        Path(config.rename_log_path).parent.mkdir(parents=True, exist_ok=True)
-        with open(config.rename_log_path, "a", encoding="utf-8") as f:
-            f.write(f"{file_path}\t{target}\n")
+    """Write rename log, PDF metadata, and export row after a successful rename."""
+    rename_log.write(file_path, target)
     if config.write_pdf_metadata:
         _write_pdf_title_metadata(target, current_base)
     if config.export_metadata_path:
-        export_rows.append(
+        export.write(
             {
                 "path": str(file_path),
                 "new_name": target.name,
@@ -186,7 +304,19 @@ def _llm_client_from_config(config: RenamerConfig) -> LocalLLMClient:
             timeout_s = 60.0
         if timeout_s <= 0:
             timeout_s = 60.0
-    return LocalLLMClient(base_url=base_url, model=model, timeout_s=timeout_s)
+    cache_path = _config_or_env(
+        str(config.llm_cache_path) if config.llm_cache_path else None,
+        "AI_PDF_RENAMER_LLM_CACHE",
+        "",
+    )
+    cache = open_llm_cache(str(Path(cache_path).expanduser())) if cache_path else None
+    return LocalLLMClient(
+        base_url=base_url,
+        model=model,
+        timeout_s=timeout_s,
+        cache=cache,
+        stream_json=config.llm_stream_json,
+    )
 
 
 def _effective_max_tokens(config: RenamerConfig) -> int:
@@ -203,18 +333,22 @@ def _effective_max_tokens(config: RenamerConfig) -> int:
 
 
 def _extract_pdf_content(path: Path, config: RenamerConfig) -> str:
-    """Extract text from PDF (OCR or plain) according to config. Used by _process_one_file and single-worker loop."""
+    """Extract text from PDF (OCR or plain) according to config. Used by the worker pipeline and single-worker loop."""
     if config.use_ocr:
         return pdf_to_text_with_ocr(
             path,
             max_pages=config.max_pages_for_extraction or 0,
             max_tokens=_effective_max_tokens(config),
             language=config.language,
+            page_workers=config.pdf_page_workers,
+            use_mmap=config.pdf_mmap,
         )
     return pdf_to_text(
         path,
         max_pages=config.max_pages_for_extraction or 0,
         max_tokens=_effective_max_tokens(config),
+        page_workers=config.pdf_page_workers,
+        use_mmap=config.pdf_mmap,
     )
 
 
@@ -291,10 +425,17 @@ class RenamerConfig:
     heuristic_long_doc_chars_threshold: int = 40_000
     heuristic_long_doc_leading_chars: int = 12_000
     max_pages_for_extraction: int = 0  # If > 0, only extract text from first N pages
+    # Worker processes for page-parallel extraction of long PDFs (1 = serial).
+    pdf_page_workers: int = 1
+    # Open PDFs from a read-only memory map. Off in watch mode: a file truncated while mapped
+    # crashes the process (SIGBUS) instead of failing that file.
+    pdf_mmap: bool = True
     # LLM (env: AI_PDF_RENAMER_LLM_URL, AI_PDF_RENAMER_LLM_MODEL, AI_PDF_RENAMER_LLM_TIMEOUT)
     llm_base_url: str | None = None
     llm_model: str | None = None
     llm_timeout_s: float | None = None
+    # Persistent SQLite cache for deterministic LLM responses (env: AI_PDF_RENAMER_LLM_CACHE). None = off.
+    llm_cache_path: str | Path | None = None
     # PDF extraction token cap (env: AI_PDF_RENAMER_MAX_TOKENS)
     max_tokens_for_extraction: int | None = None
     # UX: skip PDFs whose name already matches YYYYMMDD-*.pdf
@@ -334,6 +475,16 @@ class RenamerConfig:
     use_llm: bool = True
     # If True, try to extract JSON fields from LLM responses that don't start with "{" (regex fallback).
     lenient_llm_json: bool = False
+    # If True, stream LLM completions and stop reading once the JSON object has closed.
+    llm_stream_json: bool = False
+    # Prompt variants sent concurrently per LLM field; first usable answer wins (1 = one at a time).
+    llm_race_prompts: int = 1
+    # If True, a title-like first line is used as the summary without asking the LLM.
+    summary_from_title: bool = False
+    # If True, summary, keywords, category and final summary come from one LLM call per file.
+    llm_fused_metadata: bool = False
+    # If True and workers > 1, keyword requests of files summarized at about the same time share one LLM call.
+    llm_batch_keywords: bool = False
 
     def __post_init__(self) -> None:
         if self.desired_case not in _VALID_DESIRED_CASES:
@@ -359,9 +510,12 @@ def _get_date_str(
     pdf_content: str,
     config: RenamerConfig,
     today: date | None = None,
-    pdf_metadata: dict | None = None,
+    pdf_metadata: dict | Callable[[], dict] | None = None,
 ) -> str:
-    """Extract date from content (and optionally PDF metadata fallback) and return YYYYMMDD string."""
+    """
+    Extract date from content (and optionally PDF metadata fallback) and return YYYYMMDD string.
+    pdf_metadata may be a loader, called only when the content has no date.
+    """
     content_date = extract_date_from_content(
         pdf_content,
         today=today,
@@ -375,6 +529,8 @@ def _get_date_str(
     today_str = today.strftime("%Y-%m-%d")
     if content_date != today_str and content_date:
         return content_date.replace("-", "")
+    if callable(pdf_metadata):
+        pdf_metadata = pdf_metadata()
     if pdf_metadata:
         for key in ("creation_date", "mod_date"):
             meta_date = pdf_metadata.get(key)
@@ -432,8 +588,10 @@ def _resolve_category_with_llm(
     llm_client: LocalLLMClient,
     summary: str,
     keywords: list[str],
+    llm_category: str | None = None,
 ) -> tuple[str, str]:
     """Resolve final category (heuristic + optional LLM, combine_categories).
+    llm_category is an LLM answer already at hand (fused call); otherwise the LLM is asked here.
     Returns (category, category_for_filename)."""
     if not config.use_llm:
         category_for_filename = heuristic_scorer.get_display_category(cat_heur, config.category_display)
@@ -454,25 +612,29 @@ def _resolve_category_with_llm(
     if skip_llm:
         cat_llm = cat_heur
     else:
-        top_n = heuristic_scorer.top_n_categories(
-            heuristic_text,
-            n=config.heuristic_suggestions_top_n,
-            language=config.language,
-            max_score_per_category=config.max_score_per_category,
-            title_weight_region=config.title_weight_region,
-            title_weight_factor=config.title_weight_factor,
-        )
-        suggested = [c for c in top_n if c and c != "unknown"]
         allowed = list(heuristic_scorer.all_categories()) if config.use_constrained_llm_category else None
-        cat_llm = get_document_category(
-            llm_client,
-            summary=summary,
-            keywords=keywords,
-            language=config.language,
-            suggested_categories=suggested if not allowed else None,
-            allowed_categories=allowed,
-            lenient_json=config.lenient_llm_json,
-        )
+        if llm_category is not None:
+            cat_llm = llm_category
+        else:
+            top_n = heuristic_scorer.top_n_categories(
+                heuristic_text,
+                n=config.heuristic_suggestions_top_n,
+                language=config.language,
+                max_score_per_category=config.max_score_per_category,
+                title_weight_region=config.title_weight_region,
+                title_weight_factor=config.title_weight_factor,
+            )
+            suggested = [c for c in top_n if c and c != "unknown"]
+            cat_llm = get_document_category(
+                llm_client,
+                summary=summary,
+                keywords=keywords,
+                language=config.language,
+                suggested_categories=suggested if not allowed else None,
+                allowed_categories=allowed,
+                lenient_json=config.lenient_llm_json,
+                race_prompts=config.llm_race_prompts,
+            )
         if allowed:
             norm = normalize_llm_category(cat_llm).strip().lower().replace(" ", "_")
             allowed_set = frozenset(c.strip().lower().replace(" ", "_") for c in allowed)
@@ -525,8 +687,8 @@ def _build_metadata_tokens(
 ) -> tuple[list[str], list[str], list[str], dict]:
     """Filter, clean, subtract tokens; return (category_clean, keyword_clean, summary_clean, metadata)."""
     category_tokens = stopwords.filter_tokens(split_to_tokens(category_for_filename))
-    keyword_tokens = stopwords.filter_tokens(keywords)[:3]
-    summary_tokens = stopwords.filter_tokens(final_summary_tokens)[:5]
+    keyword_tokens = stopwords.filter_tokens(keywords, limit=3)
+    summary_tokens = stopwords.filter_tokens(final_summary_tokens, limit=5)
 
     category_clean = [clean_token(t) for t in category_tokens]
     keyword_clean = [clean_token(t) for t in keyword_tokens]
@@ -550,9 +712,11 @@ def _get_category_summary_keywords_metadata(
     heuristic_scorer: HeuristicScorer,
     stopwords: Stopwords,
     override_category: str | None,
+    keyword_batcher: KeywordBatcher | None = None,
 ) -> tuple[str, list[str], list[str], list[str], dict]:
     """Resolve category (override/heuristic/LLM), run LLM summary/keywords, clean tokens, build metadata.
-    Returns (category_for_filename, category_clean, keyword_clean, summary_clean, metadata)."""
+    Returns (category_for_filename, category_clean, keyword_clean, summary_clean, metadata).
+    With keyword_batcher, the keywords request is batched with those of concurrently processed files."""
     if override_category is not None:
         category = override_category
         cat_heur = override_category
@@ -573,24 +737,51 @@ def _get_category_summary_keywords_metadata(
             suggested_doc_type_for_summary,
         ) = _resolve_heuristic_category(heuristic_text, config, heuristic_scorer)
 
-    if config.use_llm:
+    fused_category: str | None = None
+    fused_final_summary: list[str] | None = None
+    if config.use_llm and config.llm_fused_metadata:
+        # One call for all four fields; the category is still combined with the heuristic below.
+        fused = get_document_metadata_fused(
+            llm_client,
+            pdf_content,
+            language=config.language,
+            suggested_doc_type=suggested_doc_type_for_summary,
+            allowed_categories=(
+                list(heuristic_scorer.all_categories()) if config.use_constrained_llm_category else None
+            ),
+            lenient_json=config.lenient_llm_json,
+            race_prompts=config.llm_race_prompts,
+            title_shortcut=config.summary_from_title,
+        )
+        summary = fused["summary"]
+        raw_keywords = fused["keywords"]
+        fused_category = fused["category"]
+        fused_final_summary = fused["final_summary"]
+    elif config.use_llm:
         summary = get_document_summary(
             llm_client,
             pdf_content,
             language=config.language,
             suggested_doc_type=suggested_doc_type_for_summary,
             lenient_json=config.lenient_llm_json,
+            race_prompts=config.llm_race_prompts,
+            title_shortcut=config.summary_from_title,
         )
-        raw_keywords = (
-            get_document_keywords(
-                llm_client,
-                summary,
-                language=config.language,
-                suggested_category=cat_heur if cat_heur != "unknown" else None,
-                lenient_json=config.lenient_llm_json,
+        suggested_category = cat_heur if cat_heur != "unknown" else None
+        if keyword_batcher is not None:
+            raw_keywords = keyword_batcher.keywords(summary, suggested_category=suggested_category) or []
+        else:
+            raw_keywords = (
+                get_document_keywords(
+                    llm_client,
+                    summary,
+                    language=config.language,
+                    suggested_category=suggested_category,
+                    lenient_json=config.lenient_llm_json,
+                    race_prompts=config.llm_race_prompts,
+                )
+                or []
             )
-            or []
-        )
     else:
         summary = ""
         raw_keywords = []
@@ -607,9 +798,12 @@ def _get_category_summary_keywords_metadata(
             llm_client,
             summary,
             keywords,
+            llm_category=fused_category,
         )
 
-    if config.use_llm:
+    if fused_final_summary is not None:
+        final_summary_tokens = fused_final_summary
+    elif config.use_llm:
         final_summary_tokens = (
             get_final_summary_tokens(
                 llm_client,
@@ -618,6 +812,7 @@ def _get_category_summary_keywords_metadata(
                 category=category,
                 language=config.language,
                 lenient_json=config.lenient_llm_json,
+                race_prompts=config.llm_race_prompts,
             )
             or []
         )
@@ -686,11 +881,14 @@ def _truncate_filename_to_max_chars(filename: str, config: RenamerConfig) -> str
     if not config.max_filename_chars or config.max_filename_chars <= 0 or len(filename) <= config.max_filename_chars:
         return filename
     sep = _filename_sep(config)
-    while len(filename) > config.max_filename_chars and sep in filename:
-        filename = filename.rsplit(sep, 1)[0]
-    if len(filename) > config.max_filename_chars:
-        filename = filename[: config.max_filename_chars]
-    return filename
+    # Walk the cut point left one separator at a time; slice once at the end.
+    end = len(filename)
+    while end > config.max_filename_chars:
+        cut = filename.rfind(sep, 0, end)
+        if cut < 0:
+            break
+        end = cut
+    return filename[: min(end, config.max_filename_chars)]
 
 
 def _build_filename_str(
@@ -757,16 +955,19 @@ def generate_filename(
     stopwords: Stopwords | None = None,
     override_category: str | None = None,
     today: date | None = None,
-    pdf_metadata: dict | None = None,
+    pdf_metadata: dict | Callable[[], dict] | None = None,
+    keyword_batcher: KeywordBatcher | None = None,
 ) -> tuple[str, dict]:
     """
     Constructs the final filename and metadata:
-    - date (YYYYMMDD), optionally from PDF metadata when content has no date
+    - date (YYYYMMDD), optionally from PDF metadata when content has no date (pdf_metadata
+      may be a loader, so the PDF is only opened for it in that case)
     - optional project
     - category (heuristic + optional LLM)
     - keywords (<=3)
     - short summary tokens (<=5)
     - optional version
+    keyword_batcher (optional) batches the keywords call with other files' (see KeywordBatcher).
     """
     if pdf_content is None or not isinstance(pdf_content, str):
         raise ValueError("pdf_content must be a non-None string")
@@ -783,6 +984,7 @@ def generate_filename(
             heuristic_scorer,
             stopwords,
             override_category,
+            keyword_batcher,
         )
     )
     structured_fields: dict[str, str] = {}
@@ -807,6 +1009,7 @@ def _process_content_to_result(
     file_path: Path,
     content: str,
     config: RenamerConfig,
+    keyword_batcher: KeywordBatcher | None = None,
 ) -> tuple[Path, str | None, dict | None, BaseException | None]:
     """
     Generate filename from already-extracted content. Returns (path, new_base, meta, error).
@@ -814,12 +1017,18 @@ def _process_content_to_result(
     """
     try:
         override_cat = (config.override_category_map or {}).get(file_path.name) or None
-        pdf_meta = get_pdf_metadata(file_path) if getattr(config, "use_pdf_metadata_for_date", True) else None
+        # Only opened for its dates when the content has none.
+        pdf_meta = (
+            partial(get_pdf_metadata, file_path, use_mmap=config.pdf_mmap)
+            if getattr(config, "use_pdf_metadata_for_date", True)
+            else None
+        )
         filename_str, meta = generate_filename(
             content,
             config=config,
             override_category=override_cat,
             pdf_metadata=pdf_meta,
+            keyword_batcher=keyword_batcher,
         )
         new_base = sanitize_filename_base(filename_str)
         return (file_path, new_base, meta or {}, None)
@@ -866,47 +1075,21 @@ def _interactive_rename_prompt(
         return ("y", base, current_target)
 
 
-def _process_one_file(
-    file_path: Path,
-    config: RenamerConfig,
-) -> tuple[Path, str | None, dict | None, BaseException | None]:
-    """
-    Extract text and generate filename for one file. Returns (path, new_base, meta, error).
-    If error is not None or new_base is None, the file should be counted as failed/skipped.
-    Empty or unextractable PDF: returns (path, None, None, None); caller logs and skips the file.
-    """
-    try:
-        content = _extract_pdf_content(file_path, config)
-    except Exception as exc:
-        return (file_path, None, None, exc)
-    if not content.strip():
-        return (file_path, None, None, None)  # skipped empty
-    try:
-        return _process_content_to_result(file_path, content, config)
-    except Exception as exc:
-        return (file_path, None, None, exc)
+# (file_path, new_base, meta, exc) for one file.
+_RenameResult = tuple[Path, str | None, dict | None, BaseException | None]
 
 
 def _produce_rename_results(
     files: list[Path],
     config: RenamerConfig,
-) -> list[tuple[Path, str | None, dict | None, BaseException | None]]:
+) -> list[_RenameResult]:
     """Produce (file_path, new_base, meta, exc) per file; parallel or single-worker with prefetch."""
     workers = max(1, getattr(config, "workers", 1) or 1)
     if config.interactive:
         workers = 1
     if workers > 1:
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            results = list(
-                executor.map(
-                    lambda p: _process_one_file(p, config),
-                    files,
-                )
-            )
-        order = {f: i for i, f in enumerate(files)}
-        results.sort(key=lambda r: order.get(r[0], 0))
-        return results
-    results = []
+        return _produce_rename_results_pipelined(files, config, workers)
+    results: list[_RenameResult] = []
     prefetched: Future[str] | None = None
     with ThreadPoolExecutor(max_workers=1) as executor:
         for i, file_path in enumerate(files):
@@ -927,6 +1110,63 @@ def _produce_rename_results(
     return results
 
 
+def _produce_rename_results_pipelined(files: list[Path], config: RenamerConfig, workers: int) -> list[_RenameResult]:
+    """
+    Extraction and filename generation (LLM) run in separate pools of `workers` threads, so
+    extracting the next files overlaps the LLM calls of earlier ones instead of each worker
+    doing both in turn. At most 2 * workers files are between the stages at once, which bounds
+    the extracted text held in memory. Results keep the order of files.
+    With config.llm_batch_keywords, the LLM workers send their keyword requests in shared batches.
+    """
+    results: list[_RenameResult | None] = [None] * len(files)
+    in_flight = threading.BoundedSemaphore(2 * workers)
+    keyword_batcher = (
+        KeywordBatcher(
+            _llm_client_from_config(config),
+            batch_size=workers,
+            language=config.language,
+            lenient_json=config.lenient_llm_json,
+            race_prompts=config.llm_race_prompts,
+        )
+        if config.use_llm and config.llm_batch_keywords and not config.llm_fused_metadata
+        else None
+    )
+
+    def generate(i: int, content: str) -> None:
+        try:
+            results[i] = _process_content_to_result(files[i], content, config, keyword_batcher=keyword_batcher)
+        except Exception as exc:
+            results[i] = (files[i], None, None, exc)
+        finally:
+            in_flight.release()
+
+    def after_extract(i: int, extracted: Future[str]) -> None:
+        try:
+            content = extracted.result()
+        except Exception as exc:
+            results[i] = (files[i], None, None, exc)
+        else:
+            if not content.strip():
+                results[i] = (files[i], None, None, None)  # skipped empty
+            else:
+                try:
+                    llm_pool.submit(generate, i, content)
+                    return
+                except Exception as exc:  # e.g. RuntimeError: pool shut down, thread not started
+                    results[i] = (files[i], None, None, exc)
+        in_flight.release()
+
+    # The extract pool is shut down first, so every LLM stage is submitted before llm_pool closes.
+    with ThreadPoolExecutor(max_workers=workers) as llm_pool, ThreadPoolExecutor(max_workers=workers) as extract_pool:
+        for i, file_path in enumerate(files):
+            in_flight.acquire()
+            extract_pool.submit(_extract_pdf_content, file_path, config).add_done_callback(partial(after_extract, i))
+    return [
+        r if r is not None else (files[i], None, None, RuntimeError("file was not processed"))
+        for i, r in enumerate(results)
+    ]
+
+
 def rename_pdfs_in_directory(
     directory: str | Path,
     *,
@@ -967,96 +1207,81 @@ def rename_pdfs_in_directory(
     renamed_count = 0
     skipped_count = 0
     failed_count = 0
-    export_rows: list[dict] = []
     plan_entries: list[dict[str, str]] = []
 
     results = _produce_rename_results(files, config)
 
-    for i, (file_path, new_base, meta, exc) in enumerate(results):
-        logger.info("Processing %s/%s: %s", i + 1, len(files), file_path)
-        if exc is not None:
-            # Data-file/config errors (e.g. invalid JSON) should propagate so CLI can exit with clear message.
-            if isinstance(exc, ValueError) and "Invalid JSON in data file" in str(exc):
-                raise exc
-            logger.exception("Failed to process %s: %s", file_path, exc)
-            failed_count += 1
-            continue
-        if new_base is None:
-            try:
-                size = file_path.stat().st_size if file_path.exists() else 0
-            except OSError:
-                size = 0
-            if size > 0:
-                logger.warning(
-                    "PDF has no extractable text (file size %s bytes). "
-                    "May be encrypted or image-only; consider --ocr. Skipping %s.",
-                    size,
-                    file_path.name,
-                )
-            else:
-                logger.info("PDF appears to be empty. Skipping.")
-            skipped_count += 1
-            continue
-        meta = meta or {}
-        base = new_base
-        target = file_path.with_name(new_base + file_path.suffix)
-        if config.interactive:
-            reply, base, target = _interactive_rename_prompt(file_path, target, new_base)
-            if reply == "n":
+    with (
+        _RenameLogWriter(config.rename_log_path) as rename_log,
+        _MetadataExportWriter(config.export_metadata_path) as export,
+    ):
+        for i, (file_path, new_base, meta, exc) in enumerate(results):
+            logger.info("Processing %s/%s: %s", i + 1, len(files), file_path)
+            if exc is not None:
+                # Data-file/config errors (e.g. invalid JSON) should propagate so CLI can exit with clear message.
+                if isinstance(exc, ValueError) and "Invalid JSON in data file" in str(exc):
+                    raise exc
+                logger.exception("Failed to process %s: %s", file_path, exc)
+                failed_count += 1
+                continue
+            if new_base is None:
+                try:
+                    size = file_path.stat().st_size if file_path.exists() else 0
+                except OSError:
+                    size = 0
+                if size > 0:
+                    logger.warning(
+                        "PDF has no extractable text (file size %s bytes). "
+                        "May be encrypted or image-only; consider --ocr. Skipping %s.",
+                        size,
+                        file_path.name,
+                    )
+                else:
+                    logger.info("PDF appears to be empty. Skipping.")
                 skipped_count += 1
                 continue
-        try:
+            meta = meta or {}
+            base = new_base
+            target = file_path.with_name(new_base + file_path.suffix)
+            if config.interactive:
+                reply, base, target = _interactive_rename_prompt(file_path, target, new_base)
+                if reply == "n":
+                    skipped_count += 1
+                    continue
+            try:
 
-            def _on_rename_success(
-                _fp: Path, _target: Path, _current_base: str, _meta: dict = meta, _rows: list = export_rows
-            ) -> None:
-                _apply_post_rename_actions(config, _fp, _target, _current_base, _meta, _rows)
-
-            success, target = apply_single_rename(
-                file_path,
-                base,
-                plan_file_path=config.plan_file_path,
-                plan_entries=plan_entries,
-                dry_run=config.dry_run,
-                backup_dir=config.backup_dir,
-                on_success=_on_rename_success,
-            )
-            if not success:
-                logger.error(
-                    "Skipping %s: could not rename after %s attempts",
-                    file_path.name,
-                    MAX_RENAME_RETRIES,
+                def _on_rename_success(_fp: Path, _target: Path, _current_base: str, _meta: dict = meta) -> None:
+                    _apply_post_rename_actions(config, _fp, _target, _current_base, _meta, rename_log, export)
+
+                success, target = apply_single_rename(
+                    file_path,
+                    base,
+                    plan_file_path=config.plan_file_path,
+                    plan_entries=plan_entries,
+                    dry_run=config.dry_run,
+                    backup_dir=config.backup_dir,
+                    on_success=_on_rename_success,
                 )
-                failed_count += 1
-            else:
-                if config.dry_run:
-                    logger.info(
-                        "Dry-run: would rename '%s' to '%s'",
+                if not success:
+                    logger.error(
+                        "Skipping %s: could not rename after %s attempts",
                         file_path.name,
-                        target.name,
+                        MAX_RENAME_RETRIES,
                     )
+                    failed_count += 1
                 else:
-                    logger.info("Renamed '%s' to '%s'", file_path.name, target.name)
-                renamed_count += 1
-        except Exception as e:
-            logger.exception("Failed to process %s: %s", file_path, e)
-            failed_count += 1
-
-    if config.export_metadata_path and export_rows:
-        _write_json_or_csv(
-            Path(config.export_metadata_path),
-            export_rows,
-            [
-                "path",
-                "new_name",
-                "category",
-                "summary",
-                "keywords",
-                "invoice_id",
-                "amount",
-                "company",
-            ],
-        )
+                    if config.dry_run:
+                        logger.info(
+                            "Dry-run: would rename '%s' to '%s'",
+                            file_path.name,
+                            target.name,
+                        )
+                    else:
+                        logger.info("Renamed '%s' to '%s'", file_path.name, target.name)
+                    renamed_count += 1
+            except Exception as e:
+                logger.exception("Failed to process %s: %s", file_path, e)
+                failed_count += 1
 
     if config.plan_file_path and plan_entries:
         plan_path = Path(config.plan_file_path)
@@ -1090,6 +1315,8 @@ def run_watch_loop(
     path = Path(directory).resolve()
     if not path.is_dir():
         raise NotADirectoryError(f"Not a directory: {path}")
+    # Files may still be written by a scanner when picked up: open them by path, not mapped.
+    config = replace(config, pdf_mmap=False)
     seen: dict[Path, float] = {}
     logger.info("Watch mode: scanning %s every %.1fs (Ctrl+C to stop)", path, interval_seconds)
     while True:
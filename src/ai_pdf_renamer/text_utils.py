@@ -4,6 +4,7 @@ import re
 from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache
 
 _DATE_RE_YMD = re.compile(r"\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b")
 _DATE_RE_DMY = re.compile(r"\b(\d{1,2})[./-](\d{1,2})[./-](\d{4})\b")
@@ -188,12 +189,19 @@ def tokens_similar(token_a: str, token_b: str) -> bool:
 
 
 def subtract_tokens(main_tokens: Iterable[str], remove_tokens: Iterable[str]) -> list[str]:
-    remove = [t for t in (rt.strip() for rt in remove_tokens) if t]
+    """
+    main_tokens (stripped, non-empty) without those tokens_similar to any of remove_tokens.
+    Set lookups instead of comparing every pair: a similar removal token is the token itself,
+    the token minus its last 1-2 chars, or one whose own 1-2 char shorter prefix is the token.
+    """
+    remove = frozenset(t.lower() for t in (rt.strip() for rt in remove_tokens) if t)
+    remove_shortened = frozenset(r[:-k] for r in remove for k in (1, 2) if len(r) > k)
     result: list[str] = []
     for token in (t.strip() for t in main_tokens):
         if not token:
             continue
-        if any(tokens_similar(token, rt) for rt in remove):
+        a = token.lower()
+        if a in remove or a[:-1] in remove or a[:-2] in remove or a in remove_shortened:
             continue
         result.append(token)
     return result
@@ -237,8 +245,13 @@ def normalize_keywords(raw: str | list[str] | None) -> list[str]:
 _FILENAME_RESERVED_WIN = frozenset(
     {"con", "prn", "aux", "nul"} | {f"com{i}" for i in range(1, 10)} | {f"lpt{i}" for i in range(1, 10)}
 )
+_TOKEN_FORBIDDEN_RE = re.compile(r'[\\/:*?"<>|]')
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
+_TOKEN_SPLIT_RE = re.compile(r"[\s,_-]+")
 
 
+# Category and keyword tokens repeat across files; clean_token is pure, so results are cached.
+@lru_cache(maxsize=4096)
 def clean_token(text: str) -> str:
     """
     Normalizes a token for filenames:
@@ -253,8 +266,8 @@ def clean_token(text: str) -> str:
     if not text:
         return "na"
     text = text.replace("ä", "ae").replace("ö", "oe").replace("ü", "ue").replace("ß", "ss")
-    text = re.sub(r'[\\/:*?"<>|]', "", text)
-    text = re.sub(r"\s+", "_", text)
+    text = _TOKEN_FORBIDDEN_RE.sub("", text)
+    text = _WHITESPACE_RUN_RE.sub("_", text)
     text = text.lower()
     if text in _FILENAME_RESERVED_WIN:
         text = text + "_"
@@ -291,22 +304,25 @@ def convert_case(tokens: Iterable[str], desired_case: str) -> str:
 class Stopwords:
     words: set[str]
 
-    def filter_tokens(self, tokens: Iterable[str]) -> list[str]:
+    def filter_tokens(self, tokens: Iterable[str], limit: int | None = None) -> list[str]:
+        """Stripped non-empty tokens that are not stopwords; stops after limit tokens if given."""
+        words = self.words
         out: list[str] = []
+        if limit is not None and limit <= 0:
+            return out
         for token in tokens:
             t = token.strip()
-            if not t:
-                continue
-            if t.lower() in self.words:
-                continue
-            out.append(t)
+            if t and t.lower() not in words:
+                out.append(t)
+                if len(out) == limit:
+                    break
         return out
 
 
 def split_to_tokens(text: str | None) -> list[str]:
     if text is None or not isinstance(text, str):
         return []
-    return [t for t in re.split(r"[\s,_-]+", text) if t]
+    return [t for t in _TOKEN_SPLIT_RE.split(text) if t]
 
 
 # Structured fields: invoice number, amount, company (for template placeholders)
@@ -337,6 +353,7 @@ _COMPANY_PATTERNS = [
     re.compile(r"\b(?:company|firma|an\s*:)\s*([A-Za-z0-9\s&\.\-]{2,40})\b", re.IGNORECASE),
 ]
 _FILENAME_UNSAFE_RE = re.compile(r"[\x00-\x1f\x7f/\\:*?\"<>|]")
+_AMOUNT_JUNK_RE = re.compile(r"[^\d.,]")
 _MAX_STRUCTURED_LEN = 50
 
 
@@ -345,17 +362,15 @@ def _sanitize_structured_value(value: str) -> str:
     if not value or not isinstance(value, str):
         return ""
     s = _FILENAME_UNSAFE_RE.sub("", value.strip()).strip()
-    s = re.sub(r"\s+", "_", s)
+    s = _WHITESPACE_RUN_RE.sub("_", s)
     return s[:_MAX_STRUCTURED_LEN] if len(s) > _MAX_STRUCTURED_LEN else s
 
 
 def _normalize_amount(raw: str) -> str:
     """Normalize amount for filename: digits and one dot, no spaces."""
-    s = re.sub(r"[^\d.,]", "", raw)
-    s = s.replace(",", ".")
-    if re.match(r"^[\d.]+$", s):
-        return s
-    return ""
+    s = _AMOUNT_JUNK_RE.sub("", raw).replace(",", ".")
+    # Only digits and dots are left; an empty result means no amount.
+    return s
 
 
 def extract_structured_fields(
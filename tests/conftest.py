@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import sys
+from typing import Any
+
+import pytest
+
+
+class FakePage:
+    """PyMuPDF page stand-in: `text` for "text", one block for "blocks", one span for "dict"."""
+
+    def __init__(self, text: str = "", *, blocks: str = "", spans: str = "", images: list[tuple[int]] | None = None):
+        self.text = text
+        self.blocks = blocks
+        self.spans = spans
+        self.images = images or []
+        self.calls: list[tuple[str, Any]] = []
+        self.textpages: list[object] = []
+
+    def get_textpage(self, flags: int) -> object:
+        self.textpages.append(object())
+        return self.textpages[-1]
+
+    def get_text(self, mode: str, textpage: Any = None) -> Any:
+        self.calls.append((mode, textpage))
+        if mode == "blocks":
+            return [(0, 0, 0, 0, self.blocks)] if self.blocks else []
+        if mode == "dict":
+            return {"blocks": [{"lines": [{"spans": [{"text": self.spans}]}]}]} if self.spans else {}
+        return self.text
+
+    def get_images(self) -> list[tuple[int]]:
+        return self.images
+
+
+class FakeDoc:
+    """PyMuPDF document stand-in over a list of FakePages; records page accesses in `accessed`."""
+
+    def __init__(self, pages: list[FakePage] | None = None, metadata: dict[str, str] | None = None) -> None:
+        self.pages = pages or []
+        self.metadata = metadata or {}
+        self.accessed: list[int] = []
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def __getitem__(self, n: int) -> FakePage:
+        self.accessed.append(n)
+        return self.pages[n]
+
+    def close(self) -> None:
+        pass
+
+
+class FakeFitz:
+    """
+    PyMuPDF module stand-in: open() returns `doc` (or raises `open_error`) and records each open
+    in `opened` as {"path", "stream"}. Streams must be bytes or memoryview, as PyMuPDF requires.
+    """
+
+    TEXTFLAGS_TEXT = 3
+
+    def __init__(self) -> None:
+        self.doc = FakeDoc()
+        self.open_error: Exception | None = None
+        self.opened: list[dict[str, Any]] = []
+
+    def open(self, path: Any = None, *, stream: Any = None, filetype: str | None = None) -> FakeDoc:
+        if self.open_error is not None:
+            raise self.open_error
+        if stream is not None and not isinstance(stream, (bytes, memoryview)):
+            raise TypeError(f"bad stream: {type(stream)=}.")
+        self.opened.append({"path": path, "stream": bytes(stream) if stream is not None else None})
+        return self.doc
+
+
+@pytest.fixture
+def fake_fitz(monkeypatch) -> FakeFitz:
+    """A FakeFitz installed as the `fitz` module for the test."""
+    fitz = FakeFitz()
+    monkeypatch.setitem(sys.modules, "fitz", fitz)
+    return fitz
@@ -286,3 +286,52 @@ def test_cli_renames_with_mocked_llm_no_network(monkeypatch, tmp_path) -> None:
     assert len(pdfs) == 1
     # Renamed file should no longer be named sample.pdf (content-based name)
     assert pdfs[0].name != "sample.pdf" or "mock" in pdfs[0].name.lower()
+
+
+def test_structured_log_formatter_reuses_timestamp_within_second() -> None:
+    import json
+    import logging
+
+    from ai_pdf_renamer.logging_utils import StructuredLogFormatter
+
+    formatter = StructuredLogFormatter()
+    reference = logging.Formatter()
+    for created in (1_700_000_000.125, 1_700_000_000.9, 1_700_000_001.0):
+        record = logging.LogRecord("ai_pdf_renamer", logging.INFO, __file__, 1, "Renamed %s", ("ä.pdf",), None)
+        record.created, record.msecs = created, (created - int(created)) * 1000
+        assert formatter.formatTime(record) == reference.formatTime(record)
+        line = json.loads(formatter.format(record))
+        assert line["timestamp"] == reference.formatTime(record)
+        assert line["message"] == "Renamed ä.pdf"
+
+
+def test_structured_log_formatter_without_msec_format() -> None:
+    import logging
+
+    from ai_pdf_renamer.logging_utils import StructuredLogFormatter
+
+    formatter = StructuredLogFormatter()
+    reference = logging.Formatter()
+    formatter.default_msec_format = reference.default_msec_format = None
+    record = logging.LogRecord("ai_pdf_renamer", logging.INFO, __file__, 1, "Renamed", (), None)
+    assert formatter.formatTime(record) == reference.formatTime(record)
+
+
+def test_setup_logging_adds_console_next_to_existing_file_handler(tmp_path, monkeypatch) -> None:
+    import logging
+
+    from ai_pdf_renamer.logging_utils import setup_logging
+
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "handlers", [])
+    monkeypatch.setattr(root, "level", root.level)
+    existing = logging.FileHandler(tmp_path / "other.log", encoding="utf-8")
+    root.addHandler(existing)
+    try:
+        setup_logging(log_file=tmp_path / "error.log")
+        setup_logging(log_file=tmp_path / "error.log")
+        kinds = [type(h) for h in root.handlers]
+        assert kinds == [logging.FileHandler, logging.StreamHandler]
+    finally:
+        for handler in root.handlers:
+            handler.close()
@@ -90,3 +90,38 @@ def test_category_aliases_json_structure() -> None:
     for k, v in aliases.items():
         assert isinstance(k, str) and k.strip(), f"alias key must be non-empty string: {k!r}"
         assert isinstance(v, str) and v.strip(), f"alias value must be non-empty string: {v!r}"
+
+
+def test_locale_rules_override_duplicate_base_rules(tmp_path) -> None:
+    """A locale entry repeating a base pattern replaces it instead of being scanned twice."""
+    from ai_pdf_renamer.heuristics import load_heuristic_rules_for_language
+
+    base = tmp_path / "heuristic_scores.json"
+    base.write_text(
+        json.dumps(
+            {
+                "patterns": [
+                    {"regex": "(?i)rechnung", "category": "invoice", "score": 1},
+                    {"regex": "(?i)vertrag", "category": "contract", "score": 2},
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+    (tmp_path / "heuristic_scores_de.json").write_text(
+        json.dumps(
+            {
+                "patterns": [
+                    {"regex": "(?i)rechnung", "category": "invoice", "score": 5},
+                    {"regex": "(?i)mahnung", "category": "reminder", "score": 3},
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+    rules = load_heuristic_rules_for_language(base, "de")
+    assert [(r.pattern.pattern, r.score) for r in rules] == [
+        ("(?i)rechnung", 5.0),
+        ("(?i)vertrag", 2.0),
+        ("(?i)mahnung", 3.0),
+    ]
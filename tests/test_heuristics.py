@@ -6,6 +6,7 @@ from ai_pdf_renamer.heuristics import (
     HeuristicRule,
     HeuristicScorer,
     combine_categories,
+    load_heuristic_rules,
     normalize_llm_category,
 )
 
@@ -299,3 +300,89 @@ def test_combine_categories_heuristic_score_weight() -> None:
         )
         == "receipt"
     )
+
+
+def test_heuristic_rule_required_literals() -> None:
+    rule = HeuristicRule(
+        pattern=re.compile(r"(?i)\b(miet\s*vertrag|rental\s*agreement)\b"),
+        category="rental_agreement",
+        score=1.0,
+    )
+    assert rule.literals == ("agreement", "vertrag")
+    # Short alternatives yield no prefilter (regex always runs).
+    assert HeuristicRule(pattern=re.compile(r"(?i)\b(cv|resume)\b"), category="cv", score=1.0).literals is None
+
+
+def test_heuristic_rule_required_literals_only_for_literal_alternations() -> None:
+    def literals(pattern: str) -> tuple[str, ...] | None:
+        return HeuristicRule(pattern=re.compile(pattern), category="x", score=1.0).literals
+
+    assert literals(r"(?i)\b(prüfungsanmeldung|exam\s+registration)\b") == ("fungsanmeldung", "registration")
+    assert literals(r"(?:rechnung\.|invoice)") == ("invoice", "rechnung.")
+    # Classes, quantifiers, nested groups, lookarounds and other escapes disable the prefilter.
+    for pattern in (
+        r"(?i)\bk[.\s-]*fz\s*versicherung\b",
+        r"a?bcd",
+        r"(?i)\bbafoeg\b.*\bbescheid\b",
+        r"(?i)\b(berufsunfähigkeit(s|)\s*versicherung)\b",
+        r"invoice(?!\s*draft)",
+        r"in\x76oice",
+        r"(?x) invoice  total",
+    ):
+        assert literals(pattern) is None, pattern
+
+
+def test_heuristic_prefilter_literals_hold_for_shipped_rules() -> None:
+    from ai_pdf_renamer.data_paths import package_data_path
+    from ai_pdf_renamer.heuristics import _fold_for_prefilter
+
+    rules = [
+        rule
+        for name in ("heuristic_patterns.json", "heuristic_scores.json")
+        for rule in load_heuristic_rules(package_data_path(name))
+    ]
+    with_literals = [rule for rule in rules if rule.literals is not None]
+    assert with_literals
+    for rule in with_literals:
+        src = rule.pattern.pattern.removeprefix("(?i)").removeprefix(r"\b(").removesuffix(r")\b")
+        for branch in src.split("|"):
+            # A sample match of each branch, with other whitespace and case than the source.
+            sample = "Betreff: " + re.sub(r"\\s[*+?]?", "\n  ", branch).replace("\\b", "").upper() + " 2024"
+            assert rule.pattern.search(sample), (rule.pattern.pattern, sample)
+            assert any(lit in _fold_for_prefilter(sample) for lit in rule.literals), (rule.pattern.pattern, sample)
+
+
+def test_heuristic_prefilter_keeps_case_insensitive_matches() -> None:
+    rules = [
+        HeuristicRule(pattern=re.compile(r"(?i)\bkosten\b"), category="costs", score=1.0),
+        HeuristicRule(pattern=re.compile(r"(?i)\binvoice\b"), category="invoice", score=2.0),
+    ]
+    scorer = HeuristicScorer(rules=rules)
+    # Kelvin sign and dotted capital I match ASCII letters under re.IGNORECASE.
+    assert scorer.best_category("KOSTEN") == "costs"
+    assert scorer.best_category("İNVOICE") == "invoice"
+    assert scorer.best_category("nothing relevant here") == "unknown"
+
+
+def test_heuristic_scorer_scores_text_once_for_best_and_top_n(monkeypatch) -> None:
+    import ai_pdf_renamer.heuristics as heuristics
+
+    calls = []
+    real_score_text = heuristics._score_text
+
+    def counting_score_text(*args, **kwargs):
+        calls.append(args[0])
+        return real_score_text(*args, **kwargs)
+
+    monkeypatch.setattr(heuristics, "_score_text", counting_score_text)
+    rules = [
+        HeuristicRule(pattern=re.compile("invoice", re.IGNORECASE), category="invoice", score=2.0),
+        HeuristicRule(pattern=re.compile("receipt", re.IGNORECASE), category="receipt", score=5.0),
+    ]
+    scorer = HeuristicScorer(rules=rules)
+    text = "This is an invoice and a receipt"
+    assert scorer.best_category_with_confidence(text, title_weight_region=10)[0] == "receipt"
+    assert scorer.top_n_categories(text, 2, title_weight_region=10) == ["receipt", "invoice"]
+    assert calls == [text]
+    scorer.top_n_categories(text, 2, title_weight_region=0)
+    assert len(calls) == 2
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from ai_pdf_renamer import json_utils
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_helpers_with_and_without_orjson(monkeypatch, use_orjson: bool) -> None:
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "_orjson", None)
+    payload = {"summary": "Rechnung über 5 €", "n": 2}
+
+    assert json_utils.json_loads(json_utils.json_dumps_bytes(payload)) == payload
+    assert b", " not in json_utils.json_dumps_bytes(payload)
+    assert json.loads(json_utils.json_dumps_text(payload)) == payload
+    assert "ü" in json_utils.json_dumps_text(payload)
+    with pytest.raises(json.JSONDecodeError):
+        json_utils.json_loads('{"summary": ')
+
+
+def test_json_helpers_fall_back_to_stdlib_for_lone_surrogates() -> None:
+    payload = {"prompt": "broken \ud800 text"}
+
+    encoded = json_utils.json_dumps_bytes(payload)
+    assert encoded.isascii()
+    assert json.loads(encoded) == payload
+    assert json_utils.json_loads(json_utils.json_dumps_text(payload)) == payload
@@ -33,3 +33,725 @@ def test_parse_json_field_lenient_extracts_without_brace() -> None:
     )
     assert parse_json_field("No JSON here", key="summary", lenient=True) is None
     assert parse_json_field('"category":"invoice"', key="category", lenient=True) == "invoice"
+
+
+def test_local_llm_client_reuses_pooled_session() -> None:
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from ai_pdf_renamer.llm import LLM_POOL_MAXSIZE, LocalLLMClient, _get_session
+
+    client_ports: list[int] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            client_ports.append(self.client_address[1])
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            out = json.dumps({"choices": [{"text": " " + body["prompt"] + " "}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/v1/completions"
+        client = LocalLLMClient(base_url=url, timeout_s=5.0)
+        assert client.complete("ping") == "ping"
+        assert client.complete("pong") == "pong"
+        assert _get_session(url) is _get_session(url)
+        assert _get_session(url).trust_env is False
+        # Both calls went over one keep-alive connection.
+        assert len(set(client_ports)) == 1
+        adapter = _get_session(url).get_adapter(url)
+        assert adapter._pool_maxsize == LLM_POOL_MAXSIZE  # type: ignore[attr-defined]
+        assert adapter.max_retries.total == 0  # type: ignore[attr-defined]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_get_document_summary_chunks_in_parallel_keep_order(monkeypatch) -> None:
+    import threading
+    import time
+
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_summary
+
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_SIZE", 3_000)
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_OVERLAP", 0)
+    # Character chunks, also when tiktoken is installed.
+    monkeypatch.setattr(llm, "chunk_text_by_tokens", lambda text, **kwargs: None)
+    seen: list[str] = []
+    lock = threading.Lock()
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            with lock:
+                seen.append(prompt)
+            if "Combine" in prompt:
+                return '{"summary":"final"}'
+            marker = prompt[-1]
+            # Later chunks finish first; results must still be combined in chunk order.
+            time.sleep({"A": 0.05, "B": 0.02, "C": 0.0}[marker])
+            return '{"summary":"part ' + marker + '"}'
+
+    text = "A" * 3_000 + "B" * 3_000 + "C" * 3_000
+    out = get_document_summary(FakeClient(), text, language="en", max_chars_single=5_000, max_parallel=3)
+    assert out == "final"
+    combine = [p for p in seen if "Combine" in p]
+    assert len(combine) == 1
+    assert "part A part B part C" in combine[0]
+
+
+def test_llm_response_cache_serves_deterministic_prompts(tmp_path) -> None:
+    from ai_pdf_renamer.llm import LocalLLMClient
+    from ai_pdf_renamer.llm_cache import LLMResponseCache
+
+    calls: list[float] = []
+
+    class FakeClient(LocalLLMClient):
+        def _complete_uncached(self, prompt: str, *, temperature: float, max_tokens: int | None) -> str:
+            calls.append(temperature)
+            return '{"summary":"x"}'
+
+    cache = LLMResponseCache(tmp_path / "llm.sqlite3")
+    client = FakeClient(cache=cache)
+    assert client.complete("p") == '{"summary":"x"}'
+    assert client.complete("p") == '{"summary":"x"}'
+    assert calls == [0.0]
+    # Retry temperatures bypass the cache so new samples are drawn.
+    client.complete("p", temperature=0.2)
+    client.complete("p", temperature=0.2)
+    assert calls == [0.0, 0.2, 0.2]
+    # Persisted across cache instances.
+    cache.close()
+    assert FakeClient(cache=LLMResponseCache(tmp_path / "llm.sqlite3")).complete("p") == '{"summary":"x"}'
+    assert len(calls) == 3
+
+
+def test_unusable_llm_cache_path_disables_cache(tmp_path, caplog) -> None:
+    from ai_pdf_renamer.renamer import RenamerConfig, _llm_client_from_config
+
+    # A directory cannot be opened as the SQLite file: the run continues without the cache.
+    config = RenamerConfig(llm_cache_path=tmp_path)
+    with caplog.at_level("WARNING", logger="ai_pdf_renamer.llm_cache"):
+        assert _llm_client_from_config(config).cache is None
+        assert _llm_client_from_config(config).cache is None
+    assert len([r for r in caplog.records if "LLM cache disabled" in r.getMessage()]) == 1
+
+
+def test_llm_response_cache_tolerates_lone_surrogates(tmp_path) -> None:
+    from ai_pdf_renamer.llm import LocalLLMClient
+    from ai_pdf_renamer.llm_cache import LLMResponseCache, llm_cache_key
+
+    class FakeClient(LocalLLMClient):
+        def _complete_uncached(self, prompt: str, *, temperature: float, max_tokens: int | None) -> str:
+            return '{"summary":"a\ud800b"}'
+
+    assert llm_cache_key("m", "a\ud800b", 0.0, None) != llm_cache_key("m", "a\ud801b", 0.0, None)
+    client = FakeClient(cache=LLMResponseCache(tmp_path / "llm.sqlite3"))
+    # Broken PDF text in the prompt and in the completion: served, just not persisted.
+    assert client.complete("Summarize: a\ud800b") == '{"summary":"a\ud800b"}'
+
+
+def test_get_document_metadata_fused_single_call_and_field_fallback() -> None:
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_metadata_fused
+
+    prompts: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            prompts.append(prompt)
+            if '"final_summary":"kw1,kw2"}\nsummary' in prompt:
+                # Fused answer with an invalid category -> only category is fetched separately.
+                return (
+                    '{"summary":"Invoice for office chairs.","keywords":["invoice","chairs"],'
+                    '"category":"","final_summary":"invoice, chairs"}'
+                )
+            return '{"category":"invoice"}'
+
+    text = "Invoice No. 42 for two office chairs, total amount 300 EUR, due within 14 days."
+    out = get_document_metadata_fused(FakeClient(), text, language="en")
+    assert out == {
+        "summary": "Invoice for office chairs.",
+        "keywords": ["invoice", "chairs"],
+        "category": "invoice",
+        "final_summary": ["invoice", "chairs"],
+    }
+    assert len(prompts) == 2
+
+
+def test_get_document_metadata_fused_summary_fallback_reuses_chunk_summaries(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_metadata_fused
+
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_SIZE", 100)
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(llm, "chunk_text_by_tokens", lambda text, **kwargs: None)
+    prompts: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            prompts.append(prompt)
+            if "Combine" in prompt:
+                return '{"summary":"Lease for a flat."}'
+            if '"final_summary":"kw1,kw2"}\nsummary' in prompt:
+                # Fused answer without a summary.
+                return '{"keywords":["lease"],"category":"lease","final_summary":"lease"}'
+            return '{"summary":"part"}'
+
+    out = get_document_metadata_fused(FakeClient(), "A" * 100 + "B" * 100, language="en", max_chars_single=150)
+
+    assert out["summary"] == "Lease for a flat."
+    chunk_prompts = [p for p in prompts if p.startswith(llm.EN_CHUNK_PROMPT_PREFIX)]
+    assert len(chunk_prompts) == 2
+    assert len(prompts) == 4  # 2 chunks, fused, combine
+
+
+def test_get_document_metadata_fused_honors_title_shortcut_and_race_prompts(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_metadata_fused
+
+    raced: list[int] = []
+
+    def category(client, **kwargs):
+        raced.append(kwargs["race_prompts"])
+        return "lease"
+
+    monkeypatch.setattr(llm, "get_document_category", category)
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            return '{"summary":"from llm","keywords":["lease"],"category":"","final_summary":"lease"}'
+
+    body = "Mietvertrag für Wohnräume\nZwischen Vermieter und Mieter wird folgender Vertrag geschlossen."
+    out = get_document_metadata_fused(FakeClient(), body, language="de", race_prompts=3, title_shortcut=True)
+
+    assert out["summary"] == "Mietvertrag für Wohnräume"
+    assert out["category"] == "lease" and raced == [3]
+    assert get_document_metadata_fused(FakeClient(), body, language="de")["summary"] == "from llm"
+
+
+def test_parse_json_field_truncated_object_skips_salvage(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+
+    def fail(*args: object, **kwargs: object) -> str:
+        raise AssertionError("sanitizer should not run on truncated output")
+
+    monkeypatch.setattr(llm, "_sanitize_json_string_value", fail)
+    assert parse_json_field('{"summary":"He said "hello', key="summary") is None
+
+
+def test_dumps_json_bytes_handles_surrogates() -> None:
+    import json
+
+    from ai_pdf_renamer.llm import _dumps_json_bytes
+
+    payload = {"prompt": "Rechnung \ud800 {x}", "temperature": 0.0}
+    assert json.loads(_dumps_json_bytes(payload)) == payload
+
+
+def test_local_llm_client_stream_stops_when_json_closes() -> None:
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from ai_pdf_renamer.llm import LocalLLMClient
+
+    deltas = ['Sure: {"summary":', '"a {b} \\"c\\""', "}", " trailing explanation", " never sent"]
+    sent: list[str] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            assert body["stream"] is True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            try:
+                for d in deltas:
+                    self.wfile.write(b"data: " + json.dumps({"choices": [{"text": d}]}).encode() + b"\n\n")
+                    self.wfile.flush()
+                    sent.append(d)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except OSError:
+                pass
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/v1/completions"
+        out = LocalLLMClient(base_url=url, timeout_s=5.0, stream_json=True).complete("p")
+        assert out == 'Sure: {"summary":"a {b} \\"c\\""}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_complete_async_gathers_prompts() -> None:
+    import asyncio
+
+    from ai_pdf_renamer.llm import LocalLLMClient
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            return prompt.upper()
+
+    async def run() -> list[str]:
+        client = FakeClient()
+        return await asyncio.gather(*(client.complete_async(p) for p in ("a", "b", "c")))
+
+    assert asyncio.run(run()) == ["A", "B", "C"]
+
+
+def test_downstream_llm_calls_skipped_without_summary() -> None:
+    from ai_pdf_renamer.llm import (
+        LocalLLMClient,
+        get_document_category,
+        get_document_keywords,
+        get_final_summary_tokens,
+    )
+
+    class FailingClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            raise AssertionError("LLM must not be called")
+
+    client = FailingClient()
+    assert get_document_keywords(client, "na") is None
+    assert get_document_category(client, summary="", keywords=["a"]) == "na"
+    assert get_document_category(client, summary="A summary.", keywords=[]) == "na"
+    assert get_final_summary_tokens(client, summary=" NA ", keywords=[], category="x") is None
+
+
+def test_get_document_summary_reduces_oversized_partials_hierarchically(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_summary
+
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_SIZE", 100)
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_OVERLAP", 0)
+    # Character chunks, also when tiktoken is installed.
+    monkeypatch.setattr(llm, "chunk_text_by_tokens", lambda text, **kwargs: None)
+    combine_inputs: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            if "Combine" in prompt:
+                combine_inputs.append(prompt)
+                return '{"summary":"mid"}'
+            return '{"summary":"' + "p" * 40 + '"}'
+
+    # 8 chunks -> 8 partials of 40 chars (329 chars joined) > max_chars_single=150
+    out = get_document_summary(FakeClient(), "x" * 800, language="en", max_chars_single=150, max_parallel=2)
+    assert out == "mid"
+    # 3 group combines (3 + 3 + 2 partials) plus the final combine.
+    assert len(combine_inputs) == 4
+    assert all(len(p) < 150 + 300 for p in combine_inputs)
+
+
+def test_get_document_keywords_batch_falls_back_for_misaligned_rows() -> None:
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_keywords_batch
+
+    prompts: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            prompts.append(prompt)
+            if "numbered summaries" in prompt:
+                # Second row is not a list of strings -> only that row is retried on its own.
+                return '{"keywords":[["invoice","chairs"],[1,2],["contract"]]}'
+            return '{"keywords":["lease"]}'
+
+    out = get_document_keywords_batch(
+        FakeClient(),
+        ["Invoice for chairs.", "Lease for a flat.", "na", "A contract."],
+        language="en",
+        suggested_categories=["invoice", "lease", None, None],
+    )
+    assert out == [["invoice", "chairs"], ["lease"], None, ["contract"]]
+    assert len(prompts) == 2
+    assert (
+        "1) The document is likely: invoice. Invoice for chairs.\n"
+        "2) The document is likely: lease. Lease for a flat.\n3) A contract." in prompts[0]
+    )
+    assert "The document is likely: lease." in prompts[1]
+
+
+def test_keyword_batcher_answers_concurrent_callers_with_one_call() -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ai_pdf_renamer.llm import KeywordBatcher, LocalLLMClient
+
+    prompts: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            prompts.append(prompt)
+            return '{"keywords":[["a"],["b"],["c"]]}'
+
+    batcher = KeywordBatcher(FakeClient(), batch_size=3, language="en", linger_s=5.0)
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        # The batch is sent when the third request arrives, not after the 5 s linger.
+        futures = [ex.submit(batcher.keywords, f"Summary {n}.") for n in range(3)]
+        out = sorted(f.result(timeout=2) for f in futures)
+
+    assert out == [["a"], ["b"], ["c"]]
+    assert len(prompts) == 1
+    assert batcher.keywords("na") is None and len(prompts) == 1
+
+
+def test_chunk_summaries_reuse_cache_across_documents(tmp_path, monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_summary
+    from ai_pdf_renamer.llm_cache import LLMResponseCache
+
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_SIZE", 100)
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_OVERLAP", 0)
+    # Character chunks, also when tiktoken is installed.
+    monkeypatch.setattr(llm, "chunk_text_by_tokens", lambda text, **kwargs: None)
+    chunk_calls: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def _complete_uncached(self, prompt: str, *, temperature: float, max_tokens: int | None) -> str:
+            if "Combine" in prompt:
+                return '{"summary":"final"}'
+            chunk_calls.append(prompt)
+            return '{"summary":"part"}'
+
+    client = FakeClient(cache=LLMResponseCache(tmp_path / "c.sqlite3"))
+    boilerplate = "Terms apply. " * 7 + "End.00000"  # exactly one 100-char chunk
+    get_document_summary(client, boilerplate + "A" * 100, language="en", max_chars_single=150)
+    assert len(chunk_calls) == 2
+    # Same boilerplate, reflowed with different whitespace: only the new chunk is summarized.
+    reflowed = boilerplate.replace(" ", "\n")
+    get_document_summary(client, reflowed + "B" * 100, language="en", max_chars_single=150)
+    assert len(chunk_calls) == 3
+
+
+def test_local_llm_client_is_slotted_and_picklable() -> None:
+    import pickle
+
+    from ai_pdf_renamer.llm import LocalLLMClient
+
+    client = LocalLLMClient(base_url="http://127.0.0.1:1/v1/completions", model="m", timeout_s=5.0)
+    assert not hasattr(client, "__dict__")
+    assert pickle.loads(pickle.dumps(client)) == client
+
+
+def test_try_prompts_for_key_race_returns_first_parseable() -> None:
+    import threading
+
+    from ai_pdf_renamer.llm import LocalLLMClient, _try_prompts_for_key
+
+    release = threading.Event()
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            if prompt == "slow":
+                release.wait(5)
+                return '{"summary":"slow"}'
+            return '{"summary":"fast"}'
+
+    try:
+        out = _try_prompts_for_key(FakeClient(), ["slow", "fast"], key="summary", temperature=0.0, race_prompts=2)
+    finally:
+        release.set()
+    assert out == "fast"
+
+
+def test_complete_json_with_retry_backs_off_on_network_errors(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LLMNetworkError, LocalLLMClient, complete_json_with_retry
+
+    sleeps: list[float] = []
+    monkeypatch.setattr(llm.time, "sleep", sleeps.append)
+    temperatures: list[float] = []
+    outcomes = [LLMNetworkError("refused"), "not json", '{"summary":"ok"}']
+
+    class FlakyClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            assert kwargs.get("raise_on_network_error") is True
+            temperatures.append(temperature)
+            out = outcomes.pop(0)
+            if isinstance(out, Exception):
+                raise out
+            return out
+
+    assert complete_json_with_retry(FlakyClient(), "p") == '{"summary":"ok"}'
+    # Network error: same temperature after a pause; parse failure: higher temperature, no pause.
+    assert temperatures == [0.0, 0.0, 0.2]
+    assert len(sleeps) == 1 and 0 <= sleeps[0] <= llm.LLM_BACKOFF_BASE_S * 2
+
+
+def test_attempt_prompt_for_key_reuses_validated_json(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LocalLLMClient, _attempt_prompt_for_key
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            return '{"summary": "Rechnung"}'
+
+    def fail_extract(response: str) -> str:
+        raise AssertionError("response parsed twice")
+
+    monkeypatch.setattr(llm, "_extract_json_from_response", fail_extract)
+    out = _attempt_prompt_for_key(FakeClient(), "p", key="summary", temperature=0.0, max_tokens=64, lenient=False)
+    assert out == "Rechnung"
+    assert parse_json_field(None, key="summary", prefetched={"summary": " Vertrag "}) == "Vertrag"
+
+
+def test_complete_memory_cache_skips_repeated_deterministic_prompts() -> None:
+    from ai_pdf_renamer.llm import LocalLLMClient
+
+    calls: list[float] = []
+
+    class CountingClient(LocalLLMClient):
+        def _complete_uncached(self, prompt: str, *, temperature: float, max_tokens: int | None) -> str:
+            calls.append(temperature)
+            return '{"summary":"x"}'
+
+    client = CountingClient(model="memory-cache-test")
+    assert client.complete("same prompt") == client.complete("same prompt") == '{"summary":"x"}'
+    client.complete("same prompt", temperature=0.4)
+    client.complete("same prompt", temperature=0.4)
+    assert calls == [0.0, 0.4, 0.4]
+
+
+def test_complete_concurrent_identical_prompts_share_one_request() -> None:
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ai_pdf_renamer.llm import LocalLLMClient
+
+    calls: list[str] = []
+    release = threading.Event()
+
+    class SlowClient(LocalLLMClient):
+        def _complete_uncached(self, prompt: str, *, temperature: float, max_tokens: int | None) -> str:
+            calls.append(prompt)
+            release.wait(5)
+            return '{"summary":"x"}'
+
+    client = SlowClient(model="inflight-test", timeout_s=5.0)
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        futures = [ex.submit(client.complete, "boilerplate chunk") for _ in range(4)]
+        release.set()
+        results = [f.result() for f in futures]
+    assert results == ['{"summary":"x"}'] * 4
+    assert calls == ["boilerplate chunk"]
+
+
+def test_escape_unescaped_quotes_keeps_existing_escapes() -> None:
+    from ai_pdf_renamer.llm import _escape_unescaped_quotes
+
+    assert _escape_unescaped_quotes("plain") == "plain"
+    assert _escape_unescaped_quotes('a "b" c') == 'a \\"b\\" c'
+    assert _escape_unescaped_quotes('a \\"b" ""') == 'a \\"b\\" \\"\\"'
+
+
+def test_completion_body_matches_payload() -> None:
+    import json
+
+    from ai_pdf_renamer.llm import _completion_body
+
+    prompt = 'Rechnung "A" \ud800 {x}'
+    assert json.loads(_completion_body("m", prompt, 0.2, 64, False)) == {
+        "model": "m",
+        "prompt": prompt,
+        "temperature": 0.2,
+        "max_tokens": 64,
+    }
+    assert json.loads(_completion_body("m", prompt, 0.0, None, True)) == {
+        "model": "m",
+        "prompt": prompt,
+        "temperature": 0.0,
+        "stream": True,
+    }
+
+
+def test_get_document_summary_skips_combine_for_single_partial(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_summary
+
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_SIZE", 100)
+    monkeypatch.setattr(llm, "CONTEXT_128K_CHUNK_OVERLAP", 0)
+    # Character chunks, also when tiktoken is installed.
+    monkeypatch.setattr(llm, "chunk_text_by_tokens", lambda text, **kwargs: None)
+    prompts: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            prompts.append(prompt)
+            # Only the chunk made of "a" gets a summary; every other chunk keeps failing.
+            return '{"summary":"first"}' if "a" * 100 in prompt else "no json"
+
+    out = get_document_summary(FakeClient(), "a" * 100 + "b" * 100, language="en", max_chars_single=150)
+    assert out == "first"
+    assert not any("Combine" in p for p in prompts)
+
+
+def test_get_document_summary_respects_smaller_max_chars_single(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_summary
+
+    monkeypatch.setattr(llm, "chunk_text_by_tokens", lambda text, **kwargs: None)
+    prompts: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            prompts.append(prompt)
+            return '{"summary":"chunked"}'
+
+    # Shorter than one default chunk, but over the caller's single-prompt limit: no short prompt.
+    out = get_document_summary(FakeClient(), "word " * 400, language="en", max_chars_single=500)
+    assert out == "chunked"
+    assert prompts and all(p.startswith(llm.EN_CHUNK_PROMPT_PREFIX) for p in prompts)
+
+
+def test_try_prompts_for_key_cycles_prompts_before_raising_temperature(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+    from ai_pdf_renamer.llm import LLMNetworkError, LocalLLMClient, _try_prompts_for_key
+
+    calls: list[tuple[str, float]] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            calls.append((prompt, round(temperature, 1)))
+            return '{"summary":"ok"}' if (prompt, round(temperature, 1)) == ("b", 0.2) else "no json"
+
+    assert _try_prompts_for_key(FakeClient(), ["a", "b"], key="summary", temperature=0.0) == "ok"
+    assert calls == [("a", 0.0), ("b", 0.0), ("a", 0.2), ("b", 0.2)]
+
+    monkeypatch.setattr(llm.time, "sleep", lambda s: None)
+    calls.clear()
+
+    class DownClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            calls.append((prompt, temperature))
+            raise LLMNetworkError("refused")
+
+    assert _try_prompts_for_key(DownClient(), ["a", "b"], key="summary", temperature=0.0) is None
+    # Network retries for the first variant only; the other variants are not tried.
+    assert {p for p, _ in calls} == {"a"}
+
+
+def test_parse_json_field_clean_object_skips_extraction(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+
+    def fail_extract(response: str) -> str:
+        raise AssertionError("clean JSON should not be searched")
+
+    monkeypatch.setattr(llm, "_extract_json_from_response", fail_extract)
+    assert parse_json_field(' {"summary": "Mietvertrag"}\n', key="summary") == "Mietvertrag"
+
+
+def test_parse_json_field_ignores_trailing_prose_for_any_key() -> None:
+    assert parse_json_field('{"keywords": ["Miete", "Wohnung"]} Ich hoffe, das hilft!', key="keywords") == [
+        "Miete",
+        "Wohnung",
+    ]
+    assert parse_json_field('{"summary": "Mietvertrag"}\nDone.', key="summary") == "Mietvertrag"
+
+
+def test_get_document_keywords_race_prompts_skips_stalled_variant() -> None:
+    import threading
+
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_keywords
+
+    release = threading.Event()
+    lock = threading.Lock()
+    seen: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            with lock:
+                seen.append(prompt)
+                first = len(seen) == 1
+            if first:
+                release.wait(5)
+            return '{"keywords":["Miete","Wohnung"]}'
+
+    try:
+        out = get_document_keywords(FakeClient(), "Mietvertrag für eine Wohnung", language="de", race_prompts=2)
+    finally:
+        release.set()
+    assert out == ["Miete", "Wohnung"]
+    assert len(seen) == 2
+
+
+def test_parse_json_field_skips_salvage_without_embedded_quotes(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+
+    decoded: list[str] = []
+    real_loads = llm._loads_json
+
+    def counting_loads(text: str | bytes) -> object:
+        decoded.append(str(text))
+        return real_loads(text)
+
+    monkeypatch.setattr(llm, "_loads_json", counting_loads)
+    # Broken for a reason other than quotes: decoded once, no sanitized retry.
+    assert parse_json_field('{"summary":"Miete\x01Wohnung"}', key="summary") is None
+    assert len(decoded) == 1
+    # One bare quote (odd count) and two (even count) are both salvaged.
+    assert parse_json_field('{"summary":"5" Zoll"}', key="summary") == '5" Zoll'
+    assert parse_json_field('{"summary":"Vertrag "Miete" 2024"}', key="summary") == 'Vertrag "Miete" 2024'
+
+
+def test_get_document_summary_title_shortcut_skips_llm() -> None:
+    from ai_pdf_renamer.llm import LocalLLMClient, get_document_summary
+
+    prompts: list[str] = []
+
+    class FakeClient(LocalLLMClient):
+        def complete(self, prompt: str, *, temperature: float = 0.0, **kwargs: object) -> str:
+            prompts.append(prompt)
+            return '{"summary":"from llm"}'
+
+    body = "\n\nMietvertrag für Wohnräume\nZwischen Vermieter und Mieter wird folgender Vertrag geschlossen."
+    assert get_document_summary(FakeClient(), body, language="de", title_shortcut=True) == "Mietvertrag für Wohnräume"
+    assert prompts == []
+    # Opt-in only, and no title-like first line falls through to the LLM.
+    assert get_document_summary(FakeClient(), body, language="de") == "from llm"
+    numbers = "12345 67890\n" + "Zwischen Vermieter und Mieter wird folgender Vertrag geschlossen."
+    assert get_document_summary(FakeClient(), numbers, language="de", title_shortcut=True) == "from llm"
+
+
+def test_last_unescaped_quote_skips_escaped_quotes() -> None:
+    from ai_pdf_renamer.llm import _last_unescaped_quote
+
+    assert _last_unescaped_quote('a"b', 0, 3) == 1
+    assert _last_unescaped_quote('a"b\\"c', 0, 6) == 1
+    assert _last_unescaped_quote('a\\\\"b', 0, 5) == 3
+    assert _last_unescaped_quote('\\"', 1, 2) == 1
+    assert _last_unescaped_quote("abc", 0, 3) == -1
+
+
+def test_parse_json_field_decodes_response_once_for_several_keys(monkeypatch) -> None:
+    from ai_pdf_renamer import llm
+
+    extracted: list[str] = []
+    real_extract = llm._extract_json_from_response
+
+    def counting_extract(text: str) -> str:
+        extracted.append(text)
+        return real_extract(text)
+
+    monkeypatch.setattr(llm, "_extract_json_from_response", counting_extract)
+    response = 'Hier ist das JSON: {"summary": "Mietvertrag", "keywords": ["Miete"], "category": "vertrag"}'
+    assert parse_json_field(response, key="summary") == "Mietvertrag"
+    assert parse_json_field(response, key="keywords") == ["Miete"]
+    assert parse_json_field(response, key="category") == "vertrag"
+    assert len(extracted) == 1
@@ -1,30 +1,21 @@
 from __future__ import annotations
 
 import sys
+from pathlib import Path
 
-from ai_pdf_renamer import pdf_extract
+import pytest
+from conftest import FakeDoc, FakeFitz, FakePage
 
+from ai_pdf_renamer import pdf_extract
 
-def test_pdf_to_text_returns_empty_on_open_error(monkeypatch) -> None:
-    class DummyFitz:
-        def open(self, path):
-            raise RuntimeError("boom")
 
-    monkeypatch.setitem(sys.modules, "fitz", DummyFitz())
+def test_pdf_to_text_returns_empty_on_open_error(fake_fitz) -> None:
+    fake_fitz.open_error = RuntimeError("boom")
 
     assert pdf_extract.pdf_to_text("missing.pdf") == ""
 
 
-def test_pdf_to_text_returns_empty_when_no_pages(monkeypatch, tmp_path) -> None:
-    class DummyDoc:
-        page_count = 0
-
-    class DummyFitz:
-        def open(self, path):
-            return DummyDoc()
-
-    monkeypatch.setitem(sys.modules, "fitz", DummyFitz())
-
+def test_pdf_to_text_returns_empty_when_no_pages(fake_fitz, tmp_path) -> None:
     pdf_path = tmp_path / "empty.pdf"
     pdf_path.write_bytes(b"")
 
@@ -39,3 +30,402 @@ def test_shrink_to_token_limit_reduces_text(monkeypatch) -> None:
 
     assert len(shrunk) < len(text)
     assert len(shrunk) <= 200
+
+
+def test_token_count_loads_encoding_once(monkeypatch) -> None:
+    loads: list[str] = []
+
+    class DummyEncoding:
+        def encode_ordinary(self, text):
+            return text.split()
+
+    class DummyTiktoken:
+        def get_encoding(self, name):
+            loads.append(name)
+            return DummyEncoding()
+
+    monkeypatch.setitem(sys.modules, "tiktoken", DummyTiktoken())
+    pdf_extract._get_encoding.cache_clear()
+    try:
+        assert pdf_extract._token_count("one two three") == 3
+        assert pdf_extract._token_count("four five") == 2
+        assert pdf_extract._token_count("a <|endoftext|> b") == 3
+        assert loads == ["cl100k_base"]
+    finally:
+        pdf_extract._get_encoding.cache_clear()
+
+
+def test_shrink_to_token_limit_keeps_longest_fitting_prefix(monkeypatch) -> None:
+    counted: list[int] = []
+
+    def four_chars_per_token(text: str) -> int:
+        counted.append(len(text))
+        return len(text) // 4
+
+    monkeypatch.setattr(pdf_extract, "_token_count", four_chars_per_token)
+    # Count-based search (the path without tiktoken).
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: None)
+
+    text = "wort " * 20_000
+    shrunk = pdf_extract._shrink_to_token_limit(text, max_tokens=10_000)
+
+    assert len(shrunk) // 4 <= 10_000
+    assert len(shrunk) > 39_000
+    assert len(counted) <= 6
+
+
+def test_pdf_to_text_page_workers_keep_page_order(monkeypatch, fake_fitz, tmp_path) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    fake_fitz.doc = FakeDoc([FakePage(f"page{n}") for n in range(40)])
+    # Threads stand in for the worker processes so the fake fitz module is visible.
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        monkeypatch.setattr(pdf_extract, "_page_pool", lambda workers: pool)
+        text = pdf_extract.pdf_to_text(tmp_path / "long.pdf", page_workers=3)
+
+    assert text.split("\n") == [f"page{n}" for n in range(40)]
+
+
+def test_pdf_to_text_page_workers_stop_at_char_budget(monkeypatch, fake_fitz, tmp_path) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    fake_fitz.doc = FakeDoc([FakePage(f"page{n:03d} " + "word " * 200) for n in range(500)])
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: None)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        monkeypatch.setattr(pdf_extract, "_page_pool", lambda workers: pool)
+        text = pdf_extract.pdf_to_text(tmp_path / "long.pdf", max_tokens=2_000, page_workers=4)
+
+    assert text.startswith("page000 ")
+    # Budget: about 8 pages; at most the ranges already in flight are read beyond it.
+    assert len(fake_fitz.doc.accessed) <= 4 * pdf_extract.PAGE_PARALLEL_RANGE_PAGES + 8
+    assert len(fake_fitz.doc.accessed) < 500
+
+
+def test_page_pool_is_reused_and_replaced_when_workers_change(monkeypatch) -> None:
+    created: list[FakePool] = []
+
+    class FakePool:
+        def __init__(self, max_workers, mp_context):
+            self.max_workers = max_workers
+            self.start_method = mp_context.get_start_method()
+            self.shut_down = False
+            created.append(self)
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = True
+
+    monkeypatch.setattr(pdf_extract, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(pdf_extract, "_page_pool_executor", None)
+
+    first = pdf_extract._page_pool(2)
+    assert pdf_extract._page_pool(2) is first
+    assert first.start_method in ("forkserver", "spawn")
+    second = pdf_extract._page_pool(3)
+    assert second is not first and first.shut_down
+    pdf_extract._discard_page_pool(second)
+    assert second.shut_down and pdf_extract._page_pool(3) is not second
+    pdf_extract.shutdown_page_pool()
+    assert all(pool.shut_down for pool in created)
+
+
+class WordEncoding:
+    """Fake tiktoken encoding: one token per word including its leading space."""
+
+    def __init__(self) -> None:
+        self.encoded: list[int] = []
+
+    def encode_ordinary(self, text):
+        self.encoded.append(len(text))
+        return [tok for tok in text.replace(" ", "\0 ").split("\0") if tok]
+
+    def decode_with_offsets(self, tokens):
+        offsets, pos = [], 0
+        for tok in tokens:
+            offsets.append(pos)
+            pos += len(tok)
+        return "".join(tokens), offsets
+
+
+class BatchWordEncoding(WordEncoding):
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches: list[list[int]] = []
+
+    def encode_ordinary_batch(self, texts, *, num_threads):
+        self.batches.append([len(t) for t in texts])
+        return [self.encode_ordinary(t) for t in texts]
+
+
+def test_token_offsets_encodes_long_text_in_parallel_pieces(monkeypatch) -> None:
+    monkeypatch.setattr(pdf_extract, "PARALLEL_ENCODE_MIN_CHARS", 100)
+    monkeypatch.setattr(pdf_extract, "_ENCODE_PIECE_CHARS", 40)
+    text = " ".join(f"wort{i}" for i in range(40))
+    encoding = BatchWordEncoding()
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: encoding)
+
+    offsets = pdf_extract._token_offsets(text)
+
+    assert len(encoding.batches) == 1 and len(encoding.batches[0]) > 1
+    assert max(encoding.batches[0]) <= 40 and sum(encoding.batches[0]) == len(text)
+    # Pieces are cut before spaces, so word tokens come out exactly as from one encode.
+    monkeypatch.setattr(pdf_extract, "PARALLEL_ENCODE_MIN_CHARS", len(text) + 1)
+    assert offsets == pdf_extract._token_offsets(text)
+
+
+def test_chunk_text_by_tokens_slices_on_token_boundaries(monkeypatch) -> None:
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: WordEncoding())
+    text = "eins zwei drei vier fünf sechs sieben"
+    chunks = pdf_extract.chunk_text_by_tokens(text, chunk_tokens=3, overlap_tokens=1)
+    assert chunks == ["eins zwei drei", " drei vier fünf", " fünf sechs sieben"]
+    assert pdf_extract.chunk_text_by_tokens("  ", chunk_tokens=3, overlap_tokens=1) == []
+
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: None)
+    assert pdf_extract.chunk_text_by_tokens(text, chunk_tokens=3, overlap_tokens=1) is None
+
+
+def test_shrink_to_token_limit_bounds_skip_and_cap_encodes(monkeypatch) -> None:
+    counted: list[int] = []
+
+    def four_chars_per_token(text: str) -> int:
+        counted.append(len(text))
+        return len(text) // 4
+
+    monkeypatch.setattr(pdf_extract, "_token_count", four_chars_per_token)
+    # Count-based search (the path without tiktoken).
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: None)
+
+    short = "wort " * 400
+    assert pdf_extract._shrink_to_token_limit(short, max_tokens=10_000) == short
+    assert counted == []
+
+    shrunk = pdf_extract._shrink_to_token_limit("wort " * 200_000, max_tokens=10_000)
+    assert len(shrunk) // 4 <= 10_000
+    # The full 1M-char text is never encoded, only a prefix of at most ~6 chars per token.
+    assert max(counted) <= 6 * 10_001
+
+
+def test_blocks_text_strips_each_block_once() -> None:
+    class Page:
+        def get_text(self, mode):
+            return [(0, 0, 1, 1, "Rechnung\n"), (0, 0, 1, 1, "  \n"), (0, 0, 1, 1), (0, 0, 1, 1, " Nr. 42 ")]
+
+    assert pdf_extract._blocks_text(Page()) == "Rechnung Nr. 42"
+
+
+def test_shrink_to_token_limit_cuts_at_token_offset_with_one_encode(monkeypatch) -> None:
+    encoding = WordEncoding()
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: encoding)
+
+    def no_counting(text: str) -> int:
+        raise AssertionError("the token-offset path needs no counts")
+
+    monkeypatch.setattr(pdf_extract, "_token_count", no_counting)
+    text = " ".join(f"w{i:04d}" for i in range(5_000))
+    shrunk = pdf_extract._shrink_to_token_limit(text, max_tokens=1_000)
+    assert shrunk == " ".join(f"w{i:04d}" for i in range(1_000))
+    # One encode, of a prefix of ~6 chars per token rather than the whole text.
+    assert encoding.encoded == [6 * 1_001]
+
+
+def test_shrink_to_token_limit_reuses_cut_for_same_text(monkeypatch) -> None:
+    encoding = WordEncoding()
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: encoding)
+    text = " ".join(f"z{i:04d}" for i in range(3_000))
+    first = pdf_extract._shrink_to_token_limit(text, max_tokens=500)
+    assert pdf_extract._shrink_to_token_limit(text, max_tokens=500) == first
+    assert len(encoding.encoded) == 1
+    pdf_extract._shrink_to_token_limit(text, max_tokens=400)
+    assert len(encoding.encoded) == 2
+
+
+def test_pdf_to_text_with_ocr_passes_page_workers_as_jobs(monkeypatch, tmp_path) -> None:
+    calls: list[dict] = []
+
+    class DummyOcrmypdf:
+        def ocr(self, src, dst, **kwargs):
+            calls.append(kwargs)
+
+    monkeypatch.setitem(sys.modules, "ocrmypdf", DummyOcrmypdf())
+    monkeypatch.setattr(pdf_extract, "pdf_to_text", lambda *a, **k: "")
+    pdf_path = tmp_path / "scan.pdf"
+    pdf_path.write_bytes(b"%PDF")
+
+    pdf_extract.pdf_to_text_with_ocr(pdf_path, language="en")
+    pdf_extract.pdf_to_text_with_ocr(pdf_path, language="en", page_workers=4)
+    assert calls == [{"language": "eng", "optimize": 0}, {"language": "eng", "optimize": 0, "jobs": 4}]
+
+
+def test_pdf_to_text_with_ocr_limits_ocr_to_max_pages(monkeypatch, fake_fitz, tmp_path) -> None:
+    calls: list[dict] = []
+
+    class DummyOcrmypdf:
+        def ocr(self, src, dst, **kwargs):
+            calls.append(kwargs)
+
+    fake_fitz.doc = FakeDoc([FakePage()] * 40)
+    monkeypatch.setitem(sys.modules, "ocrmypdf", DummyOcrmypdf())
+    pdf_path = tmp_path / "scan.pdf"
+    pdf_path.write_bytes(b"%PDF")
+
+    pdf_extract.pdf_to_text_with_ocr(pdf_path, max_pages=5)
+    pdf_extract.pdf_to_text_with_ocr(pdf_path, max_pages=40)
+    assert calls[0]["pages"] == "1-5"
+    assert "pages" not in calls[1]
+    # Per call: the extraction before OCR (which records the page count) and the OCR output.
+    assert len(fake_fitz.opened) == 4
+
+
+def test_dict_text_joins_span_texts() -> None:
+    class Page:
+        def get_text(self, mode):
+            assert mode == "dict"
+            span = {"text": " Rechnung "}
+            return {"blocks": [{"lines": [{"spans": [span, {"text": "  "}, {"text": "Nr. 42"}]}]}, {"type": 1}]}
+
+    assert pdf_extract._dict_text(Page()) == "Rechnung Nr. 42"
+
+
+def test_pdf_to_text_stops_extracting_past_token_budget(monkeypatch, fake_fitz, tmp_path) -> None:
+    fake_fitz.doc = FakeDoc([FakePage("wort " * 100)] * 500)
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: None)
+    text = pdf_extract.pdf_to_text(tmp_path / "long.pdf", max_tokens=1_000)
+
+    assert 0 < len(text) // 4 <= 1_000
+    # ~500 chars per page: the 6 chars/token budget is reached after 13 of 500 pages.
+    assert fake_fitz.doc.accessed == list(range(13))
+
+
+def test_get_pdf_metadata_opens_from_memory_map(fake_fitz, tmp_path) -> None:
+    fake_fitz.doc = FakeDoc(metadata={"title": " Lease ", "creationDate": "D:20240131120000"})
+    pdf = tmp_path / "lease.pdf"
+    pdf.write_bytes(b"%PDF-1.7 lease")
+
+    meta = pdf_extract.get_pdf_metadata(pdf)
+
+    assert meta["title"] == "Lease" and meta["creation_date"] == "2024-01-31"
+    assert fake_fitz.opened == [{"path": None, "stream": b"%PDF-1.7 lease"}]
+
+
+def test_open_pdf_uses_path_for_files_over_mmap_limit(monkeypatch, tmp_path) -> None:
+    fitz = FakeFitz()
+    pdf = tmp_path / "big.pdf"
+    pdf.write_bytes(b"%PDF" + b"0" * 60)
+    monkeypatch.setattr(pdf_extract, "MMAP_OPEN_MAX_BYTES", 32)
+
+    doc, view = pdf_extract._open_pdf(fitz, pdf)
+
+    assert view is None and fitz.opened == [{"path": pdf, "stream": None}]
+
+
+def test_pdf_to_text_without_mmap_opens_by_path(fake_fitz, tmp_path) -> None:
+    fake_fitz.doc = FakeDoc(pages=[FakePage(text="Lease agreement")])
+    pdf = tmp_path / "lease.pdf"
+    pdf.write_bytes(b"%PDF-1.7 lease")
+
+    assert pdf_extract.pdf_to_text(pdf, use_mmap=False) == "Lease agreement"
+    assert fake_fitz.opened == [{"path": pdf, "stream": None}]
+
+
+def test_open_pdf_memory_map_with_real_pymupdf(tmp_path) -> None:
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Mapped lease agreement")
+    doc.set_metadata({"title": "Lease"})
+    pdf = tmp_path / "lease.pdf"
+    doc.save(pdf)
+    doc.close()
+
+    doc, view = pdf_extract._open_pdf(fitz, pdf)
+    assert view is not None
+    mapping = view.obj
+    assert "Mapped lease agreement" in doc[0].get_text()
+    pdf_extract._close_pdf(doc, view)
+    assert mapping.closed
+
+    assert "Mapped lease agreement" in pdf_extract.pdf_to_text(pdf)
+    assert pdf_extract.get_pdf_metadata(pdf)["title"] == "Lease"
+
+
+def test_extract_pages_skips_fallbacks_on_image_only_pages(fake_fitz) -> None:
+    scanned, blank = FakePage(images=[(7,)]), FakePage()
+
+    assert pdf_extract._extract_pages(FakeDoc([scanned, blank]), Path("scan.pdf")) == []
+    assert [mode for mode, _ in scanned.calls] == ["text"]
+    assert [mode for mode, _ in blank.calls] == ["text", "blocks", "dict"]
+
+
+def test_parse_pdf_date_reads_fixed_layout() -> None:
+    assert pdf_extract._parse_pdf_date(" D:20240131120000+01'00' ") == pdf_extract.date(2024, 1, 31)
+    assert pdf_extract._parse_pdf_date("D:20240131") == pdf_extract.date(2024, 1, 31)
+    for value in (None, "", "20240131", "D:2024013", "D:2024-01-31", "D:20240230"):
+        assert pdf_extract._parse_pdf_date(value) is None
+
+
+def test_pdf_to_text_with_ocr_reads_ocr_output_from_memory(monkeypatch, fake_fitz, tmp_path) -> None:
+    class DummyOcrmypdf:
+        def ocr(self, src, dst, **kwargs):
+            dst.write(b"%PDF-ocr")
+
+    fake_fitz.doc = FakeDoc([FakePage("Rechnung " * 20)])
+    monkeypatch.setitem(sys.modules, "ocrmypdf", DummyOcrmypdf())
+    monkeypatch.setattr(pdf_extract, "pdf_to_text", lambda *a, **k: "")
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: None)
+    pdf_path = tmp_path / "scan.pdf"
+    pdf_path.write_bytes(b"%PDF")
+
+    text = pdf_extract.pdf_to_text_with_ocr(pdf_path)
+
+    assert text.startswith("Rechnung")
+    assert [opened["stream"] for opened in fake_fitz.opened] == [b"%PDF-ocr"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["scan.pdf"]
+
+
+def test_extract_pages_parses_each_page_once_for_all_strategies(fake_fitz) -> None:
+    page = FakePage(spans="Text")
+
+    assert pdf_extract._extract_pages(FakeDoc([page]), Path("blank.pdf")) == ["Text"]
+    assert len(page.textpages) == 1
+    assert page.calls == [("text", page.textpages[0]), ("blocks", page.textpages[0]), ("dict", page.textpages[0])]
+
+
+def test_token_count_fallback_counts_utf8_bytes(monkeypatch) -> None:
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: None)
+    assert pdf_extract._token_count("abcd" * 10) == 10
+    assert pdf_extract._token_count("äöüß" * 10) == 20
+    assert pdf_extract._token_count("") == 1
+
+
+def test_get_pdf_metadata_reuses_metadata_read_by_pdf_to_text(monkeypatch, fake_fitz, tmp_path) -> None:
+    import os
+
+    fake_fitz.doc = FakeDoc([FakePage("Mietvertrag " * 10)], {"title": "Mietvertrag", "modDate": "D:20230102"})
+    monkeypatch.setattr(pdf_extract, "_get_encoding", lambda: None)
+    pdf = tmp_path / "lease.pdf"
+    pdf.write_bytes(b"%PDF-1.7")
+
+    assert pdf_extract.pdf_to_text(pdf).startswith("Mietvertrag")
+    meta = pdf_extract.get_pdf_metadata(pdf)
+    assert meta == {"title": "Mietvertrag", "author": "", "creation_date": None, "mod_date": "2023-01-02"}
+    assert len(fake_fitz.opened) == 1
+
+    os.utime(pdf, ns=(0, 0))  # changed file: read again
+    pdf_extract.get_pdf_metadata(pdf)
+    assert len(fake_fitz.opened) == 2
+
+
+def test_pdf_to_text_page_workers_with_real_processes(caplog, tmp_path) -> None:
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for n in range(pdf_extract.PAGE_PARALLEL_MIN_PAGES + 4):
+        doc.new_page().insert_text((72, 72), f"Section {n} of the annual report")
+    pdf = tmp_path / "report.pdf"
+    doc.save(pdf)
+    doc.close()
+
+    try:
+        text = pdf_extract.pdf_to_text(pdf, page_workers=2)
+    finally:
+        pdf_extract.shutdown_page_pool()
+
+    assert text.split("\n") == [f"Section {n} of the annual report" for n in range(36)]
+    assert "extracting serially" not in caplog.text
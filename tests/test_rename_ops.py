@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import pytest
+
+from ai_pdf_renamer import rename_ops
+from ai_pdf_renamer.rename_ops import apply_single_rename
+
+
+def _apply(file_path, base, **kwargs):
+    options = {"plan_file_path": None, "plan_entries": None, "dry_run": False, "backup_dir": None}
+    options.update(kwargs)
+    return apply_single_rename(file_path, base, **options)
+
+
+def test_apply_single_rename_never_replaces_existing_target(tmp_path) -> None:
+    src = tmp_path / "scan.pdf"
+    src.write_bytes(b"new")
+    for name in ("invoice.pdf", "invoice_1.pdf", "invoice_2.pdf"):
+        (tmp_path / name).write_bytes(name.encode())
+
+    ok, target = _apply(src, "invoice")
+
+    assert ok and target == tmp_path / "invoice_3.pdf"
+    assert target.read_bytes() == b"new"
+    assert not src.exists()
+    assert (tmp_path / "invoice.pdf").read_bytes() == b"invoice.pdf"
+
+
+def test_apply_single_rename_claims_free_target_without_exists_check(tmp_path, monkeypatch) -> None:
+    src = tmp_path / "scan.pdf"
+    src.write_bytes(b"x")
+    checked: list[str] = []
+    real_exists = rename_ops.Path.exists
+
+    def tracking_exists(self):
+        checked.append(self.name)
+        return real_exists(self)
+
+    monkeypatch.setattr(rename_ops.Path, "exists", tracking_exists)
+    ok, target = _apply(src, "lease")
+
+    assert ok and target.name == "lease.pdf"
+    assert checked == []
+
+
+def test_rename_no_replace_falls_back_without_hard_links(tmp_path, monkeypatch) -> None:
+    import errno
+
+    def no_links(src, dst):
+        raise OSError(errno.EPERM, "Operation not permitted")
+
+    monkeypatch.setattr(rename_ops.os, "link", no_links)
+    src = tmp_path / "a.pdf"
+    src.write_bytes(b"a")
+    taken = tmp_path / "b.pdf"
+    taken.write_bytes(b"b")
+
+    ok, target = _apply(src, "b")
+
+    assert ok and target.name == "b_1.pdf"
+    assert taken.read_bytes() == b"b"
+    assert not src.exists()
+
+
+def test_apply_single_rename_skips_many_suffixes_with_one_listing(tmp_path, monkeypatch) -> None:
+    src = tmp_path / "scan.pdf"
+    src.write_bytes(b"x")
+    (tmp_path / "memo.pdf").write_bytes(b"")
+    for i in range(1, 31):
+        (tmp_path / f"memo_{i}.pdf").write_bytes(b"")
+    listings: list[object] = []
+    real_scandir = rename_ops.os.scandir
+
+    def counting_scandir(path):
+        listings.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(rename_ops.os, "scandir", counting_scandir)
+    ok, target = _apply(src, "memo", dry_run=True)
+
+    assert ok and target.name == "memo_31.pdf"
+    assert len(listings) == 1
+    assert src.exists()
+
+
+def test_backup_keeps_content_and_mtime_when_clone_is_refused(tmp_path, monkeypatch) -> None:
+    import errno
+    import os
+
+    fcntl = pytest.importorskip("fcntl")
+
+    def refuse_clone(fd, request, arg):
+        raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+    monkeypatch.setattr(fcntl, "ioctl", refuse_clone)
+    src = tmp_path / "scan.pdf"
+    src.write_bytes(b"%PDF-1.7 body")
+    os.utime(src, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+    backup_dir = tmp_path / "backup"
+
+    ok, target = _apply(src, "report", backup_dir=backup_dir)
+
+    backup = backup_dir / "scan.pdf"
+    assert ok and target.name == "report.pdf"
+    assert backup.read_bytes() == b"%PDF-1.7 body"
+    assert backup.stat().st_mtime_ns == 1_000_000_000_000_000_000
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import re
 from datetime import date
+from pathlib import Path
 
 import pytest
 
@@ -118,3 +119,222 @@ def test_rename_collision_suffixes(monkeypatch, tmp_path) -> None:
 
     assert not pdf_path.exists()
     assert (tmp_path / "20240101-report_2.pdf").exists()
+
+
+def test_rename_writes_log_and_export_per_file(monkeypatch, tmp_path) -> None:
+    import json
+
+    import ai_pdf_renamer.renamer as renamer_mod
+
+    src = tmp_path / "in"
+    src.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (src / name).write_bytes(b"content")
+    monkeypatch.setattr(renamer_mod, "pdf_to_text", lambda path, *a, **k: Path(path).stem)
+    monkeypatch.setattr(
+        renamer_mod, "generate_filename", lambda text, *a, **k: (f"20240101-{text}", {"category": "invoice"})
+    )
+    log_path = tmp_path / "out" / "renames.tsv"
+    export_path = tmp_path / "out" / "meta.json"
+    config = renamer_mod.RenamerConfig(rename_log_path=log_path, export_metadata_path=export_path)
+
+    renamer_mod.rename_pdfs_in_directory(src, config=config)
+
+    log_lines = sorted(log_path.read_text(encoding="utf-8").splitlines())
+    assert log_lines == [f"{src / 'a.pdf'}\t{src / '20240101-a.pdf'}", f"{src / 'b.pdf'}\t{src / '20240101-b.pdf'}"]
+    rows = json.loads(export_path.read_text(encoding="utf-8"))
+    assert sorted(r["new_name"] for r in rows) == ["20240101-a.pdf", "20240101-b.pdf"]
+    assert {r["category"] for r in rows} == {"invoice"}
+
+
+def test_get_date_str_loads_pdf_metadata_only_without_content_date() -> None:
+    from ai_pdf_renamer.renamer import _get_date_str
+
+    loads: list[int] = []
+
+    def load_meta() -> dict:
+        loads.append(1)
+        return {"creation_date": "2023-05-06", "mod_date": None}
+
+    config = RenamerConfig()
+    today = date(2025, 1, 1)
+    assert _get_date_str("Invoice dated 2024-01-09", config, today, load_meta) == "20240109"
+    assert loads == []
+    assert _get_date_str("no date here", config, today, load_meta) == "20230506"
+    assert loads == [1]
+
+
+def test_collect_pdf_files_recursive_walk(tmp_path) -> None:
+    from ai_pdf_renamer.renamer import _collect_pdf_files
+
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "top.pdf").write_bytes(b"")
+    (tmp_path / ".hidden.pdf").write_bytes(b"")
+    (tmp_path / "notes.txt").write_bytes(b"")
+    (tmp_path / "a" / "SCAN.PDF").write_bytes(b"")
+    (tmp_path / "a" / "b" / "deep.pdf").write_bytes(b"")
+    (tmp_path / "a" / "b" / "folder.pdf").mkdir()
+    (tmp_path / "link").symlink_to(tmp_path / "a", target_is_directory=True)
+
+    found = _collect_pdf_files(tmp_path, recursive=True)
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in found) == ["a/SCAN.PDF", "a/b/deep.pdf", "top.pdf"]
+
+    found = _collect_pdf_files(tmp_path, recursive=True, max_depth=2)
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in found) == ["a/SCAN.PDF", "top.pdf"]
+
+
+def test_collect_pdf_files_include_exclude_patterns(tmp_path) -> None:
+    from ai_pdf_renamer.renamer import _collect_pdf_files
+
+    for name in ("invoice-1.pdf", "invoice-draft.pdf", "scan.pdf"):
+        (tmp_path / name).write_bytes(b"")
+
+    found = _collect_pdf_files(tmp_path, include_patterns=["invoice-*", "scan.*"], exclude_patterns=["*draft*"])
+    assert sorted(p.name for p in found) == ["invoice-1.pdf", "scan.pdf"]
+
+
+def test_collect_pdf_files_skip_if_already_named(tmp_path) -> None:
+    from ai_pdf_renamer.renamer import _collect_pdf_files
+
+    for name in ("20250101-invoice.pdf", "20250101-scan.PDF", "2025-invoice.pdf", "scan.pdf"):
+        (tmp_path / name).write_bytes(b"")
+
+    found = _collect_pdf_files(tmp_path, skip_if_already_named=True)
+    assert sorted(p.name for p in found) == ["2025-invoice.pdf", "scan.pdf"]
+
+
+def test_generate_filename_fused_metadata_uses_one_llm_call(monkeypatch) -> None:
+    import ai_pdf_renamer.renamer as renamer_mod
+
+    def unexpected(*a, **k):
+        raise AssertionError("per-field LLM call with llm_fused_metadata")
+
+    for name in ("get_document_summary", "get_document_keywords", "get_document_category", "get_final_summary_tokens"):
+        monkeypatch.setattr(renamer_mod, name, unexpected)
+    calls: list[str] = []
+    options: list[tuple[int, bool]] = []
+
+    def fused(client, content, **kwargs):
+        calls.append(content)
+        options.append((kwargs["race_prompts"], kwargs["title_shortcut"]))
+        return {
+            "summary": "Invoice",
+            "keywords": ["invoice", "tax"],
+            "category": "invoice",
+            "final_summary": ["payment"],
+        }
+
+    monkeypatch.setattr(renamer_mod, "get_document_metadata_fused", fused)
+    scorer = HeuristicScorer(
+        rules=[HeuristicRule(pattern=re.compile("invoice", re.IGNORECASE), category="invoice", score=10)]
+    )
+
+    name, _ = generate_filename(
+        "Invoice dated 2024-01-09",
+        config=RenamerConfig(
+            language="de",
+            desired_case="kebabCase",
+            llm_fused_metadata=True,
+            llm_race_prompts=2,
+            summary_from_title=True,
+        ),
+        llm_client=object(),
+        heuristic_scorer=scorer,
+        stopwords=Stopwords(words=set()),
+        today=date(2000, 1, 1),
+    )
+
+    assert name == "20240109-invoice-tax-payment"
+    assert calls == ["Invoice dated 2024-01-09"]
+    assert options == [(2, True)]
+
+
+def test_rename_workers_overlap_extraction_with_llm_stage(monkeypatch, tmp_path) -> None:
+    import threading
+
+    import ai_pdf_renamer.renamer as renamer_mod
+
+    files = [tmp_path / f"doc{i}.pdf" for i in range(6)]
+    last_extracted = threading.Event()
+
+    def extract(path, config):
+        if path == files[3]:
+            last_extracted.set()
+        return "" if path == files[4] else f"text of {path.name}"
+
+    def generate(path, content, config, keyword_batcher=None):
+        if path in files[:2]:
+            # Both LLM threads wait here; extraction must still get to doc3 meanwhile.
+            assert last_extracted.wait(5)
+        return (path, path.stem + "-new", {}, None)
+
+    monkeypatch.setattr(renamer_mod, "_extract_pdf_content", extract)
+    monkeypatch.setattr(renamer_mod, "_process_content_to_result", generate)
+
+    results = renamer_mod._produce_rename_results(files, RenamerConfig(workers=2))
+
+    assert [r[0] for r in results] == files
+    assert [r[1] for r in results] == ["doc0-new", "doc1-new", "doc2-new", "doc3-new", None, "doc5-new"]
+
+
+def test_rename_workers_report_llm_stage_failures(monkeypatch, tmp_path) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    import ai_pdf_renamer.renamer as renamer_mod
+
+    files = [tmp_path / f"doc{i}.pdf" for i in range(8)]
+
+    class RefusingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, /, *args, **kwargs):
+            if fn.__name__ == "generate" and args[0] % 2:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            return super().submit(fn, *args, **kwargs)
+
+    def generate(path, content, config, keyword_batcher=None):
+        if path == files[2]:
+            raise ValueError("bad response")
+        return (path, path.stem + "-new", {}, None)
+
+    monkeypatch.setattr(renamer_mod, "ThreadPoolExecutor", RefusingExecutor)
+    monkeypatch.setattr(renamer_mod, "_extract_pdf_content", lambda path, config: f"text of {path.name}")
+    monkeypatch.setattr(renamer_mod, "_process_content_to_result", generate)
+
+    # Every refused submit still frees its slot: more files than 2 * workers complete.
+    results = renamer_mod._produce_rename_results(files, RenamerConfig(workers=2))
+
+    assert [r[1] for r in results] == ["doc0-new", None, None, None, "doc4-new", None, "doc6-new", None]
+    assert [type(r[3]).__name__ for r in results[1:4]] == ["RuntimeError", "ValueError", "RuntimeError"]
+
+
+def test_rename_workers_share_one_keyword_batcher(monkeypatch, tmp_path) -> None:
+    import ai_pdf_renamer.renamer as renamer_mod
+
+    files = [tmp_path / f"doc{i}.pdf" for i in range(4)]
+    batchers: list[object] = []
+
+    def generate(path, content, config, keyword_batcher=None):
+        batchers.append(keyword_batcher)
+        return (path, path.stem + "-new", {}, None)
+
+    monkeypatch.setattr(renamer_mod, "_extract_pdf_content", lambda path, config: f"text of {path.name}")
+    monkeypatch.setattr(renamer_mod, "_process_content_to_result", generate)
+
+    renamer_mod._produce_rename_results(files, RenamerConfig(workers=2, llm_batch_keywords=True))
+    assert len(batchers) == 4 and len({id(b) for b in batchers}) == 1
+    assert batchers[0].batch_size == 2
+
+    batchers.clear()
+    renamer_mod._produce_rename_results(
+        files, RenamerConfig(workers=2, llm_batch_keywords=True, llm_fused_metadata=True)
+    )
+    assert batchers == [None] * 4
+
+
+def test_truncate_filename_cuts_at_last_separator_that_fits() -> None:
+    from ai_pdf_renamer.renamer import _truncate_filename_to_max_chars
+
+    config = RenamerConfig(desired_case="kebabCase", max_filename_chars=20)
+    assert _truncate_filename_to_max_chars("20240101-invoice-acme-power-bill", config) == "20240101-invoice"
+    assert _truncate_filename_to_max_chars("20240101-invoice", config) == "20240101-invoice"
+    assert _truncate_filename_to_max_chars("20240101invoiceacmepowerbill", config) == "20240101invoiceacmep"
+    assert _truncate_filename_to_max_chars("x-20240101invoiceacmepowerbill", config) == "x"
@@ -5,6 +5,7 @@ from datetime import date
 import pytest
 
 from ai_pdf_renamer.text_utils import (
+    Stopwords,
     chunk_text,
     convert_case,
     extract_date_from_content,
@@ -133,3 +134,16 @@ def test_extract_structured_fields_empty() -> None:
         "amount": "",
         "company": "",
     }
+
+
+def test_subtract_tokens_removes_equal_and_near_prefix_tokens() -> None:
+    out = subtract_tokens([" Rechnung ", "rechnungen", "rech", "Vertrag", "", "steuer"], ["rechnung", "Steuern"])
+    assert out == ["rech", "Vertrag"]
+
+
+def test_stopwords_filter_tokens_limit_stops_early() -> None:
+    stopwords = Stopwords(words={"der", "und"})
+    tokens = iter([" Rechnung ", "der", "", "Und", "Strom", "Gas", "Wasser"])
+    assert stopwords.filter_tokens(tokens, limit=2) == ["Rechnung", "Strom"]
+    assert next(tokens) == "Gas"
+    assert stopwords.filter_tokens(["der", " x ", "y"]) == ["x", "y"]